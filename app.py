@@ -2,22 +2,30 @@
 MiniMax 音色管理器主应用
 """
 
+import sys
+
+from utils.startup import import_timer
+
+# 检查是否传入 --debug 参数，调试模式下记录启动阶段的导入耗时
+if "--debug" in sys.argv:
+    import_timer.start()
+
 import streamlit as st
-import os
-import json
 
 
 # 添加当前目录到Python路径
 from components import VoiceManager, render_sidebar
 from components.excel_manager import render_excel_manager
+from components.warmup import get_warmup
 from pages import (
     render_test_voice,
     render_add_voice,
 )
+from utils.config import load_config
+from utils.profiling import profile_rerun
 
+import_timer.mark_ready()
 
-import sys
-from components.debug_panel import display_debug_panel
 
 def main():
     """主应用函数"""
@@ -48,10 +56,11 @@ def main():
     if not voice_manager.client:
         st.info("请在侧边栏配置 API Key 和 Group ID 并连接")
         return
-    with st.expander("📊 剧本数据", expanded=False):
-        # st.markdown("正在开发中...")
-        st.markdown("这里可以查看和管理剧本数据，包括音色列表、批量上传等功能。")
-        render_excel_manager()
+    # 剧本数据按需加载：打开后才会导入 pandas/openpyxl 并读取表格
+    if st.toggle("📊 剧本数据", key="show_script_panel"):
+        with st.container(border=True):
+            st.markdown("这里可以查看和管理剧本数据，包括音色列表、批量上传等功能。")
+            render_excel_manager(voice_manager)
 
     if st.button("🔄 刷新音色列表"):
         if voice_manager.client:
@@ -75,12 +84,9 @@ def main():
 
 
 if __name__ == "__main__":
-    config_path = os.path.join(os.path.dirname(__file__), "config.json")
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            config_data = json.load(f)
-        for key, value in config_data.items():
-            # 将所有配置项加入系统环境变量
-            os.environ[str(key)] = str(value)
-
-    main()
+    load_config()
+    # 未通过 serve.py 启动时，由第一次重跑在后台开始预热（重复调用无效）
+    get_warmup().start()
+    # 调试模式下可逐次重跑采集性能分析
+    with profile_rerun():
+        main()
@@ -0,0 +1,240 @@
+"""
+命令行批量克隆：从音频目录和 CSV 配置（文件名,音色ID,预览文本）批量上传并克隆音色
+
+用法:
+    uv run python batch_clone.py <音频目录> <配置.csv> [--workers 4] [--report report.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from minimax_speech import MiniMaxSpeech
+
+from utils.batch_journal import BatchJournal, hash_file
+from utils.config import load_config
+from utils.manifest import check_manifest, read_manifest
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+AUDIO_SUFFIXES = {".wav", ".mp3", ".m4a", ".flac"}
+CLONE_MODELS = ["speech-02-hd", "speech-02-turbo", "speech-01-hd", "speech-01-turbo"]
+
+
+@dataclass
+class ManifestRow:
+    """配置文件中的一行"""
+
+    file_name: str
+    voice_id: str
+    preview_text: str = ""
+
+
+@dataclass
+class CloneResult:
+    """单个文件的处理结果"""
+
+    file_name: str
+    voice_id: str
+    status: str
+    file_id: int | None = None
+    error: str = ""
+    seconds: float = 0.0
+
+
+def list_audio_files(audio_dir: Path) -> set[str]:
+    """列出目录下（含子目录）支持的音频文件，返回相对路径"""
+    return {
+        path.relative_to(audio_dir).as_posix()
+        for path in audio_dir.rglob("*")
+        if path.suffix.lower() in AUDIO_SUFFIXES and path.is_file()
+    }
+
+
+def validate_manifest(
+    manifest: "pd.DataFrame", audio_dir: Path, existing_voice_ids: set[str]
+) -> tuple[list[ManifestRow], list[CloneResult]]:
+    """使用与页面相同的规则校验配置，拆分为有效行和无效行的结果"""
+    checked = check_manifest(manifest, existing_voice_ids, list_audio_files(audio_dir))
+    valid, invalid = [], []
+    for file_name, voice_id, preview_text, error in checked.itertuples(index=False):
+        if error:
+            invalid.append(CloneResult(file_name, voice_id, "invalid", error=error))
+        else:
+            valid.append(ManifestRow(file_name, voice_id, preview_text))
+    return valid, invalid
+
+
+def clone_one(
+    client: MiniMaxSpeech,
+    journal: BatchJournal,
+    batch_id: str,
+    audio_dir: Path,
+    row: ManifestRow,
+    file_hash: str,
+    catalog_voice_ids: set[str],
+    clone_kwargs: dict,
+) -> CloneResult:
+    """上传并克隆一个文件，直接从磁盘读取，跳过日志中已完成的步骤"""
+    started = time.perf_counter()
+    entry = journal.get_entry(batch_id, file_hash, row.voice_id)
+    if entry and entry.status == "cloning":
+        # 上次提交克隆后中断，结果未知：音色已存在则视为完成
+        if row.voice_id in catalog_voice_ids:
+            journal.record_cloned(batch_id, file_hash, row.voice_id)
+            entry.status = "cloned"
+    if entry and entry.status == "cloned":
+        return CloneResult(row.file_name, row.voice_id, "skipped", entry.file_id)
+
+    file_id = entry.file_id if entry else None
+    try:
+        if file_id is None:
+            file_id = client.file_upload(str(audio_dir / row.file_name))
+            journal.record_upload(batch_id, file_hash, row.voice_id, file_id)
+        journal.record_clone_submitted(batch_id, file_hash, row.voice_id)
+        result = client.voice_clone_simple(
+            file_id=file_id,
+            voice_id=row.voice_id,
+            text=row.preview_text or None,
+            **clone_kwargs,
+        )
+        if not result.base_resp.is_success:
+            raise RuntimeError(f"克隆音色失败: {result.base_resp.error_type}")
+        journal.record_cloned(batch_id, file_hash, row.voice_id)
+    except Exception as e:
+        journal.record_failure(batch_id, file_hash, row.voice_id, str(e))
+        return CloneResult(
+            row.file_name,
+            row.voice_id,
+            "failed",
+            file_id,
+            str(e),
+            round(time.perf_counter() - started, 2),
+        )
+    return CloneResult(
+        row.file_name,
+        row.voice_id,
+        "cloned",
+        file_id,
+        seconds=round(time.perf_counter() - started, 2),
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="MiniMax 命令行批量克隆")
+    parser.add_argument("audio_dir", type=Path, help="音频文件所在目录")
+    parser.add_argument("manifest", type=Path, help="CSV 配置：文件名,音色ID,预览文本")
+    parser.add_argument("--workers", type=int, default=4, help="并发数（默认 4）")
+    parser.add_argument("--report", type=Path, help="JSON 报告输出路径（默认输出到标准输出）")
+    parser.add_argument("--journal", type=Path, help="批次日志路径（默认与页面共用）")
+    parser.add_argument("--dry-run", action="store_true", help="只校验配置（含重名检查），不上传")
+    parser.add_argument("--noise-reduction", action="store_true", help="启用降噪")
+    parser.add_argument("--volume-normalization", action="store_true", help="启用音量标准化")
+    parser.add_argument("--accuracy", type=float, default=0.7, help="文本验证精度（默认 0.7）")
+    parser.add_argument("--model", choices=CLONE_MODELS, default=CLONE_MODELS[0])
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    load_config()
+
+    api_key = os.getenv("MINIMAX_API_KEY", "")
+    group_id = os.getenv("MINIMAX_GROUP_ID", "")
+    if not api_key or not group_id:
+        print("请在 config.json 或环境变量中设置 MINIMAX_API_KEY 和 MINIMAX_GROUP_ID", file=sys.stderr)
+        return 2
+    client = MiniMaxSpeech(api_key=api_key, group_id=group_id)
+    journal = BatchJournal(args.journal) if args.journal else BatchJournal()
+
+    manifest = read_manifest(args.manifest)
+    # 先按配置中所有音频存在的行算出批次ID，重跑同一批次时得到相同的ID
+    audio_files = list_audio_files(args.audio_dir)
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        names = sorted(set(manifest["file_name"]) & audio_files)
+        file_hashes = dict(
+            zip(names, executor.map(lambda name: hash_file(args.audio_dir / name), names))
+        )
+    batch_id = journal.make_batch_id(
+        group_id,
+        [
+            (file_hashes[file_name], voice_id)
+            for file_name, voice_id in zip(manifest["file_name"], manifest["voice_id"])
+            if file_name in file_hashes
+        ],
+    )
+
+    # 上传前检查与已有音色是否重名（只有本批次之前自己克隆的除外，便于中断后重跑）
+    catalog_voice_ids = {voice.voice_id for voice in client.get_cloned_voices() or []}
+    existing_voice_ids = catalog_voice_ids - journal.resumed_voice_ids(batch_id)
+    valid, results = validate_manifest(manifest, args.audio_dir, existing_voice_ids)
+    print(
+        f"配置共 {len(manifest)} 行，有效 {len(valid)} 行，无效 {len(results)} 行",
+        file=sys.stderr,
+    )
+
+    started_batch = None
+    if valid and not args.dry_run:
+        clone_kwargs = {
+            "need_noise_reduction": args.noise_reduction,
+            "need_volume_normalization": args.volume_normalization,
+            "accuracy": args.accuracy,
+            "model": args.model,
+        }
+
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            started_batch = journal.start_batch(
+                group_id,
+                [(file_hashes[row.file_name], row.file_name, row.voice_id) for row in valid],
+                label=f"CLI {args.manifest.name}",
+                batch_id=batch_id,
+            )
+            futures = [
+                executor.submit(
+                    clone_one,
+                    client,
+                    journal,
+                    batch_id,
+                    args.audio_dir,
+                    row,
+                    file_hashes[row.file_name],
+                    catalog_voice_ids,
+                    clone_kwargs,
+                )
+                for row in valid
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                results.append(result)
+                print(
+                    f"[{done}/{len(futures)}] {result.status} {result.file_name} -> {result.voice_id}"
+                    f"{' ' + result.error if result.error else ''}",
+                    file=sys.stderr,
+                )
+
+    summary: dict[str, int] = {}
+    for result in results:
+        summary[result.status] = summary.get(result.status, 0) + 1
+    report = {
+        "batch_id": started_batch,
+        "dry_run": args.dry_run,
+        "summary": summary,
+        "files": [asdict(result) for result in results],
+    }
+    report_text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        args.report.write_text(report_text, encoding="utf-8")
+    else:
+        print(report_text)
+    return 1 if summary.get("failed") or summary.get("invalid") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
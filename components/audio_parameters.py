@@ -1,139 +1,175 @@
 import streamlit as st
-import os
-import tempfile
-import binascii
 
 
+from components.prefetch import (
+    DEFAULT_PREFETCH_DEPTH,
+    get_prefetcher,
+    get_upcoming_lines,
+)
+from components.render_history import (
+    RENDER_TIERS,
+    RenderRecord,
+    add_render_record,
+    find_render_record,
+    record_take,
+    render_record_result,
+    submit_render,
+    tier_model,
+    tier_params,
+)
 from components.voice_manager import VoiceManager
-from utils.naming import generate_safe_filename
+from utils.casting import EMOTIONS, LANGUAGE_BOOSTS, get_casting_map
+from utils.tts_cache import get_tts_cache, make_tts_key
+
+# 可按角色预设的参数对应的控件键
+PARAM_WIDGET_KEYS = {
+    "speed": "param_speed",
+    "volume": "param_volume",
+    "pitch": "param_pitch",
+    "emotion": "param_emotion",
+    "language_boost": "param_language_boost",
+}
+
+
+def apply_cast_params(params: dict) -> None:
+    """把角色的默认参数写入参数控件（需在控件渲染前调用）"""
+    for name, value in params.items():
+        if name in PARAM_WIDGET_KEYS:
+            st.session_state[PARAM_WIDGET_KEYS[name]] = "无" if value is None else value
 
 
 def render_audio_parameters(voice_manager: VoiceManager):
     voice_id = voice_manager.current_voice
     # 音频参数
+    tier = st.radio(
+        "渲染档位",
+        options=list(RENDER_TIERS),
+        format_func=lambda t: RENDER_TIERS[t]["label"],
+        horizontal=True,
+        key="render_tier",
+        help="快速试听使用 turbo 模型和较低的采样率、比特率；满意后可在渲染记录中定稿为成片质量",
+    )
 
     col_a, col_b = st.columns(2)
     with col_a:
-        speed = st.slider("语速", 0.5, 2.0, 1.0, 0.1)
-        volume = st.slider("音量", 0.0, 10.0, 1.0, 0.1)
+        speed = st.slider("语速", 0.5, 2.0, 1.0, 0.1, key="param_speed")
+        volume = st.slider("音量", 0.0, 10.0, 1.0, 0.1, key="param_volume")
 
     with col_b:
-        pitch = st.slider("音调", -12, 12, 0, 1)
+        pitch = st.slider("音调", -12, 12, 0, 1, key="param_pitch")
         model = st.selectbox(
-            "模型", ["speech-02-hd", "speech-01-turbo", "speech-01-hd"]
+            "模型",
+            ["speech-02-hd", "speech-02-turbo", "speech-01-hd", "speech-01-turbo"],
+        )
+        st.caption(
+            f"实际使用: {tier_model(model, tier)} | "
+            f"{RENDER_TIERS[tier]['sample_rate']} Hz | "
+            f"{RENDER_TIERS[tier]['bitrate'] // 1000} kbps"
         )
 
     # 情感参数
     emotion = st.selectbox(
         "情感",
-        options=[
-            "无",
-            "happy",
-            "sad",
-            "angry",
-            "fearful",
-            "disgusted",
-            "surprised",
-            "neutral",
-        ],
+        options=["无", *EMOTIONS],
         help="选择语音的情感表达",
+        key="param_emotion",
     )
 
     # 语言增强参数
     language_boost = st.selectbox(
         "语言增强",
-        options=[
-            "无",
-            "Chinese",
-            "English",
-            "French",
-            "German",
-            "Spanish",
-            "Italian",
-            "Japanese",
-            "Korean",
-            "Russian",
-            "Arabic",
-            "Portuguese",
-            "Turkish",
-            "Dutch",
-            "Ukrainian",
-            "Vietnamese",
-            "Indonesian",
-            "Thai",
-            "Polish",
-            "Romanian",
-            "Greek",
-            "Czech",
-            "Finnish",
-            "Hindi",
-            "auto",
-        ],
+        options=["无", *LANGUAGE_BOOSTS],
         help="选择语言增强，提高特定语言的发音质量",
+        key="param_language_boost",
     )
 
     # 将"无"转换为None
     emotion_value = None if emotion == "无" else emotion
     language_boost_value = None if language_boost == "无" else language_boost
 
+    base_params = dict(
+        speed=speed,
+        volume=volume,
+        pitch=pitch,
+        emotion=emotion_value,
+        language_boost=language_boost_value,
+        model=model,
+    )
+    tts_params = tier_params(base_params, tier)
+    # 当前行的缓存键：刚选中的行可能正是上次预取的行
+    current_key = make_tts_key(
+        voice_id,
+        st.session_state.get("test_text", ""),
+        credential=voice_manager.credential_key,
+        **tts_params,
+    )
+
+    # 选择或参数变化时，取消不再需要的预取任务（当前行的预取保留）
+    prefetcher = get_prefetcher()
+    prefetch_enabled = st.session_state.get("prefetch_enabled", False)
+    upcoming_lines = []
+    if prefetch_enabled:
+        # 后续台词按选角表使用各自角色的音色和默认参数
+        casting = get_casting_map()
+        for character, text in get_upcoming_lines(
+            st.session_state.get("prefetch_depth", DEFAULT_PREFETCH_DEPTH)
+        ):
+            line_voice_id, line_params = casting.resolve(
+                voice_manager.group_id, character, voice_id, base_params
+            )
+            upcoming_lines.append((line_voice_id, text, tier_params(line_params, tier)))
+    prefetcher.retain(
+        [
+            make_tts_key(line_voice, text, credential=voice_manager.credential_key, **params)
+            for line_voice, text, params in upcoming_lines
+        ],
+        current_key,
+    )
+
     if st.button("🎵 生成测试音频", type="primary"):
         test_text = st.session_state.test_text
         if not test_text.strip():
             st.warning("请输入测试文本")
             return
-        with st.spinner("正在生成音频..."):
-            result = voice_manager.test_voice(
-                voice_id=voice_manager.current_voice,
+        prefetcher.consume(current_key)
+        # 获取文件名前缀
+        file_prefix = st.session_state.get("file_prefix", "")
+        record = add_render_record(
+            RenderRecord(
+                voice_id=voice_id,
                 text=test_text,
-                speed=speed,
-                volume=volume,
-                pitch=pitch,
-                emotion=emotion_value,
-                language_boost=language_boost_value,
-                model=model,
-                sample_rate=44100,
-                bitrate=256000,
+                params=base_params,
+                tier=tier,
+                file_prefix=file_prefix,
+                row_key=st.session_state.get("selected_row_key", ""),
+                script=st.session_state.get("selected_row_script", ""),
+                character=st.session_state.get("cast_character", ""),
+                credential=voice_manager.credential_key,
             )
-
-            if not result:
-                st.error("生成音频失败，请检查参数设置或网络连接")
-                return
-            # 保存音频文件
-            audio_data = result.data.audio
-            audio_data = binascii.unhexlify(audio_data)
-            if not audio_data:
-                st.error("生成的音频数据为空，请检查参数设置或网络连接")
-                return
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(
-                delete=False, suffix=".mp3", mode="wb"
-            ) as tmp_file:
-                tmp_file.write(audio_data)
-                tmp_path = tmp_file.name
-
-            # 显示音频播放器
-            st.audio(tmp_path, format="audio/mp3")
-
-            # 清除快速测试状态
-            if "quick_test_voice" in st.session_state:
-                del st.session_state.quick_test_voice
-
-            safe_test_text = generate_safe_filename(test_text)
-            # 提供下载链接
-            with open(tmp_path, "rb") as f:
-                # 获取文件名前缀
-                file_prefix = st.session_state.get("file_prefix", "")
-                if file_prefix:
-                    download_filename = f"{file_prefix}_{voice_id}_{safe_test_text}.mp3"
-                else:
-                    download_filename = f"{voice_id}_{safe_test_text}.mp3"
-
-                st.download_button(
-                    label="📥 下载音频",
-                    data=f.read(),
-                    file_name=download_filename,
-                    mime="audio/mp3",
-                )
-
-            # 清理临时文件
-            os.unlink(tmp_path)
+        )
+        # 未命中缓存时提交后台合成任务，命中时直接记入渲染台账
+        cached_audio = get_tts_cache().get(record.cache_key)
+        if cached_audio is None and voice_manager.credentials_verified:
+            # 文件名由内容哈希决定，输出目录中已有同名文件即为相同的渲染；
+            # 文件名不含凭据，只在当前凭据验证有效后读取
+            cached_audio = voice_manager.render_ledger.store.load(record.filename)
+            if cached_audio is not None:
+                get_tts_cache().put(record.cache_key, cached_audio)
+        if cached_audio is None:
+            submit_render(voice_manager, record)
+        else:
+            record_take(voice_manager, record, cached_audio)
+        st.session_state.last_render_id = record.record_id
+
+        # 清除快速测试状态
+        if "quick_test_voice" in st.session_state:
+            del st.session_state.quick_test_voice
+
+        # 在后台预取接下来的台词
+        if prefetch_enabled and upcoming_lines:
+            prefetcher.schedule(voice_manager, upcoming_lines, current_key)
+
+    # 显示最近一次生成的结果
+    last_record = find_render_record(st.session_state.get("last_render_id", ""))
+    if last_record:
+        render_record_result(voice_manager, last_record, key_prefix="last_")
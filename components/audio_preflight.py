@@ -0,0 +1,61 @@
+"""
+上传前的音频预检组件，添加音色和批量上传页面共用
+"""
+
+import streamlit as st
+
+
+def render_audio_preflight(uploaded_files, key: str) -> tuple[list, object]:
+    """
+    检查上传的音频，返回与输入顺序一致的检查结果列表和处理选项；
+    session_state 中只按文件和处理选项缓存检查结果，只检查新增的文件，
+    处理后的音频不保存，克隆任务执行时按同样的选项重新生成
+    """
+    import pandas as pd
+
+    from utils.audio_preflight import PreflightOptions, preflight_many
+
+    with st.expander("🔍 本地预检", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            downmix = st.checkbox("转为单声道", value=True, key=f"{key}_downmix")
+            trim = st.checkbox("去除首尾静音", value=False, key=f"{key}_trim")
+        with col2:
+            fit_size = st.checkbox(
+                "超过20MB时重新编码", value=True, key=f"{key}_fit_size"
+            )
+            sample_rate = st.selectbox(
+                "重采样",
+                [None, 16000, 24000, 32000, 44100, 48000],
+                format_func=lambda rate: "保持原采样率" if rate is None else f"{rate} Hz",
+                key=f"{key}_sample_rate",
+            )
+        options = PreflightOptions(
+            downmix=downmix, sample_rate=sample_rate, trim_silence=trim, fit_size=fit_size
+        )
+
+        cache_key = f"{key}_preflight"
+        cached = st.session_state.get(cache_key, {})
+        cache_ids = [(file.file_id, options) for file in uploaded_files]
+        missing = [
+            (cache_id, file)
+            for cache_id, file in zip(cache_ids, uploaded_files)
+            if cache_id not in cached
+        ]
+        if missing:
+            with st.spinner(f"正在检查 {len(missing)} 个音频文件..."):
+                # 直接传入上传的文件对象，检查时才读取其缓冲区，不复制内容
+                results = preflight_many(
+                    [(file.name, file) for _, file in missing], options
+                )
+            cached.update(zip((cache_id for cache_id, _ in missing), results))
+        # 只保留当前文件的结果，缓存大小不随历史上传增长
+        st.session_state[cache_key] = {cache_id: cached[cache_id] for cache_id in cache_ids}
+        results = [cached[cache_id] for cache_id in cache_ids]
+
+        st.dataframe(
+            pd.DataFrame([report.as_row() for report in results]),
+            hide_index=True,
+            use_container_width=True,
+        )
+    return results, options
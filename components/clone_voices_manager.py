@@ -1,15 +1,18 @@
 import streamlit as st
 
 from components.voice_manager import VoiceManager
+from components.voice_metadata_editor import render_voice_metadata_editor
+from utils.timing import timed_render
 
 
+@st.fragment
+@timed_render("克隆音色选择")
 def render_clone_voices_manager(voice_manager: VoiceManager):
 
     def update_selected_voice():
         """更新选中的音色"""
-        voice_id = st.session_state.get("selected_clone_voice_option", "")
         voice_manager.current_voice = (
-            st.session_state.voice_options[voice_id] if voice_id else ""
+            st.session_state.get("selected_clone_voice_option") or ""
         )
 
     # 搜索音色
@@ -24,8 +27,8 @@ def render_clone_voices_manager(voice_manager: VoiceManager):
     with col_search:
         search_voice = st.text_input(
             "🔍 搜索音色",
-            placeholder="输入音色ID或描述进行搜索...",
-            help="支持按音色ID或描述搜索，搜索结果会显示在下拉菜单中",
+            placeholder="输入音色ID、描述、标签或角色名进行搜索...",
+            help="支持按音色ID、描述、标签、角色名或拼音搜索，搜索结果会显示在下拉菜单中",
             key="test_voice_search",
             value=st.session_state.get("test_voice_search", ""),
         )
@@ -36,21 +39,12 @@ def render_clone_voices_manager(voice_manager: VoiceManager):
                 # 清除搜索状态
                 if "test_voice_search" in st.session_state:
                     del st.session_state.test_voice_search
-                st.rerun()
+                st.rerun(scope="fragment")
 
-    # 过滤音色
-    if search_voice:
-        filtered_test_voices = [
-            voice
-            for voice in voices
-            if search_voice.lower() in voice.voice_id.lower()
-            or (
-                voice.description
-                and search_voice.lower() in voice.description[0].lower()
-            )
-        ]
-    else:
-        filtered_test_voices = voices
+    # 在本地音色索引中搜索（音色ID、描述、标签、角色名和拼音）
+    filtered_test_voices = voice_manager.voice_index.search(
+        voice_manager.group_id, "clone", search_voice
+    )
 
     # 显示搜索状态
     if search_voice:
@@ -61,14 +55,13 @@ def render_clone_voices_manager(voice_manager: VoiceManager):
         else:
             st.warning(f"🔍 搜索 '{search_voice}' 没有找到匹配的音色")
 
-    # 选择音色
+    # 选择音色：选项为音色ID，显示名只在渲染时使用，不保存到会话中
     voice_options = {
-        f"{v.voice_id} ({v.description or '未命名'})": v.voice_id
+        v.voice_id: f"{v.voice_id} ({v.description or '未命名'})"
         for v in filtered_test_voices
     }
 
     if voice_options:
-        st.session_state.voice_options = voice_options
         # 根据搜索结果调整下拉菜单的提示
         if search_voice and filtered_test_voices:
             selectbox_label = (
@@ -90,19 +83,32 @@ def render_clone_voices_manager(voice_manager: VoiceManager):
 
         if quick_test_voice_id:
             # 查找快速测试音色在选项中的索引
-            for i, (display_name, voice_id) in enumerate(voice_options.items()):
+            for i, voice_id in enumerate(voice_options):
                 if voice_id == quick_test_voice_id:
                     default_index = i
                     break
+        # 选角表选中的音色已不在列表中时不再保留
+        if st.session_state.get("selected_clone_voice_option") not in voice_options:
+            st.session_state.pop("selected_clone_voice_option", None)
         st.selectbox(
             selectbox_label,
-            options=list(voice_options.keys()),
+            options=list(voice_options),
             index=default_index,
+            format_func=voice_options.get,
             help=selectbox_help,
             on_change=update_selected_voice,
             key="selected_clone_voice_option",
         )
-        if search_voice:
+        if search_voice or st.session_state.pop("cast_voice_selected", False):
             update_selected_voice()
     else:
         st.warning("没有可用的音色进行测试")
+
+    # 为搜索结果中的音色编辑标签和角色名（打开后才导入 pandas）
+    if filtered_test_voices and st.toggle(
+        "🏷️ 编辑标签与角色名", key="show_clone_voice_metadata"
+    ):
+        with st.container(border=True):
+            render_voice_metadata_editor(
+                voice_manager, filtered_test_voices, key="clone_voice_metadata_editor"
+            )
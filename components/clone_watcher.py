@@ -0,0 +1,233 @@
+"""
+克隆状态监视器：轮询已提交克隆的音色，就绪后推送通知并更新共享音色列表
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import streamlit as st
+
+from utils.metrics import Histogram
+
+if TYPE_CHECKING:
+    from components.voice_manager import VoiceManager
+
+# 轮询间隔：从 BASE 开始指数增长，不超过 MAX
+WATCH_BASE_INTERVAL = 5.0
+WATCH_MAX_INTERVAL = 120.0
+# 超过该时间仍未就绪则放弃跟踪
+WATCH_TIMEOUT = 30 * 60
+# 每个 Group 保留的最近通知数，更早的通知不再推送给未读到的会话
+NOTIFICATION_HISTORY = 100
+# 克隆就绪耗时的分桶（秒）
+READY_BUCKETS = (10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1200.0, float(WATCH_TIMEOUT))
+
+
+@dataclass
+class PendingClone:
+    """等待就绪的克隆音色"""
+
+    voice_id: str
+    # 提交克隆的会话的音色管理器，用其凭据轮询，音色就绪或放弃跟踪时随之释放
+    voice_manager: "VoiceManager"
+    submitted_at: float = field(default_factory=time.time)
+    attempts: int = 0
+    next_check: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.next_check = self.submitted_at + WATCH_BASE_INTERVAL
+
+    def backoff(self, now: float) -> None:
+        """本轮未就绪，按指数退避安排下一次检查"""
+        self.attempts += 1
+        interval = min(WATCH_BASE_INTERVAL * 2**self.attempts, WATCH_MAX_INTERVAL)
+        self.next_check = now + interval
+
+
+class CloneWatcher:
+    """
+    按 Group ID 和凭据合并轮询：每轮对到期的克隆，每组相同凭据只请求一次克隆音色列表；
+    每个克隆各自按指数退避安排检查，不受同一 Group 中其他克隆的影响
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[str, dict[str, PendingClone]] = {}
+        self._notifications: dict[str, deque[str]] = {}
+        # 每个 Group 累计的通知数，已读位置按累计数计算，不受历史上限影响
+        self._notification_count: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: threading.Thread | None = None
+        # 指标
+        self.ready_seconds = Histogram(READY_BUCKETS)
+        self.ready_seconds_max = 0.0
+        self.timed_out = 0
+        self.polls = 0
+
+    def watch(self, voice_manager: "VoiceManager", voice_id: str) -> None:
+        """开始跟踪一个刚提交克隆的音色"""
+        group_id = voice_manager.credentials[1]
+        with self._lock:
+            self._pending.setdefault(group_id, {})[voice_id] = PendingClone(
+                voice_id, voice_manager
+            )
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name="clone-watcher", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+
+    def pending(self, group_id: str) -> list[str]:
+        """返回仍在等待就绪的音色ID"""
+        with self._lock:
+            return list(self._pending.get(group_id, {}))
+
+    def notifications(self, group_id: str, seen: int = 0) -> tuple[list[str], int]:
+        """返回第 seen 条之后仍保留的通知以及新的已读位置"""
+        with self._lock:
+            messages = self._notifications.get(group_id, ())
+            total = self._notification_count.get(group_id, 0)
+            # 保留的第一条通知的位置
+            first = total - len(messages)
+            return list(messages)[max(seen - first, 0) :], total
+
+    def _notify(self, group_id: str, message: str) -> None:
+        self._notifications.setdefault(
+            group_id, deque(maxlen=NOTIFICATION_HISTORY)
+        ).append(message)
+        count = self._notification_count.get(group_id, 0)
+        self._notification_count[group_id] = count + 1
+
+    def _loop(self) -> None:
+        while True:
+            with self._lock:
+                if not any(self._pending.values()):
+                    self._thread = None
+                    return
+                next_check = min(
+                    clone.next_check
+                    for clones in self._pending.values()
+                    for clone in clones.values()
+                )
+            self._wakeup.wait(timeout=max(0.0, next_check - time.time()))
+            self._wakeup.clear()
+            self._tick()
+
+    def _tick(self) -> None:
+        now = time.time()
+        with self._lock:
+            # 到期的克隆按 Group ID 和凭据分组，每组用其中一个克隆的音色管理器请求一次
+            due: dict[tuple[str, str], list[PendingClone]] = {}
+            for group_id, clones in self._pending.items():
+                for clone in clones.values():
+                    if clone.next_check <= now:
+                        key = (group_id, clone.voice_manager.credential_key)
+                        due.setdefault(key, []).append(clone)
+        for (group_id, _), clones in due.items():
+            self._poll(group_id, clones)
+
+    def _poll(self, group_id: str, due: list[PendingClone]) -> None:
+        voice_manager = due[0].voice_manager
+        credential_key = voice_manager.credential_key
+        try:
+            voices = voice_manager.fetch_voices("clone")
+        except Exception:
+            voices = None
+        self.polls += 1
+        now = time.time()
+        if voices is not None:
+            voice_manager.store_voices("clone", voices)
+        available = {voice.voice_id for voice in voices or []}
+        due_ids = {clone.voice_id for clone in due}
+
+        with self._lock:
+            clones = self._pending.get(group_id, {})
+            # 相同凭据的等待中音色共用这一次列表请求，未到期的音色就绪时也一并处理
+            for voice_id, clone in list(clones.items()):
+                if clone.voice_manager.credential_key != credential_key:
+                    continue
+                if voice_id in available:
+                    elapsed = now - clone.submitted_at
+                    self.ready_seconds.observe(elapsed)
+                    self.ready_seconds_max = max(self.ready_seconds_max, elapsed)
+                    self._notify(
+                        group_id, f"🎉 音色 {voice_id} 已就绪（耗时 {elapsed:.0f} 秒）"
+                    )
+                    del clones[voice_id]
+                elif voice_id not in due_ids:
+                    continue
+                elif now - clone.submitted_at > WATCH_TIMEOUT:
+                    self.timed_out += 1
+                    self._notify(group_id, f"⚠️ 音色 {voice_id} 长时间未就绪，已停止跟踪")
+                    del clones[voice_id]
+                else:
+                    clone.backoff(now)
+            if not clones:
+                self._pending.pop(group_id, None)
+
+    def stats(self) -> dict:
+        """返回克隆就绪耗时等指标"""
+        with self._lock:
+            ready = self.ready_seconds.count
+            total = self.ready_seconds.sum
+            p50 = self.ready_seconds.quantile(0.5)
+            pending = sum(len(clones) for clones in self._pending.values())
+        return {
+            "pending": pending,
+            "ready": ready,
+            "timed_out": self.timed_out,
+            "polls": self.polls,
+            "ready_seconds_avg": round(total / ready, 1) if ready else None,
+            # 按桶估算，为所在桶的上界
+            "ready_seconds_p50": p50 if ready else None,
+            "ready_seconds_max": round(self.ready_seconds_max, 1) if ready else None,
+        }
+
+
+@st.cache_resource
+def get_clone_watcher() -> CloneWatcher:
+    """获取进程内共享的克隆状态监视器"""
+    return CloneWatcher()
+
+
+@st.fragment(run_every=WATCH_BASE_INTERVAL)
+def _poll_clone_watcher(voice_manager: "VoiceManager") -> None:
+    """等待克隆就绪期间定时检查通知"""
+    render_clone_watch_status(voice_manager, polling=True)
+
+
+def render_clone_watch_status(
+    voice_manager: "VoiceManager", polling: bool = False
+) -> None:
+    """显示等待就绪的克隆音色，并以提示消息推送就绪通知"""
+    watcher = voice_manager.clone_watcher
+    group_id = voice_manager.credentials[1]
+    if "clone_notifications_seen" not in st.session_state:
+        # 新会话不重复推送之前的通知
+        _, st.session_state.clone_notifications_seen = watcher.notifications(group_id)
+    messages, seen = watcher.notifications(
+        group_id, st.session_state.clone_notifications_seen
+    )
+    st.session_state.clone_notifications_seen = seen
+    if messages and polling:
+        # 有音色就绪时重跑应用，让音色选择器读取更新后的列表
+        st.session_state.clone_toasts = messages
+        st.rerun(scope="app")
+    for message in st.session_state.pop("clone_toasts", []) + messages:
+        st.toast(message)
+
+    pending = watcher.pending(group_id)
+    if pending:
+        st.caption(f"⏳ 等待就绪的音色: {', '.join(pending)}")
+
+
+def render_clone_watch_panel(voice_manager: "VoiceManager") -> None:
+    """克隆状态面板：有等待中的音色时定时轮询"""
+    if voice_manager.clone_watcher.pending(voice_manager.credentials[1]):
+        _poll_clone_watcher(voice_manager)
+    else:
+        render_clone_watch_status(voice_manager)
@@ -1,58 +1,196 @@
+import time
+
 import streamlit as st
-import pandas as pd
-from pydantic import BaseModel
+
+from components.clone_watcher import get_clone_watcher
+from components.warmup import get_warmup
+from utils.metrics import get_metrics
+from utils.profiling import PROFILE_HISTORY, get_profile_history
+from utils.shared_store import current_session_id, get_shared_store
+from utils.singleflight import get_single_flight
+from utils.startup import import_timer
+from utils.state_inspect import change_token, describe, estimate_size, preview
+
+# 调试面板缓存会话状态摘要的键，自身不参与展示
+DEBUG_STATE_CACHE = "_debug_state_summaries"
 
 
 def display_debug_panel():
     """在 Streamlit 应用中显示一个用于调试的、可折叠的会话状态面板。"""
     if not st.session_state.get("debug_mode", False):
         return
+    import pandas as pd
 
     st.markdown("##### 🐞 Debug Panel")
 
+    # 各片段最近一次的渲染耗时
+    render_timings = st.session_state.get("render_timings", {})
+    if render_timings:
+        st.markdown("###### ⏱️ 区域渲染耗时 (ms)")
+        st.dataframe(
+            pd.Series(render_timings, name="耗时").sort_values(ascending=False),
+            use_container_width=True,
+        )
+
+    # 启动阶段与按需加载的导入耗时
+    if import_timer.active:
+        with st.expander("🚀 导入耗时", expanded=False):
+            st.code(import_timer.format_report() or "暂无记录", language=None)
+
+    # 服务启动预热
+    warmup = get_warmup()
+    if warmup.started:
+        with st.expander("🔥 启动预热", expanded=False):
+            st.caption("已就绪" if warmup.ready else "进行中")
+            st.dataframe(pd.DataFrame(warmup.report()), hide_index=True, use_container_width=True)
+
+    # 克隆就绪耗时
+    clone_stats = get_clone_watcher().stats()
+    if clone_stats["pending"] or clone_stats["ready"] or clone_stats["timed_out"]:
+        st.markdown("###### 🧬 克隆就绪指标")
+        st.json(clone_stats)
+
+    # 相同请求合并统计
+    flight_stats = get_single_flight().stats()
+    if flight_stats:
+        st.markdown("###### 🔀 请求合并")
+        st.dataframe(pd.DataFrame(flight_stats).T, use_container_width=True)
+
+    # 接口延迟、错误、流量和缓存命中率
+    metrics = get_metrics()
+    snapshot = metrics.snapshot()
+    with st.expander("📈 接口与渲染指标", expanded=False):
+        if snapshot["latency"]:
+            st.dataframe(pd.DataFrame(snapshot["latency"]).T, use_container_width=True)
+        if snapshot["errors"]:
+            st.markdown("错误数")
+            st.dataframe(
+                pd.Series(snapshot["errors"], name="次数"), use_container_width=True
+            )
+        traffic = {
+            key: f"{size / 1024:.1f} KB" for key, size in snapshot["bytes"].items()
+        }
+        st.caption(
+            f"合成字数: {snapshot['characters']} | "
+            + " | ".join(f"{key}: {value}" for key, value in traffic.items())
+        )
+        st.dataframe(pd.DataFrame(snapshot["caches"]).T, use_container_width=True)
+        if snapshot["locks"]:
+            st.markdown("锁争用")
+            st.dataframe(pd.DataFrame(snapshot["locks"]).T, use_container_width=True)
+        st.download_button(
+            "导出 Prometheus 指标",
+            metrics.to_prometheus(),
+            file_name="voicehub_metrics.prom",
+            mime="text/plain",
+        )
+
+    # 共享数据仓库和进程内存
+    store = get_shared_store()
+    store.evict_idle()
+    report = store.report()
+    with st.expander("🧠 共享数据与内存", expanded=False):
+        resident = report["resident_bytes"]
+        if resident is not None:
+            st.caption(f"进程常驻内存: {resident / 1024 / 1024:.1f} MB")
+        st.caption(
+            f"共享数据: {report['shared_bytes'] / 1024 / 1024:.1f} MB | "
+            f"若各会话各存一份: {report['unshared_bytes'] / 1024 / 1024:.1f} MB | "
+            f"已淘汰: {report['evictions']}"
+        )
+        if report["entries"]:
+            st.dataframe(
+                pd.DataFrame(report["entries"]), hide_index=True, use_container_width=True
+            )
+        if report["sessions"]:
+            current = current_session_id()
+            st.dataframe(
+                pd.Series(
+                    {
+                        ("当前会话" if session_id == current else session_id[:8]): size
+                        / 1024
+                        for session_id, size in report["sessions"].items()
+                    },
+                    name="引用共享数据(KB)",
+                ),
+                use_container_width=True,
+            )
+
+    # 逐次重跑性能分析
+    with st.expander("🔬 重跑性能分析", expanded=False):
+        st.toggle(
+            f"采集每次重跑（保留最近 {PROFILE_HISTORY} 次）",
+            key="profile_reruns",
+            help="打开后从下一次重跑开始采集，会拖慢页面",
+        )
+        profiles = list(get_profile_history())
+        if profiles:
+            index = st.selectbox(
+                "选择重跑",
+                range(len(profiles) - 1, -1, -1),
+                format_func=lambda i: (
+                    f"{time.strftime('%H:%M:%S', time.localtime(profiles[i].started_at))}"
+                    f" | {profiles[i].scope} | {profiles[i].total_ms:.0f} ms"
+                ),
+                key="profile_index",
+            )
+            profile = profiles[index]
+            if profile.render_ms:
+                st.dataframe(
+                    pd.Series(profile.render_ms, name="累计耗时(ms)"),
+                    use_container_width=True,
+                )
+            st.dataframe(
+                pd.DataFrame(profile.hotspots), hide_index=True, use_container_width=True
+            )
+            st.download_button(
+                "下载原始分析数据 (.prof)",
+                profile.raw,
+                file_name=f"rerun_{int(profile.started_at)}.prof",
+                mime="application/octet-stream",
+                help="可用 python -m pstats 或 snakeviz 打开",
+            )
+
     # 添加筛选输入框
     filter_text = st.text_input(
         "筛选 Session State 参数", key="debug_panel_filter"
     ).lower()
 
-    # 创建一个可供st.json使用的字典副本
-    state_dict = {}
-    for key, value in st.session_state.items():
-        # 应用筛选
-        if filter_text and type(key) is str and filter_text not in key.lower():
+    # 每个键只显示一行摘要，摘要按键缓存，对象身份或长度不变时不重新估算
+    cache = st.session_state.setdefault(DEBUG_STATE_CACHE, {})
+    rows = []
+    for key, value in list(st.session_state.items()):
+        if key == DEBUG_STATE_CACHE:
+            continue
+        key = str(key)
+        if filter_text and filter_text not in key.lower():
             continue
+        token = change_token(value)
+        cached = cache.get(key)
+        if cached is None or cached[0] != token:
+            cached = cache[key] = (token, describe(value), estimate_size(value))
+        rows.append({"键": key, "类型": cached[1], "估计大小(KB)": cached[2] / 1024})
+    # 清理已不存在的键
+    for key in set(cache) - {str(key) for key in st.session_state.keys()}:
+        del cache[key]
 
-        # 对特殊对象进行处理，以便能够被json序列化
-        if isinstance(value, pd.DataFrame):
-            state_dict[key] = f"DataFrame with {len(value)} rows"
-        elif hasattr(value, "__dict__"):
-            if isinstance(value, BaseModel):
-                try:
-                    state_dict[key] = value.model_dump()
-                except Exception:
-                    state_dict[key] = (
-                        f"Pydantic model of type {type(value).__name__}, could not be serialized"
-                    )
-            else:
-                try:
-                    # 排除内置或大型属性
-                    simple_dict = {
-                        k: v
-                        for k, v in value.__dict__.items()
-                        if not k.startswith("_") and not isinstance(v, (pd.DataFrame))
-                    }
-                    state_dict[key] = (
-                        simple_dict
-                        if simple_dict
-                        else f"Object of type {type(value).__name__}"
-                    )
-                except Exception:
-                    state_dict[key] = (
-                        f"Object of type {type(value).__name__}, not serializable"
-                    )
-        else:
-            state_dict[key] = value
-
-    st.json(state_dict, expanded=True)
-    st.markdown("---")
+    if not rows:
+        st.markdown("---")
+        return
+    summary = pd.DataFrame(rows).sort_values("估计大小(KB)", ascending=False)
+    st.dataframe(
+        summary,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "估计大小(KB)": st.column_config.NumberColumn(format="%.1f"),
+        },
+    )
 
+    # 按需展开单个键，深度和元素数都有上限
+    selected = st.selectbox(
+        "展开查看", [None, *summary["键"]], key="debug_panel_expand"
+    )
+    if selected is not None and selected in st.session_state:
+        st.json(preview(st.session_state[selected]), expanded=True)
+    st.markdown("---")
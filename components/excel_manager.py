@@ -1,20 +1,158 @@
 import streamlit as st
-import pandas as pd
-from pathlib import Path
 
-from utils.excel import load_excel_data
-from utils.naming import convert_to_pinyin
+from components.audio_parameters import apply_cast_params
+from components.prefetch import DEFAULT_PREFETCH_DEPTH, get_prefetcher
+from components.script_export import render_script_export
+from components.voice_manager import VoiceManager
+from utils.casting import (
+    CHARACTERS_NAMESPACE,
+    EMOTIONS,
+    LANGUAGE_BOOSTS,
+    get_casting_map,
+    script_characters,
+)
+from utils.excel import (
+    EXAMPLE_SCRIPT_PATH,
+    clear_script,
+    get_script_data,
+    has_script,
+    load_script,
+    timecode_to_frames,
+)
+from utils.render_ledger import make_row_key
+from utils.shared_store import get_shared_store
+from utils.timing import timed_render
 
+# 选角表编辑器的参数列
+CAST_PARAM_LABELS = {
+    "speed": "语速",
+    "volume": "音量",
+    "pitch": "音调",
+    "emotion": "情感",
+    "language_boost": "语言增强",
+}
 
-def render_excel_manager():
-    """渲染Excel管理器"""
+
+def _seed_casting(voice_manager: VoiceManager, characters: list[str]) -> None:
+    """剧本或克隆音色列表变化后，为未选角的角色自动匹配音色"""
+    group_id = voice_manager.group_id
+    voice_manager.get_voices()
+    token = (
+        st.session_state.get("excel_data_key"),
+        group_id,
+        voice_manager.catalog.version(group_id, "clone", voice_manager.credential_key),
+    )
+    if st.session_state.get("casting_seed_token") == token:
+        return
+    seeded = get_casting_map().seed(
+        group_id, characters, voice_manager.voice_index.search(group_id, "clone")
+    )
+    if seeded:
+        st.toast(f"已自动为 {seeded} 个角色匹配音色")
+    st.session_state.casting_seed_token = token
+
+
+def _render_casting_editor(voice_manager: VoiceManager, characters: list[str]) -> None:
+    """编辑剧本角色的音色和默认参数"""
+    import pandas as pd
+
+    group_id = voice_manager.group_id
+    casting = get_casting_map()
+    entries = casting.entries(group_id)
+    assigned = sum(name in entries for name in characters)
+    with st.expander("🎭 选角表"):
+        table = pd.DataFrame(
+            [
+                {
+                    "角色": name,
+                    "音色ID": entries[name].voice_id if name in entries else None,
+                    "匹配方式": (
+                        ("自动" if entries[name].source == "auto" else "手动")
+                        if name in entries
+                        else ""
+                    ),
+                    **{
+                        label: (
+                            entries[name].params.get(param) if name in entries else None
+                        )
+                        for param, label in CAST_PARAM_LABELS.items()
+                    },
+                }
+                for name in characters
+            ],
+            columns=["角色", "音色ID", "匹配方式", *CAST_PARAM_LABELS.values()],
+        )
+        voice_ids = [
+            voice.voice_id
+            for voice in voice_manager.voice_index.search(
+                group_id, "clone", sort="音色ID (A-Z)"
+            )
+        ]
+        st.caption(
+            f"{len(characters)} 个角色，已分配 {assigned} 个。"
+            "音色ID留空表示不分配；参数留空时沿用界面上的参数"
+        )
+        st.data_editor(
+            table,
+            column_config={
+                "音色ID": st.column_config.SelectboxColumn(options=voice_ids),
+                "语速": st.column_config.NumberColumn(
+                    min_value=0.5, max_value=2.0, step=0.1
+                ),
+                "音量": st.column_config.NumberColumn(
+                    min_value=0.0, max_value=10.0, step=0.1
+                ),
+                "音调": st.column_config.NumberColumn(
+                    min_value=-12, max_value=12, step=1
+                ),
+                "情感": st.column_config.SelectboxColumn(options=EMOTIONS),
+                "语言增强": st.column_config.SelectboxColumn(options=LANGUAGE_BOOSTS),
+            },
+            disabled=["角色", "匹配方式"],
+            hide_index=True,
+            use_container_width=True,
+            key="casting_editor",
+        )
+        edited_rows = st.session_state.get("casting_editor", {}).get(
+            "edited_rows", {}
+        )
+        if st.button("💾 保存选角", disabled=not edited_rows):
+            failed = False
+            for row, changes in edited_rows.items():
+                values = {**table.iloc[int(row)].to_dict(), **changes}
+                try:
+                    casting.assign(
+                        group_id,
+                        values["角色"],
+                        values["音色ID"] or "",
+                        {
+                            param: (
+                                None
+                                if pd.isna(values[label]) or values[label] == ""
+                                else values[label]
+                            )
+                            for param, label in CAST_PARAM_LABELS.items()
+                        },
+                    )
+                except ValueError as e:
+                    st.error(f"{values['角色']}: {e}")
+                    failed = True
+            # 有无效参数时保留编辑内容，改正后再保存
+            if not failed:
+                del st.session_state["casting_editor"]
+                st.rerun(scope="fragment")
+
+
+@st.fragment
+@timed_render("Excel管理器")
+def render_excel_manager(voice_manager: VoiceManager):
+    """渲染Excel管理器（独立片段，交互时只重跑本区域）"""
 
     st.header("📖 Excel台本管理器")
 
     # --- 文件加载逻辑 ---
     # 路径设置
-    tools_dir = Path(__file__).parent.parent
-    example_excel_path = tools_dir / "example_voice_lines.xlsx"
+    example_excel_path = EXAMPLE_SCRIPT_PATH
 
     # 文件上传
     # --- 下载与加载示例 ---
@@ -40,36 +178,37 @@ def render_excel_manager():
             "🔄 加载示例台本（长空之王）", help="重新加载项目自带的示例Excel文件"
         ):
             if example_excel_path.exists():
-                st.session_state.excel_data = load_excel_data(str(example_excel_path))
-                st.session_state.excel_file_name = "示例文件"
+                load_script(example_excel_path, "示例文件")
                 st.success("🔄 已加载示例台本")
-                st.rerun()
+                st.rerun(scope="fragment")
             else:
                 st.error("示例文件 'example_voice_lines.xlsx' 不存在！")
-    # 处理文件加载
+    # 处理文件加载（同一个上传文件只解析一次，共享数据被淘汰且无法从源文件恢复时重新解析）
     if uploaded_file:
-        try:
-            st.session_state.excel_data = load_excel_data(uploaded_file)
-            st.session_state.excel_file_name = uploaded_file.name
-            st.success(f"✅ 已成功加载您上传的文件: {uploaded_file.name}")
-        except Exception as e:
-            st.error(f"加载文件失败: {e}")
-            st.session_state.excel_data = pd.DataFrame()  # 清空数据
-    else:
-        # 如果session中没有数据，尝试加载示例文件
-        if "excel_data" not in st.session_state:
-            if example_excel_path.exists():
-                st.session_state.excel_data = load_excel_data(example_excel_path)
-                st.session_state.excel_file_name = "示例文件"
-            else:
-                st.session_state.excel_data = pd.DataFrame()
-                st.session_state.excel_file_name = "无"
+        if (
+            st.session_state.get("excel_file_id") != uploaded_file.file_id
+            or get_script_data() is None
+        ):
+            st.session_state.excel_file_id = uploaded_file.file_id
+            try:
+                load_script(uploaded_file, uploaded_file.name)
+                st.success(f"✅ 已成功加载您上传的文件: {uploaded_file.name}")
+            except Exception as e:
+                st.error(f"加载文件失败: {e}")
+                clear_script()  # 清空数据
+    elif not has_script():
+        # 从未加载过剧本时才加载示例文件
+        if example_excel_path.exists():
+            load_script(example_excel_path, "示例文件")
+    elif get_script_data() is None:
+        st.warning("之前加载的剧本已失效且源文件无法读取，请重新上传或加载示例台本")
 
     st.divider()
 
     # --- 数据显示与交互 ---
-    if "excel_data" in st.session_state and not st.session_state.excel_data.empty:
-        df = st.session_state.excel_data
+    # 剧本由所有会话共享，只读
+    df = get_script_data()
+    if df is not None and not df.empty:
         file_name = st.session_state.get("excel_file_name", "未知文件")
 
         # 显示表格信息
@@ -77,6 +216,16 @@ def render_excel_manager():
             f"当前数据来源: **{file_name}** | 共 **{len(df)}** 行, **{len(df.columns)}** 列"
         )
 
+        # 选角表：角色名列表按剧本在所有会话间共享
+        characters = get_shared_store().get_or_create(
+            CHARACTERS_NAMESPACE,
+            st.session_state.get("excel_data_key"),
+            lambda: script_characters(df),
+        )
+        _seed_casting(voice_manager, characters)
+        _render_casting_editor(voice_manager, characters)
+        render_script_export(voice_manager, df)
+
         # 搜索功能
         col_search, col_clear = st.columns([3, 1])
         with col_search:
@@ -89,7 +238,31 @@ def render_excel_manager():
             if excel_search:
                 if st.button("🗑️ 清除搜索"):
                     st.session_state.excel_search = ""
-                    st.rerun()
+                    st.rerun(scope="fragment")
+
+        # 预取设置
+        col_prefetch, col_depth = st.columns([3, 1])
+        with col_prefetch:
+            st.toggle(
+                "⚡ 预取后续台词",
+                key="prefetch_enabled",
+                help="生成音频后，使用当前音色和参数在后台预先渲染接下来的几行",
+            )
+        with col_depth:
+            st.number_input(
+                "预取行数",
+                min_value=1,
+                max_value=10,
+                value=DEFAULT_PREFETCH_DEPTH,
+                key="prefetch_depth",
+                disabled=not st.session_state.get("prefetch_enabled", False),
+            )
+        if st.session_state.get("prefetch_enabled", False):
+            stats = get_prefetcher().stats()
+            st.caption(
+                f"预取命中率: {stats['hit_rate']:.0%} | 命中: {stats['hits']} | "
+                f"浪费请求: {stats['wasted']} | 等待中: {stats['pending']}"
+            )
 
         # 时间码筛选功能
         timecode_input = st.text_input(
@@ -98,13 +271,6 @@ def render_excel_manager():
             key="excel_timecode_filter",
         )
 
-        def timecode_to_frames(tc: str) -> int:
-            try:
-                h, m, s, f = map(int, tc.strip().split(":"))
-                return ((h * 60 + m) * 60 + s) * 24 + f
-            except (ValueError, IndexError):
-                return -1
-
         # --- 数据过滤 ---
         filtered_df = df
         if timecode_input:
@@ -179,16 +345,35 @@ def render_excel_manager():
                     if st.button(
                         f"🎯 选择第 {index + 1} 行", key=f"select_row_{index}"
                     ):
-                        pinyin_text = convert_to_pinyin(third_col)
-                        if pinyin_text:
-                            st.session_state.test_voice_search = pinyin_text
+                        # 按选角表直接选中角色的音色并套用默认参数
+                        character = third_col.strip()
+                        entry = get_casting_map().get(voice_manager.group_id, character)
+                        if entry:
+                            st.session_state.pop("test_voice_search", None)
+                            st.session_state.selected_clone_voice_option = entry.voice_id
+                            st.session_state.cast_voice_selected = True
+                            apply_cast_params(entry.params)
+                        else:
+                            # 未选角时按角色名在音色索引中搜索
+                            st.session_state.test_voice_search = character
+                        st.session_state.cast_character = character
+                        st.session_state.selected_row_key = make_row_key(
+                            row_data[0], fifth_col
+                        )
+                        st.session_state.selected_row_script = st.session_state.get(
+                            "excel_file_name", ""
+                        )
                         st.session_state.test_text = fifth_col
                         st.session_state.file_prefix = first_col_clean
+                        st.session_state.selected_row_position = df.index.get_loc(
+                            index
+                        )
                         st.session_state.active_tab = "测试音色"
                         st.success(
                             f"已选择第 {index + 1} 行数据，请切换到“测试音色”标签页查看。"
                         )
-                        st.rerun()
+                        # 选择行会影响测试页面，需要重跑整个应用
+                        st.rerun(scope="app")
 
                     st.divider()
         else:
@@ -0,0 +1,309 @@
+"""
+后台任务系统：克隆、合成和批量删除在线程池中执行，与脚本线程解耦
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable
+
+import streamlit as st
+
+from components.voice_manager import VoiceManager
+from utils.batch_journal import BatchJournal, hash_file_data
+from utils.spool import UploadSource
+from utils.tts_cache import make_tts_key
+
+if TYPE_CHECKING:
+    from utils.audio_preflight import PreflightOptions
+
+# 任务类型
+JOB_KINDS = {
+    "clone": "🧬 上传并克隆",
+    "tts": "🎵 合成",
+    "delete": "🗑️ 批量删除",
+}
+
+# 任务状态
+JOB_STATUS = {
+    "queued": "⏳ 排队中",
+    "running": "🔄 进行中",
+    "succeeded": "✅ 完成",
+    "failed": "❌ 失败",
+    "cancelled": "🚫 已取消",
+}
+
+# 界面轮询间隔（秒）
+JOB_POLL_INTERVAL = 1.0
+
+
+@dataclass
+class Job:
+    """后台任务"""
+
+    kind: str
+    label: str
+    owner: str = ""
+    status: str = "queued"
+    progress: float = 0.0
+    message: str = ""
+    result: Any = None
+    error: str = ""
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def report(self, progress: float, message: str = "") -> None:
+        """更新任务进度（在任务函数中调用）"""
+        self.progress = min(max(progress, 0.0), 1.0)
+        if message:
+            self.message = message
+
+
+class JobRegistry:
+    """后台任务注册表，进程内共享，页面重跑或刷新后任务仍可查询"""
+
+    def __init__(self, max_workers: int = 4, max_finished: int = 200) -> None:
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="voicehub-job"
+        )
+        self._jobs: dict[str, Job] = {}
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        label: str,
+        fn: Callable[..., Any],
+        *args,
+        owner: str = "",
+        **kwargs,
+    ) -> Job:
+        """提交任务，fn 的第一个参数为 Job 本身，返回值作为任务结果"""
+        job = Job(kind=kind, label=label, owner=owner)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._futures[job.job_id] = self._executor.submit(
+                self._run, job, fn, args, kwargs
+            )
+            self._prune()
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.progress = 1.0
+            job.status = "succeeded"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._futures.pop(job.job_id, None)
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def list(self, owner: str | None = None, kinds: list[str] | None = None) -> list[Job]:
+        """按创建时间倒序列出任务"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(
+            (
+                job
+                for job in jobs
+                if (owner is None or job.owner == owner)
+                and (kinds is None or job.kind in kinds)
+            ),
+            key=lambda job: job.created_at,
+            reverse=True,
+        )
+
+    def cancel(self, job_id: str) -> bool:
+        """取消尚未开始的任务"""
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None or not future.cancel():
+                return False
+            self._futures.pop(job_id, None)
+            job = self._jobs[job_id]
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        return True
+
+    def clear_finished(self, owner: str | None = None) -> None:
+        """清除已结束的任务"""
+        with self._lock:
+            for job_id, job in list(self._jobs.items()):
+                if job.done and (owner is None or job.owner == owner):
+                    del self._jobs[job_id]
+
+    def _prune(self) -> None:
+        finished = sorted(
+            (job for job in self._jobs.values() if job.done),
+            key=lambda job: job.finished_at or 0,
+        )
+        for job in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.job_id]
+
+
+@st.cache_resource
+def get_job_registry() -> JobRegistry:
+    """获取进程内共享的任务注册表"""
+    return JobRegistry()
+
+
+def job_owner(voice_manager: VoiceManager) -> str:
+    """任务归属：同一 Group ID 的会话共享任务列表"""
+    return voice_manager.credentials[1]
+
+
+def clone_job(
+    job: Job,
+    voice_manager: VoiceManager,
+    file_data: UploadSource,
+    file_name: str,
+    voice_id: str,
+    journal: BatchJournal | None = None,
+    batch_id: str = "",
+    preflight: "PreflightOptions | None" = None,
+    **clone_kwargs,
+) -> dict:
+    """
+    任务函数：上传音频文件并提交克隆；传入批量日志时跳过已完成的步骤
+    file_data 可直接传入上传的文件对象，只在任务执行时才写出临时文件，
+    同时占用的临时空间受线程池大小限制而不随批次文件数增长；
+    传入 preflight 时在上传前按预检选项重新处理音频（会话中只保存预检结果）
+    """
+    file_hash = hash_file_data(file_data) if journal else ""
+    entry = journal.get_entry(batch_id, file_hash, voice_id) if journal else None
+
+    if entry and entry.status == "cloning":
+        # 上次提交克隆后中断，结果未知：音色已存在则视为完成
+        voices = voice_manager.fetch_voices("clone") or []
+        if any(voice.voice_id == voice_id for voice in voices):
+            journal.record_cloned(batch_id, file_hash, voice_id)
+            entry.status = "cloned"
+    if entry and entry.status == "cloned":
+        job.report(1.0, f"{file_name} -> {voice_id}（已完成，跳过）")
+        return {"file_id": entry.file_id, "voice_id": voice_id, "skipped": True}
+
+    try:
+        if entry and entry.file_id is not None:
+            file_id = entry.file_id
+            job.report(0.5, f"文件已上传，ID: {file_id}，正在提交克隆")
+        else:
+            upload_name = file_name
+            if preflight is not None:
+                from utils.audio_preflight import process_upload
+
+                job.report(0.05, f"正在处理 {file_name}")
+                processed, upload_name = process_upload(file_data, file_name, preflight)
+                file_data = processed if processed is not None else file_data
+            job.report(0.1, f"正在上传 {upload_name}")
+            file_id = voice_manager.upload_file(file_data, upload_name)
+            if journal:
+                journal.record_upload(batch_id, file_hash, voice_id, file_id)
+            job.report(0.5, f"文件上传成功，ID: {file_id}，正在提交克隆")
+
+        if journal:
+            journal.record_clone_submitted(batch_id, file_hash, voice_id)
+        voice_manager.submit_clone(file_id=file_id, voice_id=voice_id, **clone_kwargs)
+        if journal:
+            journal.record_cloned(batch_id, file_hash, voice_id)
+    except Exception as e:
+        if journal:
+            journal.record_failure(batch_id, file_hash, voice_id, str(e))
+        raise
+    job.report(1.0, f"{file_name} -> {voice_id}")
+    return {"file_id": file_id, "voice_id": voice_id, "skipped": False}
+
+
+def tts_job(
+    job: Job, voice_manager: VoiceManager, voice_id: str, text: str, **tts_params
+) -> bytes:
+    """任务函数：合成音频并写入 TTS 缓存"""
+    job.report(0.1, "正在生成音频")
+    cache = voice_manager.tts_cache
+    key = make_tts_key(
+        voice_id, text, credential=voice_manager.credential_key, **tts_params
+    )
+    audio_data = cache.get(key)
+    if audio_data is None:
+        audio_data = voice_manager.synthesize(voice_id=voice_id, text=text, **tts_params)
+        cache.put(key, audio_data)
+    return audio_data
+
+
+def delete_job(job: Job, voice_manager: VoiceManager, voice_ids: list[str]) -> dict:
+    """任务函数：批量删除音色"""
+    deleted, failed = [], {}
+    for i, voice_id in enumerate(voice_ids):
+        job.report(i / len(voice_ids), f"正在删除 {voice_id}")
+        try:
+            voice_manager.remove_voice(voice_id)
+            deleted.append(voice_id)
+        except Exception as e:
+            failed[voice_id] = str(e)
+    job.report(1.0, f"成功删除 {len(deleted)} 个，失败 {len(failed)} 个")
+    return {"deleted": deleted, "failed": failed}
+
+
+def _render_job_rows(jobs: list[Job]) -> None:
+    for job in jobs:
+        status = JOB_STATUS[job.status]
+        st.markdown(f"**{JOB_KINDS.get(job.kind, job.kind)}** · {job.label} · {status}")
+        if not job.done:
+            st.progress(job.progress, text=job.message or None)
+        elif job.status == "failed":
+            st.caption(f"❌ {job.error}")
+        elif job.message:
+            st.caption(job.message)
+
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def _poll_jobs(job_ids: list[str]) -> None:
+    """轮询进行中的任务，全部结束后重跑应用以展示结果"""
+    registry = get_job_registry()
+    jobs = [job for job in map(registry.get, job_ids) if job is not None]
+    _render_job_rows(jobs)
+    if all(job.done for job in jobs):
+        st.rerun(scope="app")
+
+
+def render_job_status(job_ids: list[str]) -> list[Job]:
+    """显示指定任务的状态，有任务未结束时自动轮询"""
+    registry = get_job_registry()
+    jobs = [job for job in map(registry.get, job_ids) if job is not None]
+    if any(not job.done for job in jobs):
+        _poll_jobs([job.job_id for job in jobs])
+    else:
+        _render_job_rows(jobs)
+    return jobs
+
+
+def render_job_panel(voice_manager: VoiceManager, limit: int = 10) -> None:
+    """后台任务面板"""
+    registry = get_job_registry()
+    owner = job_owner(voice_manager)
+    jobs = registry.list(owner=owner)
+    if not jobs:
+        return
+    st.subheader("📋 后台任务")
+    render_job_status([job.job_id for job in jobs[:limit]])
+    if any(job.done for job in jobs):
+        if st.button("🧹 清除已结束的任务"):
+            registry.clear_finished(owner)
+            st.rerun()
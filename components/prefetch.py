@@ -0,0 +1,162 @@
+"""
+剧本台词预取器
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import streamlit as st
+
+from components.voice_manager import VoiceManager
+from utils.excel import CHARACTER_COLUMN, TEXT_COLUMN, get_script_data
+from utils.tts_cache import make_tts_key
+
+# 预取默认行数
+DEFAULT_PREFETCH_DEPTH = 3
+
+
+@st.cache_resource
+def _get_prefetch_executor() -> ThreadPoolExecutor:
+    """所有会话共用的预取线程池"""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="tts-prefetch")
+
+
+class Prefetcher:
+    """在后台渲染接下来的几行台词，并把结果写入 TTS 缓存"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._pending: dict[str, Future] = {}
+        # 已预取但尚未被使用的缓存键
+        self._ready: set[str] = set()
+        # 已预取、未被使用且已不在预取窗口内的缓存键
+        self._stale: set[str] = set()
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.hits = 0
+
+    def schedule(
+        self,
+        voice_manager: VoiceManager,
+        lines: list[tuple[str, str, dict]],
+        current_key: str = "",
+    ) -> None:
+        """
+        提交后续台词的预取任务，已缓存或正在预取的台词会被跳过
+        :param lines: 每行台词的（音色ID, 文本, 合成参数）
+        :param current_key: 当前行的缓存键，见 retain
+        """
+        cache = voice_manager.tts_cache
+        executor = _get_prefetch_executor()
+        keys = [
+            make_tts_key(voice_id, text, credential=voice_manager.credential_key, **params)
+            for voice_id, text, params in lines
+        ]
+        self.retain(keys, current_key)
+        with self._lock:
+            for key, (voice_id, text, params) in zip(keys, lines):
+                if not text.strip() or key in self._pending or cache.contains(key):
+                    continue
+                future = executor.submit(
+                    self._render, voice_manager, key, voice_id, text, params
+                )
+                self._pending[key] = future
+                self.submitted += 1
+
+    def retain(self, keys: list[str], current_key: str = "") -> None:
+        """
+        取消不在预取窗口内的待处理任务（选择或参数变化时调用）；
+        预取窗口从当前行之后开始，当前行可能正是上次预取的行，其缓存键 current_key
+        也保留在窗口内，不取消其任务也不计为浪费
+        """
+        wanted = set(keys)
+        if current_key:
+            wanted.add(current_key)
+        with self._lock:
+            for key in list(self._pending):
+                if key not in wanted and self._pending[key].cancel():
+                    del self._pending[key]
+                    self.cancelled += 1
+            stale = self._ready - wanted
+            self._ready -= stale
+            self._stale |= stale
+
+    def cancel(self) -> None:
+        """取消全部待处理的预取任务"""
+        self.retain([])
+
+    def consume(self, key: str) -> None:
+        """记录一次预取命中"""
+        with self._lock:
+            if key in self._ready or key in self._stale:
+                self._ready.discard(key)
+                self._stale.discard(key)
+                self.hits += 1
+
+    def _render(
+        self,
+        voice_manager: VoiceManager,
+        key: str,
+        voice_id: str,
+        text: str,
+        params: dict,
+    ) -> None:
+        try:
+            audio_data = voice_manager.synthesize(voice_id=voice_id, text=text, **params)
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+                self.failed += 1
+            return
+        voice_manager.tts_cache.put(key, audio_data)
+        with self._lock:
+            self._pending.pop(key, None)
+            self._ready.add(key)
+            self.completed += 1
+
+    @property
+    def wasted(self) -> int:
+        """已发出请求但结果未被使用的预取数"""
+        return len(self._stale) + self.failed
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.completed if self.completed else 0.0
+
+    def stats(self) -> dict:
+        """返回预取统计信息"""
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "pending": len(self._pending),
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "hits": self.hits,
+                "wasted": self.wasted,
+                "hit_rate": round(self.hit_rate, 3),
+            }
+
+
+def get_prefetcher() -> Prefetcher:
+    """获取当前会话的预取器"""
+    if "prefetcher" not in st.session_state:
+        st.session_state.prefetcher = Prefetcher()
+    return st.session_state.prefetcher
+
+
+def get_upcoming_lines(count: int) -> list[tuple[str, str]]:
+    """返回当前选中行之后若干行台词的（角色名, 文本）"""
+    df = get_script_data()
+    position = st.session_state.get("selected_row_position")
+    if df is None or position is None or df.empty or len(df.columns) <= TEXT_COLUMN:
+        return []
+    import pandas as pd
+
+    upcoming = df.iloc[position + 1 : position + 1 + count, [CHARACTER_COLUMN, TEXT_COLUMN]]
+    return [
+        ("" if pd.isna(character) else str(character).strip(), str(text))
+        for character, text in upcoming.itertuples(index=False)
+        if not pd.isna(text) and str(text).strip()
+    ]
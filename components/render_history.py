@@ -0,0 +1,275 @@
+"""
+渲染记录与试听/成片两档渲染
+"""
+
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+from components.jobs import Job, get_job_registry, job_owner, render_job_status, tts_job
+from components.voice_manager import VoiceManager
+from utils.naming import build_audio_filename
+from utils.tts_cache import get_tts_cache, make_tts_key
+
+# 渲染档位：试听追求低延迟和低带宽，成片使用交付质量
+RENDER_TIERS = {
+    "preview": {"label": "⚡ 快速试听", "sample_rate": 24000, "bitrate": 64000},
+    "final": {"label": "🎬 成片质量", "sample_rate": 44100, "bitrate": 256000},
+}
+
+
+def tier_model(model: str, tier: str) -> str:
+    """返回指定档位实际使用的模型（试听用 turbo，成片用 hd）"""
+    if tier == "preview":
+        return model.replace("-hd", "-turbo")
+    return model.replace("-turbo", "-hd")
+
+
+def tier_params(params: dict, tier: str) -> dict:
+    """在基础参数上套用档位的模型、采样率和比特率"""
+    return {
+        **params,
+        "model": tier_model(params["model"], tier),
+        "sample_rate": RENDER_TIERS[tier]["sample_rate"],
+        "bitrate": RENDER_TIERS[tier]["bitrate"],
+    }
+
+
+@dataclass
+class RenderRecord:
+    """一次渲染的记录"""
+
+    voice_id: str
+    text: str
+    # 未套用档位的基础参数（语速、音量、音调、情感、语言增强、模型）
+    params: dict
+    tier: str
+    file_prefix: str = ""
+    # 对应的剧本（文件名）、剧本行（时间码 + 台词哈希）和角色，渲染完成后记入渲染台账
+    script: str = ""
+    row_key: str = ""
+    character: str = ""
+    # 渲染时的凭据摘要，参与 TTS 缓存键
+    credential: str = ""
+    status: str = "done"
+    approved: bool = False
+    error: str = ""
+    # 试听记录对应的成片记录ID
+    final_id: str = ""
+    # 后台合成任务ID
+    job_id: str = ""
+    record_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def tts_params(self) -> dict:
+        return tier_params(self.params, self.tier)
+
+    @property
+    def cache_key(self) -> str:
+        return make_tts_key(
+            self.voice_id, self.text, credential=self.credential, **self.tts_params
+        )
+
+    @property
+    def filename(self) -> str:
+        return build_audio_filename(
+            self.voice_id, self.text, self.file_prefix, **self.tts_params
+        )
+
+
+def get_render_history() -> list[RenderRecord]:
+    """获取当前会话的渲染记录"""
+    if "render_history" not in st.session_state:
+        st.session_state.render_history = []
+    return st.session_state.render_history
+
+
+def add_render_record(record: RenderRecord) -> RenderRecord:
+    """追加一条渲染记录"""
+    get_render_history().append(record)
+    return record
+
+
+def find_render_record(record_id: str) -> RenderRecord | None:
+    """按ID查找渲染记录"""
+    for record in get_render_history():
+        if record.record_id == record_id:
+            return record
+    return None
+
+
+def record_take(
+    voice_manager: VoiceManager, record: RenderRecord, audio_data: bytes
+) -> None:
+    """剧本行的渲染结果写入渲染台账（可在后台线程中调用）"""
+    if record.row_key:
+        voice_manager.render_ledger.record(
+            voice_manager.group_id,
+            record.script,
+            record.row_key,
+            record.character,
+            record.voice_id,
+            record.tts_params,
+            record.tier,
+            audio_data,
+            record.filename,
+        )
+
+
+def _render_record_job(
+    job: Job, voice_manager: VoiceManager, record: RenderRecord
+) -> bytes:
+    try:
+        audio_data = tts_job(
+            job, voice_manager, record.voice_id, record.text, **record.tts_params
+        )
+    except Exception as e:
+        record.status = "failed"
+        record.error = str(e)
+        raise
+    record_take(voice_manager, record, audio_data)
+    record.status = "done"
+    return audio_data
+
+
+def submit_render(voice_manager: VoiceManager, record: RenderRecord) -> Job:
+    """把渲染记录提交为后台合成任务"""
+    record.status = "pending"
+    job = get_job_registry().submit(
+        "tts",
+        f"{RENDER_TIERS[record.tier]['label']} {record.voice_id}: {record.text[:20]}",
+        _render_record_job,
+        voice_manager,
+        record,
+        owner=job_owner(voice_manager),
+    )
+    record.job_id = job.job_id
+    return job
+
+
+def finalize_records(
+    voice_manager: VoiceManager, records: list[RenderRecord]
+) -> list[RenderRecord]:
+    """以成片质量在后台重新渲染给定的试听记录，返回新建的成片记录"""
+    finals = []
+    for record in records:
+        if record.tier != "preview" or record.final_id:
+            continue
+        final = add_render_record(
+            RenderRecord(
+                voice_id=record.voice_id,
+                text=record.text,
+                params=record.params,
+                tier="final",
+                file_prefix=record.file_prefix,
+                script=record.script,
+                row_key=record.row_key,
+                character=record.character,
+                credential=record.credential,
+                approved=True,
+            )
+        )
+        record.final_id = final.record_id
+        submit_render(voice_manager, final)
+        finals.append(final)
+    return finals
+
+
+def render_record_result(
+    voice_manager: VoiceManager, record: RenderRecord, key_prefix: str = ""
+) -> None:
+    """显示一条渲染记录的结果：进行中时轮询任务，完成后播放和下载"""
+    if record.status == "pending":
+        render_job_status([record.job_id])
+        return
+    if record.status == "failed":
+        st.error(f"渲染失败: {record.error}")
+        return
+    audio_data = get_tts_cache().get(record.cache_key)
+    if audio_data is None:
+        st.warning("音频缓存已失效，请重新生成")
+        return
+    st.audio(audio_data, format="audio/mp3")
+    col_download, col_single = st.columns(2)
+    with col_download:
+        st.download_button(
+            label="📥 下载音频",
+            data=audio_data,
+            file_name=record.filename,
+            mime="audio/mp3",
+            key=f"{key_prefix}download_{record.record_id}",
+        )
+    with col_single:
+        if record.tier == "preview" and not record.final_id:
+            if st.button(
+                "🎬 定稿此条", key=f"{key_prefix}finalize_{record.record_id}"
+            ):
+                record.approved = True
+                finalize_records(voice_manager, [record])
+                st.rerun(scope="fragment")
+
+
+def render_render_history(voice_manager: VoiceManager):
+    """渲染记录面板"""
+    history = get_render_history()
+    if not history:
+        return
+    import pandas as pd
+
+    st.markdown("#### 🗂️ 渲染记录")
+    records = {record.record_id: record for record in history}
+    table = pd.DataFrame(
+        [
+            {
+                "ID": record.record_id,
+                "时间": time.strftime("%H:%M:%S", time.localtime(record.created_at)),
+                "前缀": record.file_prefix,
+                "音色": record.voice_id,
+                "文本": record.text,
+                "档位": RENDER_TIERS[record.tier]["label"],
+                "状态": record.status,
+                "通过": record.approved,
+            }
+            for record in history
+        ]
+    )
+    edited = st.data_editor(
+        table,
+        hide_index=True,
+        disabled=[column for column in table.columns if column != "通过"],
+        key="render_history_editor",
+    )
+    for record_id, approved in zip(edited["ID"], edited["通过"]):
+        records[record_id].approved = bool(approved)
+
+    approved_previews = [
+        record
+        for record in history
+        if record.tier == "preview" and record.approved and not record.final_id
+    ]
+    pending = sum(1 for record in history if record.status == "pending")
+
+    if st.button(
+        f"🎬 定稿全部已通过的试听 ({len(approved_previews)})",
+        disabled=not approved_previews,
+        help="以成片质量在后台重新渲染相同的文本和参数",
+    ):
+        finals = finalize_records(voice_manager, approved_previews)
+        st.success(f"已提交 {len(finals)} 条成片渲染任务")
+        st.rerun(scope="fragment")
+    if pending:
+        st.caption(f"⏳ {pending} 条正在后台渲染，可在后台任务中查看进度")
+
+    selected_id = st.selectbox(
+        "查看渲染结果",
+        options=[record.record_id for record in reversed(history)],
+        format_func=lambda record_id: (
+            f"{record_id} | {RENDER_TIERS[records[record_id].tier]['label']} | "
+            f"{records[record_id].text[:20]}"
+        ),
+        key="render_history_selected",
+    )
+    render_record_result(voice_manager, records[selected_id], key_prefix="history_")
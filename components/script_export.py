@@ -0,0 +1,204 @@
+"""
+剧本渲染进度与导出
+"""
+
+import datetime
+import time
+from pathlib import Path
+
+import streamlit as st
+
+from components.voice_manager import VoiceManager
+from utils.bwf_export import export_conform
+from utils.render_ledger import export_path, group_export_dir, script_row_keys
+from utils.shared_store import get_shared_store
+from utils.take_archive import filter_takes, split_available, write_archive
+
+# 超过该大小的文件不提供页面下载（页面下载会把文件读入内存），请从导出路径或命令行获取
+DOWNLOAD_LIMIT = 20 * 1024 * 1024
+
+
+def render_file_download(
+    path: Path, key: str, label: str, mime: str | None = None
+) -> bool:
+    """
+    页面下载导出文件：点击"准备下载"后才把文件读入内存，下载后清除；
+    超过 DOWNLOAD_LIMIT 的文件不提供页面下载，返回 False 由调用方提示获取方式
+    """
+    if path.stat().st_size > DOWNLOAD_LIMIT:
+        return False
+    prepared_key = f"{key}_prepared"
+    if st.session_state.get(prepared_key) != str(path):
+        if not st.button("📥 准备下载", key=f"{key}_prepare"):
+            return True
+        st.session_state[prepared_key] = str(path)
+    st.download_button(
+        label,
+        data=path.read_bytes(),
+        file_name=path.name,
+        mime=mime,
+        key=key,
+        on_click=lambda: st.session_state.pop(prepared_key, None),
+    )
+    return True
+
+
+def render_script_export(voice_manager: VoiceManager, df) -> None:
+    """剧本的渲染覆盖情况和带渲染信息的剧本导出"""
+    script_key = st.session_state.get("excel_data_key", "")
+    script = st.session_state.get("excel_file_name", "")
+    # 行键按剧本在所有会话间共享
+    row_keys = get_shared_store().get_or_create(
+        "script_row_keys", script_key, lambda: script_row_keys(df)
+    )
+    ledger = voice_manager.render_ledger
+    try:
+        export_dir = group_export_dir(voice_manager.group_id)
+    except ValueError as e:
+        st.error(str(e))
+        return
+
+    with st.expander("📒 渲染台账与导出"):
+        coverage = ledger.coverage(voice_manager.group_id, script, row_keys)
+        col_rows, col_rendered, col_duration = st.columns(3)
+        col_rows.metric("台词行数", coverage["rows"])
+        col_rendered.metric(
+            "已渲染",
+            coverage["rendered"],
+            f"{coverage['rendered'] / coverage['rows']:.0%}" if coverage["rows"] else None,
+            delta_color="off",
+        )
+        col_duration.metric("已渲染时长", f"{coverage['duration']:.1f} 秒")
+        store = ledger.store.stats()
+        if store["skipped"] or store["linked"]:
+            st.caption(
+                f"渲染去重：跳过 {store['skipped']} 个已有文件，"
+                f"硬链接 {store['linked']} 个相同的渲染，"
+                f"节省 {store['bytes_saved'] / 1024 / 1024:.1f} MB"
+            )
+
+        file_stem = Path(st.session_state.get("excel_file_name", "script")).stem
+        col_format, col_path = st.columns([1, 3])
+        with col_format:
+            export_format = st.radio(
+                "导出格式", ["xlsx", "csv"], horizontal=True, key="ledger_export_format"
+            )
+        with col_path:
+            export_name = st.text_input(
+                "导出文件名",
+                value=f"{file_stem}_渲染台账.{export_format}",
+                help=f"保存在 {export_dir} 中；再次导出到同一文件时只写入上次导出后渲染过的行",
+                key=f"ledger_export_name_{export_format}",
+            )
+        try:
+            path = export_path(export_name, export_format, voice_manager.group_id)
+        except ValueError as e:
+            st.error(str(e))
+            path = None
+        if st.button("📤 导出带渲染信息的剧本", disabled=path is None):
+            try:
+                written = ledger.export(
+                    df, script_key, path, voice_manager.group_id, script
+                )
+            except Exception as e:
+                st.error(f"导出失败: {e}")
+            else:
+                st.success(f"已写入 {written} 行到 {path}")
+        if path is not None and path.is_file():
+            if not render_file_download(path, "ledger_export_download", "📥 下载导出文件"):
+                st.info(f"导出文件较大，请直接从 {path} 获取")
+
+    render_take_archive(voice_manager, script, row_keys, export_dir)
+
+
+def render_take_archive(
+    voice_manager: VoiceManager, script: str, row_keys: list[str], export_dir: Path
+) -> None:
+    """
+    按角色、时间码和渲染日期筛选渲染结果，打包为 zip 保存到分组的导出目录 export_dir；
+    默认只包含当前剧本现有各行的渲染，可改为当前分组下所有剧本
+    """
+    ledger = voice_manager.render_ledger
+    with st.expander("📦 批量导出音频"):
+        current_only = st.toggle(
+            "只导出当前剧本",
+            value=True,
+            help="关闭后包含当前分组下所有剧本的渲染",
+            key="archive_current_script",
+        )
+        scope = {"group_id": voice_manager.group_id}
+        if current_only:
+            scope["script"] = script
+        characters = st.multiselect(
+            "角色", ledger.characters(**scope), key="archive_characters"
+        )
+        col_from, col_to = st.columns(2)
+        with col_from:
+            timecode_from = st.text_input(
+                "起始时间码", placeholder="00:00:00:00", key="archive_tc_from"
+            )
+        with col_to:
+            timecode_to = st.text_input(
+                "结束时间码", placeholder="01:00:00:00", key="archive_tc_to"
+            )
+        dates = st.date_input("渲染日期", value=(), key="archive_dates")
+        since = until = None
+        if len(dates) >= 1:
+            since = time.mktime(dates[0].timetuple())
+            last_day = dates[-1] + datetime.timedelta(days=1)
+            until = time.mktime(last_day.timetuple())
+
+        takes = ledger.query(characters or None, since, until, **scope)
+        if current_only:
+            # 剧本修改后已删除或改写的行不再导出
+            current_rows = set(row_keys)
+            takes = [take for take in takes if take.row_key in current_rows]
+        takes, missing = split_available(
+            filter_takes(takes, timecode_from, timecode_to)
+        )
+        st.caption(
+            f"符合条件 {len(takes)} 条，共 {sum(take.duration for take in takes):.1f} 秒"
+            + (f"；{len(missing)} 条音频文件已丢失" if missing else "")
+        )
+        if st.button("📦 生成压缩包", disabled=not takes):
+            path = export_dir / f"takes_{time.strftime('%Y%m%d_%H%M%S')}.zip"
+            # 行号只对当前剧本有意义
+            row_numbers = (
+                {key: index + 1 for index, key in enumerate(row_keys)}
+                if current_only
+                else None
+            )
+            with st.spinner(f"正在打包 {len(takes)} 条音频..."):
+                size = write_archive(takes, path, row_numbers)
+            st.session_state.take_archive_path = str(path)
+            st.success(f"已生成 {path}（{size / 1024 / 1024:.1f} MB）")
+
+        if st.button(
+            "🎞️ 导出 BWF 与 OTIO 时间线",
+            disabled=not takes,
+            help="转换为带时间码的 Broadcast WAV（48kHz），并生成按时间码排布的 OTIO 时间线，需要 ffmpeg",
+        ):
+            name = f"conform_{time.strftime('%Y%m%d_%H%M%S')}"
+            with st.spinner(f"正在转换 {len(takes)} 条音频..."):
+                results, timeline_path = export_conform(takes, export_dir / name, name)
+            failed = [result for result in results if not result.ok]
+            st.success(
+                f"已转换 {len(results) - len(failed)} 条，时间线: {timeline_path}"
+            )
+            for result in failed[:10]:
+                st.warning(f"{result.timecode} {result.voice_id}: {result.error}")
+            if len(failed) > 10:
+                st.warning(f"另有 {len(failed) - 10} 条转换失败")
+
+        archive_path = st.session_state.get("take_archive_path")
+        if archive_path and Path(archive_path).exists():
+            if not render_file_download(
+                Path(archive_path),
+                "take_archive_download",
+                "📥 下载压缩包",
+                mime="application/zip",
+            ):
+                st.info(
+                    f"压缩包较大，请直接从 {archive_path} 获取，"
+                    "或使用 export_takes.py 在命令行导出"
+                )
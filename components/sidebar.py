@@ -5,7 +5,10 @@
 import os
 import streamlit as st
 
+from components.clone_watcher import render_clone_watch_panel
+from components.jobs import render_job_panel
 from components.voice_manager import VoiceManager
+from components.warmup import render_warmup_status
 
 
 def render_sidebar(voice_manager: VoiceManager):
@@ -25,7 +28,9 @@ def render_sidebar(voice_manager: VoiceManager):
             help="输入你的 Group ID",
             value=os.environ.get("MINIMAX_GROUP_ID", ""),
         )
-        voice_manager.init_client(api_key, group_id)
+        # 仅在凭据变化时重建客户端
+        if (api_key, group_id) != voice_manager.credentials:
+            voice_manager.init_client(api_key, group_id)
 
         if st.button("🔗 连接", type="primary"):
             if api_key and group_id:
@@ -36,3 +41,10 @@ def render_sidebar(voice_manager: VoiceManager):
                 st.error("请填写 API Key 和 Group ID")
 
         st.markdown("---")
+
+        # 服务启动预热进度
+        render_warmup_status()
+        # 后台任务（刷新页面后仍可查看）
+        render_job_panel(voice_manager)
+        # 克隆就绪通知
+        render_clone_watch_panel(voice_manager)
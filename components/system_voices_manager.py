@@ -5,6 +5,8 @@ from minimax_speech.tts_models import Voice
 
 
 from components.voice_manager import VoiceManager
+from utils.shared_store import get_shared_store
+from utils.timing import timed_render
 
 
 class APIVoice:
@@ -14,21 +16,17 @@ class APIVoice:
         self.description = description
 
 
+@st.fragment
+@timed_render("系统音色选择")
 def render_system_voices_manager(voice_manager: VoiceManager):
     def update_selected_voice():
         """更新选中的音色"""
-        voice_id = st.session_state.get("selected_system_voice_option", "")
         voice_manager.current_voice = (
-            st.session_state.voice_options[voice_id] if voice_id else ""
+            st.session_state.get("selected_system_voice_option") or ""
         )
 
     st.subheader("🎭 系统音色测试")
 
-    # 初始化session_state中的系统音色
-    if "system_voices" not in st.session_state:
-        st.session_state.system_voices = list(Voice)
-        st.session_state.api_system_voices = []
-
     # 获取基础系统音色（枚举中的）
     base_system_voices = list(Voice)
 
@@ -40,28 +38,32 @@ def render_system_voices_manager(voice_manager: VoiceManager):
 
         if not api_system_voices_data:
             st.warning("未获取到系统音色")
-            # even if it fails, we should ensure the list is empty
-            st.session_state.api_system_voices = []
             api_voices = []
         else:
-            # 创建API音色对象
-            api_voices: list[APIVoice] = []
-            for voice_info in api_system_voices_data:
-                # 创建一个类似Voice枚举的对象
-                api_voice = APIVoice(
-                    voice_id=voice_info.voice_id,
-                    name=voice_info.voice_name  # pyright: ignore
-                    or voice_info.voice_id,
-                    description=voice_info.description or "",
-                )
-                api_voices.append(api_voice)
-
-            # 更新session_state
-            if "api_system_voices" not in st.session_state or len(
-                st.session_state.api_system_voices
-            ) != len(api_voices):
+            # 创建API音色对象：按 Group ID 和音色列表版本在所有会话间共享一份
+            api_voices: list[APIVoice] = get_shared_store().get_or_create(
+                "api_system_voices",
+                (
+                    voice_manager.group_id,
+                    voice_manager.catalog.version(
+                        voice_manager.group_id, "system", voice_manager.credential_key
+                    ),
+                ),
+                lambda: [
+                    # 创建一个类似Voice枚举的对象
+                    APIVoice(
+                        voice_id=voice_info.voice_id,
+                        name=voice_info.voice_name  # pyright: ignore
+                        or voice_info.voice_id,
+                        description=voice_info.description or "",
+                    )
+                    for voice_info in api_system_voices_data
+                ],
+            )
+
+            if st.session_state.get("api_system_voices_count") != len(api_voices):
                 st.success(f"成功获取 {len(api_voices)} 个系统音色")
-            st.session_state.api_system_voices = api_voices
+            st.session_state.api_system_voices_count = len(api_voices)
     # 添加获取API系统音色的按钮
     col_search, col_clear_search = st.columns([2, 1])
 
@@ -80,7 +82,7 @@ def render_system_voices_manager(voice_manager: VoiceManager):
                 # 清除搜索状态
                 if "search_term" in st.session_state:
                     del st.session_state.search_term
-                st.rerun()
+                st.rerun(scope="fragment")
 
     # 过滤音色
     filtered_voices: list[Voice | APIVoice] = []
@@ -106,7 +108,7 @@ def render_system_voices_manager(voice_manager: VoiceManager):
 
     else:
         filtered_voices.extend(base_system_voices)
-        filtered_voices.extend(st.session_state.api_system_voices)
+        filtered_voices.extend(api_voices)
     # 显示当前音色来源和搜索状态
     if search_term:
         if filtered_voices:
@@ -116,22 +118,19 @@ def render_system_voices_manager(voice_manager: VoiceManager):
         else:
             st.warning(f"🔍 搜索 '{search_term}' 没有找到匹配的音色")
     else:
-        if st.session_state.api_system_voices:
+        if api_voices:
             st.info(
-                f"📊 当前显示 {len(base_system_voices)} 个音色（基础 {len(base_system_voices)} + API {len(st.session_state.api_system_voices)}）"
+                f"📊 当前显示 {len(base_system_voices)} 个音色（基础 {len(base_system_voices)} + API {len(api_voices)}）"
             )
         else:
             st.info(f"📊 当前显示 {len(base_system_voices)} 个基础音色")
 
     if not filtered_voices:
         st.info("没有找到匹配的音色")
-    # 选择音色
-    voice_options = {}
-    for voice in filtered_voices:
-        display_name = f"{voice.value} ({voice.name})"
-        voice_options[display_name] = voice.value
-    if voice_options:
-        st.session_state.voice_options = voice_options
+    # 选择音色：选项为音色ID，显示名只在渲染时使用，不保存到会话中
+    voice_options = {
+        voice.value: f"{voice.value} ({voice.name})" for voice in filtered_voices
+    }
 
     # 根据搜索结果调整下拉菜单的提示
     if search_term and filtered_voices:
@@ -148,7 +147,8 @@ def render_system_voices_manager(voice_manager: VoiceManager):
 
     st.selectbox(
         selectbox_label,
-        options=list(voice_options.keys()),
+        options=list(voice_options),
+        format_func=voice_options.get,
         help=selectbox_help,
         on_change=update_selected_voice,
         key="selected_system_voice_option",
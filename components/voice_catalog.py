@@ -0,0 +1,74 @@
+"""
+进程内共享的音色列表缓存
+"""
+
+import time
+from dataclasses import dataclass
+
+import streamlit as st
+
+from utils.metrics import TimedLock
+
+# 音色列表缓存有效期（秒）
+CATALOG_TTL = 300
+
+
+@dataclass
+class CatalogEntry:
+    """一份音色列表及其获取时间"""
+
+    voices: list
+    fetched_at: float
+
+
+class VoiceCatalog:
+    """
+    按 Group ID、音色类型和凭据摘要缓存音色列表，使用相同凭据的会话共享；
+    错误或已吊销的 API Key 即使 Group ID 相同也读不到其他凭据获取的列表
+    """
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, str, str], CatalogEntry] = {}
+        self._lock = TimedLock("voice_catalog")
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, group_id: str, voice_type: str, credential: str, max_age: float = CATALOG_TTL
+    ) -> list | None:
+        """读取未过期的音色列表"""
+        with self._lock:
+            entry = self._entries.get((group_id, voice_type, credential))
+            if entry is None or time.time() - entry.fetched_at > max_age:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return entry.voices
+
+    def version(self, group_id: str, voice_type: str, credential: str) -> float | None:
+        """音色列表的获取时间，用作派生数据的版本号（不计入命中统计）"""
+        with self._lock:
+            entry = self._entries.get((group_id, voice_type, credential))
+        return entry.fetched_at if entry else None
+
+    def put(self, group_id: str, voice_type: str, credential: str, voices: list) -> None:
+        """写入音色列表"""
+        with self._lock:
+            self._entries[(group_id, voice_type, credential)] = CatalogEntry(voices, time.time())
+
+    def invalidate(self, group_id: str, voice_type: str) -> None:
+        """使该 Group 下所有凭据的音色列表失效"""
+        with self._lock:
+            for key in [key for key in self._entries if key[:2] == (group_id, voice_type)]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        """返回缓存命中统计"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+@st.cache_resource
+def get_voice_catalog() -> VoiceCatalog:
+    """获取进程内共享的音色列表缓存"""
+    return VoiceCatalog()
@@ -2,30 +2,47 @@
 MiniMax 音色管理器核心类
 """
 
+import binascii
 import os
 import streamlit as st
 from minimax_speech import MiniMaxSpeech, SystemVoice
 from minimax_speech.voice_query_models import VoiceCloning
-from minimax_speech.tts_models import T2AResponse
+
+from components.clone_watcher import get_clone_watcher
+from components.voice_catalog import get_voice_catalog
+from utils.metrics import get_metrics
+from utils.render_ledger import get_render_ledger
+from utils.shared_store import get_shared_store
+from utils.singleflight import get_single_flight
+from utils.spool import UploadSource, source_size, spooled_path
+from utils.tts_cache import credential_digest, get_tts_cache, make_tts_key
+from utils.voice_index import get_voice_index
 
 
 class VoiceManager:
     """音色管理器"""
 
     client: MiniMaxSpeech
-    cloned_voices_cache: list[VoiceCloning] | None
-    cloned_voices_cache_time: int
-    system_voices_cache: list[SystemVoice] | None
-    system_voices_cache_time: int
     current_voice: str = ""
+    credentials: tuple[str, str] = ("", "")
+    # 凭据摘要：共享的音色列表和 TTS 缓存按它区分，错误或已吊销的 API Key 不会读到其他凭据获取的数据
+    credential_key: str = ""
 
     def __init__(self) -> None:
         api_key = os.getenv("MINIMAX_API_KEY", "")
         group_id = os.getenv("MINIMAX_GROUP_ID", "")
-        self.cloned_voices_cache = None
-        self.cloned_voices_cache_time = 0
-        self.system_voices_cache = None
-        self.system_voices_cache_time = 0
+        # 进程内共享的缓存和服务，在脚本线程中获取后供后台线程使用
+        self.catalog = get_voice_catalog()
+        self.tts_cache = get_tts_cache()
+        self.clone_watcher = get_clone_watcher()
+        self.single_flight = get_single_flight()
+        self.metrics = get_metrics()
+        self.voice_index = get_voice_index()
+        self.render_ledger = get_render_ledger()
+        self.metrics.register_cache("tts", self.tts_cache.stats)
+        self.metrics.register_cache("voice_catalog", self.catalog.stats)
+        self.metrics.register_cache("single_flight", self.single_flight.totals)
+        self.metrics.register_cache("shared_store", get_shared_store().stats)
         self.init_client(api_key, group_id)
         # 初始化 session_state 中的确认状态
         if "confirm_delete_id" not in st.session_state:
@@ -35,73 +52,131 @@ class VoiceManager:
         """初始化客户端"""
         try:
             self.client = MiniMaxSpeech(api_key=api_key, group_id=group_id)
+            self.credentials = (api_key, group_id)
+            self.credential_key = credential_digest(api_key, group_id)
             return True
         except Exception as e:
             st.error(f"初始化客户端失败: {str(e)}")
             return False
 
+    @property
+    def group_id(self) -> str:
+        return self.credentials[1]
+
+    @property
+    def cloned_voices_cache(self) -> list[VoiceCloning] | None:
+        return self.catalog.get(self.group_id, "clone", self.credential_key)
+
+    @property
+    def system_voices_cache(self) -> list[SystemVoice] | None:
+        return self.catalog.get(self.group_id, "system", self.credential_key)
+
+    @property
+    def credentials_verified(self) -> bool:
+        """当前凭据近期是否成功获取过音色列表（凭据有效时才读取按内容命名的渲染文件）"""
+        return any(
+            self.catalog.version(self.group_id, voice_type, self.credential_key) is not None
+            for voice_type in ("clone", "system")
+        )
+
+    def _request(self, endpoint: str, params: dict, fn):
+        """发出请求；其他会话正在发出相同请求时合并为一次，只有实际发出的请求计入耗时"""
+        # 凭据也参与请求键（键经过哈希，不会暴露 API Key）
+        api_key, group_id = self.credentials
+        scope = {"api_key": api_key, "group_id": group_id}
+        return self.single_flight.do(
+            endpoint, {**scope, **params}, lambda: self.metrics.call(endpoint, fn)
+        )
+
+    def _check_response(self, endpoint: str, result, message: str) -> None:
+        """接口返回失败时按 error_type 计数并抛出异常"""
+        if not result.base_resp.is_success:
+            error_type = str(result.base_resp.error_type)
+            self.metrics.count_error(endpoint, error_type)
+            raise RuntimeError(f"{message}: {error_type}")
+
+    def fetch_voices(self, voice_type: str = "clone") -> list:
+        """请求音色列表（不操作界面，可在后台线程中调用）"""
+        if voice_type == "clone":
+            return self._request("get_cloned_voices", {}, self.client.get_cloned_voices)
+        return self._request("get_system_voices", {}, self.client.get_system_voices)
+
+    def store_voices(self, voice_type: str, voices: list) -> None:
+        """写入共享音色列表并增量同步本地音色索引（可在后台线程中调用）"""
+        self.catalog.put(self.group_id, voice_type, self.credential_key, voices)
+        self.voice_index.sync(self.group_id, voice_type, voices)
+
     def get_voices(self, voice_type: str = "clone", force_refresh: bool = False):
         """
-        获取音色列表
+        获取音色列表（5分钟内读取所有会话共享的缓存）
         :param voice_type: 'clone' 或 'system'
         :param force_refresh: 是否强制刷新
         """
-        current_time = int(st.session_state.get("current_time", 0))
+        if voice_type not in ("clone", "system"):
+            return None
+        label = "克隆" if voice_type == "clone" else "系统"
 
-        if voice_type == "clone":
-            cache = self.cloned_voices_cache
-            cache_time = self.cloned_voices_cache_time
-            # 5分钟缓存
-            is_cache_valid = cache is not None and (current_time - cache_time) <= 300
-
-            if not force_refresh and is_cache_valid:
-                # 如果没有必要刷新，就跳过
-                return self.cloned_voices_cache
-            try:
-                st.toast("正在获取克隆音色列表...")
-                self.cloned_voices_cache = self.client.get_cloned_voices()
-                self.cloned_voices_cache_time = current_time
-                if self.cloned_voices_cache is not None:
-                    self.current_voice = self.cloned_voices_cache[0].voice_id
-            except Exception as e:
-                st.error(f"获取克隆音色列表失败: {str(e)}")
-                self.cloned_voices_cache = None
-            return self.cloned_voices_cache
-
-        elif voice_type == "system":
-            cache = self.system_voices_cache
-            cache_time = self.system_voices_cache_time
-            # 5分钟缓存
-            is_cache_valid = cache is not None and (current_time - cache_time) <= 300
-
-            if not force_refresh and is_cache_valid:
-                # 如果没有必要刷新，就跳过
-                return self.system_voices_cache
-            try:
-                st.toast("正在获取系统音色列表...")
-                self.system_voices_cache = self.client.get_system_voices()
-                self.system_voices_cache_time = current_time
-                if self.system_voices_cache is not None:
-                    self.current_voice = self.system_voices_cache[0].voice_id
-            except Exception as e:
-                st.error(f"获取系统音色列表失败: {str(e)}")
-                self.system_voices_cache = None
-            return self.system_voices_cache
-
-        return None
+        voices = self.catalog.get(self.group_id, voice_type, self.credential_key)
+        if not force_refresh and voices is not None:
+            # 如果没有必要刷新，就跳过
+            return voices
+        try:
+            st.toast(f"正在获取{label}音色列表...")
+            voices = self.fetch_voices(voice_type)
+            if voices is not None:
+                self.store_voices(voice_type, voices)
+                if voices:
+                    self.current_voice = voices[0].voice_id
+        except Exception as e:
+            st.error(f"获取{label}音色列表失败: {str(e)}")
+            self.catalog.invalidate(self.group_id, voice_type)
+            voices = None
+        return voices
+
+    def invalidate_voices(self, voice_type: str = "clone") -> None:
+        """使音色列表缓存失效，下次读取时重新获取（可在后台线程中调用）"""
+        self.catalog.invalidate(self.group_id, voice_type)
+
+    def upload_file(self, source: UploadSource, file_name: str = "") -> int:
+        """
+        上传音频文件并返回 file_id（不操作界面，可在后台线程中调用）
+        :param source: 文件路径、bytes 或文件对象，内存中的数据只在上传期间写入临时文件
+        :param file_name: source 不是路径时使用的文件名
+        """
+        with spooled_path(source, file_name or "audio.wav") as file_path:
+            file_id = self.metrics.call(
+                "file_upload", lambda: self.client.file_upload(file_path)
+            )
+        self.metrics.add_bytes("up", "file_upload", source_size(source))
+        return file_id
+
+    def submit_clone(self, file_id: int, voice_id: str, **kwargs) -> None:
+        """提交克隆任务，失败时抛出异常（不操作界面，可在后台线程中调用）"""
+        result = self.metrics.call(
+            "voice_clone",
+            lambda: self.client.voice_clone_simple(
+                file_id=file_id, voice_id=voice_id, **kwargs
+            ),
+        )
+        self._check_response("voice_clone", result, "克隆音色失败")
+        # 跟踪克隆进度，就绪后自动更新共享音色列表
+        self.clone_watcher.watch(self, voice_id)
+
+    def remove_voice(self, voice_id: str) -> None:
+        """删除音色，失败时抛出异常（不操作界面，可在后台线程中调用）"""
+        result = self.metrics.call(
+            "voice_delete", lambda: self.client.voice_delete(voice_id)
+        )
+        self._check_response("voice_delete", result, "删除音色失败")
+        self.voice_index.remove(self.group_id, [voice_id])
+        self.invalidate_voices("clone")
 
     def delete_voice(self, voice_id: str):
         """删除音色"""
         try:
-            result = self.client.voice_delete(voice_id)
-            if result.base_resp.is_success:
-                st.success(f"成功删除音色: {voice_id}")
-                # 刷新缓存
-                self.get_voices(force_refresh=True)
-                return True
-            else:
-                st.error(f"删除音色失败: {result.base_resp.error_type}")
-                return False
+            self.remove_voice(voice_id)
+            st.success(f"成功删除音色: {voice_id}")
+            return True
         except Exception as e:
             st.error(f"删除音色时发生错误: {str(e)}")
             return False
@@ -109,35 +184,42 @@ class VoiceManager:
     def clone_voice(self, file_id: int, voice_id: str, **kwargs):
         """克隆音色"""
         try:
-            print(file_id)
-            print(voice_id)
-            print(kwargs)
-            result = self.client.voice_clone_simple(
-                file_id=file_id, voice_id=voice_id, **kwargs
-            )
-            if result.base_resp.is_success:
-                st.success(f"成功克隆音色: {voice_id}")
-                # 刷新缓存
-                self.get_voices(force_refresh=True)
-                return True
-            else:
-                st.error(f"克隆音色失败: {result.base_resp.error_type}")
-                return False
+            self.submit_clone(file_id=file_id, voice_id=voice_id, **kwargs)
+            st.success(f"成功克隆音色: {voice_id}")
+            return True
         except Exception as e:
             st.error(f"克隆音色时发生错误: {str(e)}")
             return False
 
-    def test_voice(self, voice_id: str, text: str, **kwargs) -> T2AResponse | None:
-        """测试音色"""
-        try:
-            result = self.client.text_to_speech_simple(
+    def synthesize(self, voice_id: str, text: str, **kwargs) -> bytes:
+        """合成音频并返回 MP3 数据（不操作界面，可在后台线程中调用）"""
+        result = self._request(
+            "text_to_speech",
+            {"text": text, "voice_id": voice_id, **kwargs},
+            lambda: self.client.text_to_speech_simple(
                 text=text, voice_id=voice_id, **kwargs
-            )
-            if result.base_resp.is_success:
-                return result
-            else:
-                st.error(f"生成测试音频失败: {result.base_resp.error_type}")
-                return None
+            ),
+        )
+        self._check_response("text_to_speech", result, "生成音频失败")
+        audio_data = binascii.unhexlify(result.data.audio)
+        if not audio_data:
+            self.metrics.count_error("text_to_speech", "empty_audio")
+            raise RuntimeError("生成的音频数据为空")
+        self.metrics.add_bytes("down", "text_to_speech", len(audio_data))
+        self.metrics.add_characters(len(text))
+        return audio_data
+
+    def test_voice(self, voice_id: str, text: str, **kwargs) -> bytes | None:
+        """测试音色，返回 MP3 音频数据（优先读取 TTS 缓存）"""
+        cache = self.tts_cache
+        key = make_tts_key(voice_id, text, credential=self.credential_key, **kwargs)
+        audio_data = cache.get(key)
+        if audio_data is not None:
+            return audio_data
+        try:
+            audio_data = self.synthesize(voice_id=voice_id, text=text, **kwargs)
         except Exception as e:
             st.error(f"生成测试音频时发生错误: {str(e)}")
             return None
+        cache.put(key, audio_data)
+        return audio_data
@@ -0,0 +1,50 @@
+"""
+音色标签与角色名编辑器：保存到本地音色索引，供音色列表和克隆音色选择共用
+"""
+
+import streamlit as st
+
+from components.voice_manager import VoiceManager
+
+
+def render_voice_metadata_editor(
+    voice_manager: VoiceManager, voices: list, key: str = "voice_metadata_editor"
+):
+    """
+    编辑音色的自定义标签和角色名，保存到本地音色索引；
+    在开关之后调用时，开关关闭的重跑不会导入 pandas
+    """
+    import pandas as pd
+
+    table = pd.DataFrame(
+        [
+            {
+                "音色ID": voice.voice_id,
+                "描述": voice.description,
+                "标签": voice.tags,
+                "角色名": voice.characters,
+            }
+            for voice in voices
+        ],
+        columns=["音色ID", "描述", "标签", "角色名"],
+    )
+    st.caption("多个标签或角色名用逗号分隔，搜索时也可以输入拼音")
+    st.data_editor(
+        table,
+        disabled=["音色ID", "描述"],
+        hide_index=True,
+        use_container_width=True,
+        key=key,
+    )
+    edited_rows = st.session_state.get(key, {}).get("edited_rows", {})
+    if st.button("💾 保存标签", disabled=not edited_rows, key=f"{key}_save"):
+        for row, changes in edited_rows.items():
+            original = table.iloc[int(row)]
+            voice_manager.voice_index.update_metadata(
+                voice_manager.group_id,
+                original["音色ID"],
+                tags=changes.get("标签", original["标签"]) or "",
+                characters=changes.get("角色名", original["角色名"]) or "",
+            )
+        del st.session_state[key]
+        st.rerun()
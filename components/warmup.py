@@ -0,0 +1,202 @@
+"""
+服务启动预热：在后台线程中加载示例台本、导入 pypinyin、获取两种音色列表并同步搜索索引，
+使部署后第一个会话与之后的会话一样快
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import streamlit as st
+
+from components.voice_manager import VoiceManager
+from utils.casting import CHARACTERS_NAMESPACE, get_casting_map, script_characters
+from utils.excel import EXAMPLE_SCRIPT_PATH, preload_script
+from utils.naming import convert_to_pinyin
+from utils.shared_store import get_shared_store
+
+# 预热在共享数据仓库中登记的持有者
+WARMUP_HOLDER = "warmup"
+# 预热步骤：前四步并行，自动选角在台本和克隆音色列表就绪后进行
+WARMUP_TASKS = {
+    "script": "示例台本",
+    "pinyin": "拼音词典",
+    "clone_voices": "克隆音色列表",
+    "system_voices": "系统音色列表",
+    "casting": "自动选角",
+}
+WARMUP_STATUS = {
+    "pending": "等待",
+    "running": "进行中",
+    "done": "完成",
+    "skipped": "跳过",
+    "failed": "失败",
+}
+
+
+class WarmupSkipped(Exception):
+    """预热步骤的前提不满足，跳过该步骤"""
+
+
+@dataclass
+class WarmupTask:
+    """一个预热步骤的状态"""
+
+    name: str
+    label: str
+    status: str = "pending"
+    seconds: float = 0.0
+    detail: str = ""
+
+
+class Warmup:
+    """进程内只运行一次的启动预热；失败或跳过的步骤由会话按需加载"""
+
+    def __init__(self) -> None:
+        self.tasks = {name: WarmupTask(name, label) for name, label in WARMUP_TASKS.items()}
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        # 步骤之间传递的结果
+        self._characters: list[str] | None = None
+        self._voice_manager: VoiceManager | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def ready(self) -> bool:
+        """全部步骤都已结束（包括跳过和失败）"""
+        return self._ready.is_set()
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """等待预热结束，返回是否就绪"""
+        return self._ready.wait(timeout)
+
+    def start(self, example_path: str | Path = EXAMPLE_SCRIPT_PATH) -> bool:
+        """
+        开始预热（重复调用无效），返回本次是否启动；
+        凭据与 app.py 相同，读取环境变量（config.json 需先由 load_config 写入）
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.started_at = time.time()
+            self._thread = threading.Thread(
+                target=self._run, args=(Path(example_path),), name="warmup", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def _run(self, example_path: Path) -> None:
+        workers = [
+            threading.Thread(target=self._step, args=(name, fn, *args), daemon=True)
+            for name, fn, args in (
+                ("script", self._warm_script, (example_path,)),
+                ("pinyin", self._warm_pinyin, ()),
+                ("clone_voices", self._warm_voices, ("clone",)),
+                ("system_voices", self._warm_voices, ("system",)),
+            )
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self._step("casting", self._warm_casting)
+        self.finished_at = time.time()
+        self._ready.set()
+
+    def _step(self, name: str, fn, *args) -> None:
+        task = self.tasks[name]
+        task.status = "running"
+        started = time.perf_counter()
+        try:
+            task.detail = fn(*args)
+            task.status = "done"
+        except WarmupSkipped as e:
+            task.detail = str(e)
+            task.status = "skipped"
+        except Exception as e:
+            task.detail = f"{type(e).__name__}: {e}"
+            task.status = "failed"
+        task.seconds = round(time.perf_counter() - started, 2)
+
+    def _manager(self) -> VoiceManager:
+        """两种音色列表共用一个管理器（请求计入指标，并与会话的相同请求合并）"""
+        with self._lock:
+            if self._voice_manager is None:
+                if not os.getenv("MINIMAX_API_KEY") or not os.getenv("MINIMAX_GROUP_ID"):
+                    raise WarmupSkipped("未配置 MINIMAX_API_KEY 和 MINIMAX_GROUP_ID")
+                self._voice_manager = VoiceManager()
+            return self._voice_manager
+
+    def _warm_script(self, example_path: Path) -> str:
+        if not example_path.exists():
+            raise WarmupSkipped(f"{example_path.name} 不存在")
+        key, df = preload_script(example_path, WARMUP_HOLDER)
+        self._characters = get_shared_store().get_or_create(
+            CHARACTERS_NAMESPACE,
+            key,
+            lambda: script_characters(df),
+            session_id=WARMUP_HOLDER,
+            pin=True,
+        )
+        return f"{len(df)} 行，{len(self._characters)} 个角色"
+
+    def _warm_pinyin(self) -> str:
+        # 首次转换时导入 pypinyin 并加载词典
+        convert_to_pinyin("预热")
+        return ""
+
+    def _warm_voices(self, voice_type: str) -> str:
+        voice_manager = self._manager()
+        voices = voice_manager.fetch_voices(voice_type) or []
+        # 写入共享音色列表并同步搜索索引
+        voice_manager.store_voices(voice_type, voices)
+        return f"{len(voices)} 个音色"
+
+    def _warm_casting(self) -> str:
+        if self._characters is None or self.tasks["clone_voices"].status != "done":
+            raise WarmupSkipped("需要示例台本和克隆音色列表")
+        voice_manager = self._manager()
+        group_id = voice_manager.group_id
+        seeded = get_casting_map().seed(
+            group_id,
+            self._characters,
+            voice_manager.voice_index.search(group_id, "clone"),
+        )
+        return f"新匹配 {seeded} 个角色"
+
+    def report(self) -> list[dict]:
+        """各步骤的状态"""
+        return [
+            {
+                "步骤": task.label,
+                "状态": WARMUP_STATUS[task.status],
+                "耗时(秒)": task.seconds,
+                "说明": task.detail,
+            }
+            for task in self.tasks.values()
+        ]
+
+
+@st.cache_resource
+def get_warmup() -> Warmup:
+    """获取进程内唯一的启动预热"""
+    return Warmup()
+
+
+def render_warmup_status() -> None:
+    """预热进行中时显示提示"""
+    warmup = get_warmup()
+    if not warmup.started or warmup.ready:
+        return
+    running = [
+        task.label for task in warmup.tasks.values() if task.status in ("pending", "running")
+    ]
+    st.caption(f"⏳ 服务预热中：{'、'.join(running)}")
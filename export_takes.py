@@ -0,0 +1,89 @@
+"""
+命令行导出渲染结果：按角色、时间码和渲染日期筛选渲染台账中的音频，流式打包为 zip（附 manifest.csv），
+或转换为带时间码的 Broadcast WAV 并生成 OTIO 时间线
+
+用法:
+    uv run python export_takes.py -o takes.zip [--script 第一集.xlsx] [--character 张三] [--from 00:01:00:00] [--to 00:02:00:00]
+    uv run python export_takes.py -o - --since 2025-01-01 > takes.zip
+    uv run python export_takes.py --bwf ./conform [--workers 8]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from utils.bwf_export import export_conform
+from utils.render_ledger import RenderLedger
+from utils.take_archive import filter_takes, iter_archive, split_available
+
+
+def _date(value: str) -> float:
+    return time.mktime(time.strptime(value, "%Y-%m-%d"))
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="导出渲染台账中的音频")
+    parser.add_argument("-o", "--output", default="-", help="输出的 zip 路径，- 表示标准输出")
+    parser.add_argument("--group", help="只导出指定分组（Group ID）的渲染")
+    parser.add_argument("--script", help="只导出指定剧本（剧本文件名）的渲染")
+    parser.add_argument("--character", action="append", help="只导出指定角色（可重复）")
+    parser.add_argument("--from", dest="timecode_from", default="", help="起始时间码（含）")
+    parser.add_argument("--to", dest="timecode_to", default="", help="结束时间码（含）")
+    parser.add_argument("--since", type=_date, help="渲染日期起（YYYY-MM-DD，含）")
+    parser.add_argument("--until", type=_date, help="渲染日期止（YYYY-MM-DD，含）")
+    parser.add_argument("--ledger", type=Path, help="渲染台账路径（默认与页面共用）")
+    parser.add_argument(
+        "--bwf", type=Path, help="转换为 BWF 并生成 OTIO 时间线，写入该目录（不打包 zip）"
+    )
+    parser.add_argument("--workers", type=int, help="BWF 转换的进程数（默认 CPU 核数）")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    ledger = RenderLedger(args.ledger) if args.ledger else RenderLedger()
+    takes = ledger.query(
+        characters=args.character,
+        since=args.since,
+        until=args.until + 24 * 3600 if args.until is not None else None,
+        group_id=args.group,
+        script=args.script,
+    )
+    takes, missing = split_available(
+        filter_takes(takes, args.timecode_from, args.timecode_to)
+    )
+    for take in missing:
+        print(f"音频文件已丢失，跳过: {take.timecode} {take.audio_path}", file=sys.stderr)
+    if not takes:
+        print("没有符合条件的渲染结果", file=sys.stderr)
+        return 1
+
+    if args.bwf:
+        results, timeline_path = export_conform(
+            takes, args.bwf, args.bwf.name or "timeline", max_workers=args.workers
+        )
+        failed = [result for result in results if not result.ok]
+        for result in failed:
+            print(f"转换失败: {result.timecode} {result.error}", file=sys.stderr)
+        print(
+            f"已转换 {len(results) - len(failed)} 条音频，时间线: {timeline_path}",
+            file=sys.stderr,
+        )
+        return 1 if failed else 0
+
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    size = 0
+    try:
+        for chunk in iter_archive(takes):
+            output.write(chunk)
+            size += len(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    print(f"已导出 {len(takes)} 条音频，共 {size / 1024 / 1024:.1f} MB", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
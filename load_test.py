@@ -0,0 +1,799 @@
+"""
+压测：用本地接口替身启动真实的 Streamlit 服务，模拟多个并发会话按脚本化流程（打开页面、加载剧本、搜索、选择台词、
+生成音频、批量克隆）操作应用，报告不同并发数下的重跑延迟分位数、内存增长、接口调用量，
+以及共享缓存、请求合并和 SQLite 存储上的争用
+
+用法:
+    uv run python load_test.py [--sessions 1,4,8,16] [--think 0.5] [--report report.json]
+    uv run python load_test.py --sessions 8 --latency-scale 0 --batch-files 0
+
+每个模拟会话像浏览器一样通过 websocket 连接服务，发送控件状态并等待脚本运行结束，多个会话的重跑在服务端真正并发执行，
+与线上一样共享服务进程内的缓存、请求合并和后台任务；延迟是发出重跑请求到脚本运行结束的时间，不含浏览器渲染。
+每个并发级别启动新的服务进程和新的应用副本，不复用上一级别预热过的缓存和数据；
+应用代码复制到临时目录中运行，渲染台账、音色索引等数据不会写入项目的 data 目录。
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import wave
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import urljoin
+
+import requests
+import streamlit as st
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.Common_pb2 import FileUploaderState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+if TYPE_CHECKING:
+    from utils.api_standin import StandInAPI
+
+PROJECT_DIR = Path(__file__).parent
+# 复制到临时目录中运行的应用代码（服务端入口也从压测脚本中导入）
+SANDBOX_ITEMS = ("app.py", "components", "pages", "utils", "load_test.py")
+FLOW_STEPS = ("open", "load_script", "search", "select_row", "generate", "batch_clone")
+
+# 模拟剧本的角色及替身中对应的克隆音色（音色ID包含角色名拼音，加载剧本时会自动选角）
+CHARACTERS = {
+    "张三": "zhangsan01",
+    "李四": "lisi0001",
+    "王五": "wangwu001",
+    "赵六": "zhaoliu01",
+    "孙七": "sunqi0001",
+    "周八": "zhouba001",
+}
+SYSTEM_VOICES = ["male-qn-qingse", "female-shaonv", "presenter_male", "audiobook_female_1"]
+SCRIPT_COLUMNS = ["时间码", "镜头", "角色", "备注", "台词"]
+SCRIPT_NAME = "load_test_script.xlsx"
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+# 报告中对延迟口径的说明
+LATENCY_NOTE = (
+    "各会话通过 websocket 连接同一个 Streamlit 服务，重跑在服务端并发执行；"
+    "延迟为发出重跑请求到脚本运行结束的时间（上传时含文件上传），不含浏览器渲染；"
+    "等待后台任务时整页重跑；每个并发级别启动新的服务进程，缓存不跨级别复用"
+)
+# 服务端入口：按查询参数 page 打开主页面、批量克隆页面（app.py 未挂载）或服务端统计；
+# 预检的进程池以 spawn 启动子进程，会重新导入主脚本，因此入口代码放在 __main__ 判断中
+SERVER_SCRIPT_NAME = "load_test_app.py"
+SERVER_SCRIPT = """\
+if __name__ == "__main__":
+    from load_test import render_load_test_page
+
+    render_load_test_page()
+"""
+BATCH_PAGE = "batch"
+STATS_PAGE = "stats"
+# 压测进程通过该环境变量把替身的配置（JSON）传给服务进程
+SERVER_CONFIG_ENV = "VOICEHUB_LOAD_TEST"
+SERVER_START_TIMEOUT = 60.0
+# 克隆样本需满足本地预检的最短时长
+CLONE_SAMPLE_SECONDS = 12
+CLONE_SAMPLE_RATE = 16000
+
+
+def build_script(rows: int, seed: int = 0) -> bytes:
+    """生成模拟剧本（xlsx）"""
+    import pandas as pd
+
+    rng = random.Random(seed)
+    characters = list(CHARACTERS)
+    data = []
+    for row in range(rows):
+        seconds = 60 + row * 3
+        data.append(
+            [
+                f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}:{rng.randrange(24):02d}",
+                f"S{row // 20 + 1:02d}",
+                rng.choice(characters),
+                "",
+                f"第{row + 1}句台词，用于压测的模拟文本。",
+            ]
+        )
+    buffer = io.BytesIO()
+    pd.DataFrame(data, columns=SCRIPT_COLUMNS).to_excel(buffer, index=False, engine="openpyxl")
+    return buffer.getvalue()
+
+
+def build_clone_sample(seconds: int = CLONE_SAMPLE_SECONDS, rate: int = CLONE_SAMPLE_RATE) -> bytes:
+    """生成单声道 16 bit 正弦波 WAV，作为克隆样本"""
+    import numpy as np
+
+    t = np.arange(seconds * rate) / rate
+    samples = (0.3 * np.sin(2 * np.pi * 220 * t) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def prepare_sandbox(workdir: Path) -> Path:
+    """把应用代码复制到工作目录"""
+    workdir.mkdir(parents=True, exist_ok=True)
+    for name in SANDBOX_ITEMS:
+        source = PROJECT_DIR / name
+        target = workdir / name
+        if source.is_dir():
+            shutil.copytree(
+                source, target, ignore=shutil.ignore_patterns("__pycache__"), dirs_exist_ok=True
+            )
+        else:
+            shutil.copy2(source, target)
+    (workdir / SERVER_SCRIPT_NAME).write_text(SERVER_SCRIPT, encoding="utf-8")
+    return workdir
+
+
+def percentile(values: list[float], q: float) -> float:
+    """最近秩法分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)]
+
+
+@st.cache_resource
+def get_standin_api() -> "StandInAPI":
+    """服务进程内共享的接口替身，延迟等配置由压测进程通过环境变量传入"""
+    from utils.api_standin import DEFAULT_CLONE_READY_AFTER, DEFAULT_LATENCY, StandInAPI
+
+    config = json.loads(os.getenv(SERVER_CONFIG_ENV) or "{}")
+    scale = config.get("latency_scale", 1.0)
+    return StandInAPI(
+        clone_voices=list(CHARACTERS.values()),
+        system_voices=SYSTEM_VOICES,
+        latency={endpoint: delay * scale for endpoint, delay in DEFAULT_LATENCY.items()},
+        clone_ready_after=config.get("clone_ready_after", DEFAULT_CLONE_READY_AFTER),
+    )
+
+
+def server_stats(api: "StandInAPI") -> dict:
+    """服务进程的内存、接口调用量，以及共享缓存、请求合并和各存储锁上的争用"""
+    from utils.metrics import get_metrics, lock_stats
+    from utils.shared_store import get_shared_store, resident_memory
+    from utils.singleflight import get_single_flight
+
+    return {
+        "rss": resident_memory(),
+        "api_calls": api.calls(),
+        "caches": get_metrics().cache_stats(),
+        "single_flight": get_single_flight().stats(),
+        "shared_store_duplicates": get_shared_store().stats()["duplicates"],
+        "locks": lock_stats(),
+    }
+
+
+def render_load_test_page() -> None:
+    """服务端入口（由 Streamlit 在应用副本中运行）：接口换成替身，按查询参数 page 打开页面"""
+    import components.voice_manager as voice_manager_module
+
+    api = get_standin_api()
+    voice_manager_module.MiniMaxSpeech = api.client
+    page = st.query_params.get("page", "")
+    if page == STATS_PAGE:
+        st.code(json.dumps(server_stats(api), ensure_ascii=False), language="json")
+    elif page == BATCH_PAGE:
+        from pages.batch_upload import render_batch_upload
+
+        if "voice_manager" not in st.session_state:
+            st.session_state.voice_manager = voice_manager_module.VoiceManager()
+        render_batch_upload(st.session_state.voice_manager)
+    else:
+        import app
+        from components.warmup import get_warmup
+        from utils.config import load_config
+        from utils.profiling import profile_rerun
+
+        load_config()
+        get_warmup().start()
+        with profile_rerun():
+            app.main()
+
+
+def _widget_key(widget_id: str) -> str:
+    """控件ID（$$ID-<哈希>-<key>）中用户指定的 key"""
+    parts = widget_id.split("-", 2)
+    return parts[2] if len(parts) == 3 and parts[2] != "None" else ""
+
+
+class BrowserSession:
+    """
+    浏览器会话的最小实现：通过 websocket 连接服务，发送带控件状态的重跑请求并收集本次运行渲染的元素；
+    与前端一样保留设置过的控件值，之后每次重跑都一起发送
+    """
+
+    def __init__(self, address: str, query: str = "", timeout: float = 60.0) -> None:
+        from websockets.sync.client import connect
+
+        self.address = address
+        self.query = query
+        self.timeout = timeout
+        self.session_id = ""
+        # 元素按在页面中的位置（delta_path）保存，每次运行开始时清空
+        self.elements: dict[tuple[int, ...], object] = {}
+        self._states: dict[str, WidgetState] = {}
+        self._stack = ExitStack()
+        self._ws = self._stack.enter_context(
+            connect(
+                f"ws://{address}/_stcore/stream",
+                subprotocols=["streamlit"],
+                max_size=None,
+                open_timeout=timeout,
+            )
+        )
+
+    def close(self) -> None:
+        self._stack.close()
+
+    def _send(self, msg: BackMsg) -> None:
+        self._ws.send(msg.SerializeToString())
+
+    def _receive(self) -> ForwardMsg:
+        msg = ForwardMsg()
+        msg.ParseFromString(self._ws.recv(timeout=self.timeout))
+        return msg
+
+    def rerun(self, trigger: str = "") -> None:
+        """发送重跑请求（trigger 为本次点击的按钮ID），等待脚本运行结束；脚本中 st.rerun 引起的重跑一并等待"""
+        msg = BackMsg()
+        msg.rerun_script.query_string = self.query
+        widgets = msg.rerun_script.widget_states.widgets
+        widgets.extend(self._states.values())
+        if trigger:
+            widgets.add(id=trigger, trigger_value=True)
+        self._send(msg)
+        while True:
+            reply = self._receive()
+            kind = reply.WhichOneof("type")
+            if kind == "new_session":
+                self.session_id = reply.new_session.initialize.session_id
+                self.elements.clear()
+            elif kind == "delta" and reply.delta.WhichOneof("type") == "new_element":
+                self.elements[tuple(reply.metadata.delta_path)] = reply.delta.new_element
+            elif (
+                kind == "script_finished"
+                and reply.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN
+            ):
+                return
+
+    def elements_of(self, kind: str) -> list:
+        """本次运行渲染的某类元素（如 button、audio、alert），按页面顺序排列"""
+        return [
+            getattr(element, kind)
+            for _, element in sorted(self.elements.items())
+            if element.WhichOneof("type") == kind
+        ]
+
+    def find(self, kind: str, key: str = "", label: str = ""):
+        """按 key 或标签前缀查找控件"""
+        for widget in self.elements_of(kind):
+            if (key and _widget_key(widget.id) == key) or (
+                label and widget.label.startswith(label)
+            ):
+                return widget
+        raise LookupError(f"未找到控件: {key or label}")
+
+    @property
+    def exceptions(self) -> list[str]:
+        """本次运行中页面显示的异常（不含弃用警告）"""
+        return [
+            f"{error.type}: {error.message}"
+            for error in self.elements_of("exception")
+            if not error.is_warning
+        ]
+
+    def input(self, widget, **value) -> None:
+        """设置控件值（如 bool_value=True、string_value="张三"）并重跑"""
+        self._states[widget.id] = WidgetState(id=widget.id, **value)
+        self.rerun()
+
+    def click(self, widget) -> None:
+        self.rerun(trigger=widget.id)
+
+    def upload(self, widget, files: list[tuple[str, bytes, str]]) -> None:
+        """与前端相同：申请上传地址、逐个上传文件，再把文件信息设为上传控件的值并重跑"""
+        request_id = uuid.uuid4().hex
+        msg = BackMsg()
+        msg.file_urls_request.request_id = request_id
+        msg.file_urls_request.session_id = self.session_id
+        msg.file_urls_request.file_names.extend(name for name, _, _ in files)
+        self._send(msg)
+        while True:
+            reply = self._receive()
+            if (
+                reply.WhichOneof("type") == "file_urls_response"
+                and reply.file_urls_response.response_id == request_id
+            ):
+                break
+        state = FileUploaderState()
+        for (name, data, mime), urls in zip(files, reply.file_urls_response.file_urls):
+            response = requests.put(
+                urljoin(f"http://{self.address}/", urls.upload_url),
+                files={"file": (name, data, mime)},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            state.uploaded_file_info.add(
+                name=name, size=len(data), file_id=urls.file_id, file_urls=urls
+            )
+        self.input(widget, file_uploader_state_value=state)
+
+
+def fetch_server_stats(address: str, timeout: float) -> dict:
+    """打开统计页面，读取服务进程的统计"""
+    session = BrowserSession(address, f"page={STATS_PAGE}", timeout)
+    try:
+        session.rerun()
+        return json.loads(session.elements_of("code")[0].code_text)
+    finally:
+        session.close()
+
+
+@dataclass
+class RerunSample:
+    """一次交互（重跑）的耗时"""
+
+    step: str
+    seconds: float
+    ok: bool = True
+
+
+@dataclass
+class HarnessContext:
+    """所有会话共用的压测配置和数据"""
+
+    address: str
+    script: bytes
+    clone_sample: bytes
+    think: float
+    batch_files: int
+    poll_interval: float
+    poll_limit: int
+    timeout: float
+    seed: int
+
+
+class SimulatedSession:
+    """一个模拟用户：按固定流程操作应用并记录每次重跑的耗时"""
+
+    def __init__(self, ctx: HarnessContext, index: int) -> None:
+        self.ctx = ctx
+        self.index = index
+        self.rng = random.Random(ctx.seed * 1000 + index)
+        self.samples: list[RerunSample] = []
+        self.errors: list[str] = []
+        self.completed = False
+        # 压测结束前保持连接，服务端内存统计包含会话状态
+        self.browsers: list[BrowserSession] = []
+
+    def _open(self, page: str = "") -> BrowserSession:
+        browser = BrowserSession(
+            self.ctx.address, f"page={page}" if page else "", self.ctx.timeout
+        )
+        self.browsers.append(browser)
+        return browser
+
+    def close(self) -> None:
+        for browser in self.browsers:
+            browser.close()
+
+    def _step(self, step: str, browser: BrowserSession, action: Callable[[], None]) -> None:
+        """执行一次交互并等待重跑结束，记录耗时"""
+        started = time.perf_counter()
+        action()
+        seconds = time.perf_counter() - started
+        errors = browser.exceptions
+        self.samples.append(RerunSample(step, seconds, not errors))
+        if errors:
+            self.errors.append(f"{step}: {errors[0]}")
+
+    def _think(self) -> None:
+        if self.ctx.think > 0:
+            time.sleep(self.rng.uniform(0, 2 * self.ctx.think))
+
+    def _poll(self, step: str, browser: BrowserSession, done: Callable[[], bool]) -> bool:
+        """像浏览器中的轮询片段一样定期重跑，直到后台任务完成"""
+        for _ in range(self.ctx.poll_limit):
+            if done():
+                return True
+            time.sleep(self.ctx.poll_interval)
+            self._step(step, browser, browser.rerun)
+        return done()
+
+    def run(self) -> None:
+        try:
+            self._run_flow()
+            self.completed = not self.errors
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+    def _run_flow(self) -> None:
+        ctx = self.ctx
+        app = self._open()
+        self._step("open", app, app.rerun)
+        self._think()
+
+        self._step(
+            "load_script",
+            app,
+            lambda: app.input(app.find("checkbox", key="show_script_panel"), bool_value=True),
+        )
+        uploader = app.find("file_uploader", label="📂")
+        self._step(
+            "load_script", app, lambda: app.upload(uploader, [(SCRIPT_NAME, ctx.script, XLSX_MIME)])
+        )
+        self._think()
+
+        character = self.rng.choice(list(CHARACTERS))
+        search = app.find("text_input", key="excel_search")
+        self._step("search", app, lambda: app.input(search, string_value=character))
+        self._think()
+
+        rows = [
+            button
+            for button in app.elements_of("button")
+            if _widget_key(button.id).startswith("select_row_")
+        ]
+        if not rows:
+            raise LookupError("搜索结果中没有可选择的台词")
+        row = self.rng.choice(rows)
+        self._step("select_row", app, lambda: app.click(row))
+        self._think()
+
+        generate = app.find("button", label="🎵 生成测试音频")
+        self._step("generate", app, lambda: app.click(generate))
+        if not self._poll("generate", app, lambda: bool(app.elements_of("audio"))):
+            self.errors.append("generate: 等待音频超时")
+        self._think()
+
+        if ctx.batch_files <= 0:
+            return
+        batch = self._open(BATCH_PAGE)
+        self._step("batch_clone", batch, batch.rerun)
+        files = [
+            (f"take_{self.index}_{n}.wav", ctx.clone_sample, "audio/wav")
+            for n in range(ctx.batch_files)
+        ]
+        uploader = batch.elements_of("file_uploader")[0]
+        self._step("batch_clone", batch, lambda: batch.upload(uploader, files))
+        # 音色ID在所有会话和并发级别间唯一
+        pattern = f"lt{uuid.uuid4().hex[:8]}n{{n:03d}}"
+        template = batch.find("text_input", label="命名模板")
+        self._step("batch_clone", batch, lambda: batch.input(template, string_value=pattern))
+        apply = batch.find("button", label="应用命名模板")
+        self._step("batch_clone", batch, lambda: batch.click(apply))
+        start = batch.find("button", label="🚀 开始批量克隆")
+        self._step("batch_clone", batch, lambda: batch.click(start))
+        if not self._poll(
+            "batch_clone",
+            batch,
+            lambda: any("批量处理完成" in alert.body for alert in batch.elements_of("alert")),
+        ):
+            self.errors.append("batch_clone: 等待克隆任务超时")
+
+
+@dataclass
+class LevelReport:
+    """一个并发级别的压测结果"""
+
+    sessions: int
+    seconds: float
+    reruns: int
+    failed_reruns: int
+    completed_flows: int
+    latency_ms: dict[str, float]
+    step_p95_ms: dict[str, float]
+    rss_start_mb: float | None
+    rss_end_mb: float | None
+    rss_growth_mb: float | None
+    api_calls: dict[str, int]
+    api_calls_total: int
+    # 服务进程中各缓存的命中率、请求合并情况、共享仓库重复创建次数和各锁的争用
+    caches: dict[str, dict]
+    single_flight: dict[str, dict]
+    shared_store_duplicates: int
+    locks: dict[str, dict]
+    errors: list[str]
+
+
+def _quantiles(values: list[float]) -> dict[str, float]:
+    return {
+        name: round(percentile(values, q) * 1000, 1)
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+    }
+
+
+def _mb(size: int | None) -> float | None:
+    return round(size / 1024 / 1024, 1) if size is not None else None
+
+
+def run_level(
+    ctx: HarnessContext, sessions: int, ramp: float, stats: Callable[[], dict]
+) -> LevelReport:
+    """以给定并发数运行一轮：各会话在 ramp 秒内陆续开始"""
+    before = stats()
+    users = [SimulatedSession(ctx, index) for index in range(sessions)]
+
+    def start(user: SimulatedSession) -> None:
+        time.sleep(ramp * user.index / sessions)
+        user.run()
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=start, args=(user,), name=f"load-session-{user.index}")
+        for user in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    after = stats()
+    for user in users:
+        user.close()
+    api_calls = {
+        endpoint: count - before["api_calls"].get(endpoint, 0)
+        for endpoint, count in sorted(after["api_calls"].items())
+        if count - before["api_calls"].get(endpoint, 0)
+    }
+    samples = [sample for user in users for sample in user.samples]
+    return LevelReport(
+        sessions=sessions,
+        seconds=round(seconds, 2),
+        reruns=len(samples),
+        failed_reruns=sum(not sample.ok for sample in samples),
+        completed_flows=sum(user.completed for user in users),
+        latency_ms=_quantiles([sample.seconds for sample in samples]),
+        step_p95_ms={
+            step: round(
+                percentile([s.seconds for s in samples if s.step == step], 0.95) * 1000, 1
+            )
+            for step in FLOW_STEPS
+            if any(s.step == step for s in samples)
+        },
+        rss_start_mb=_mb(before["rss"]),
+        rss_end_mb=_mb(after["rss"]),
+        rss_growth_mb=(
+            _mb(after["rss"] - before["rss"])
+            if before["rss"] is not None and after["rss"] is not None
+            else None
+        ),
+        api_calls=api_calls,
+        api_calls_total=sum(api_calls.values()),
+        caches=after["caches"],
+        single_flight=after["single_flight"],
+        shared_store_duplicates=after["shared_store_duplicates"],
+        locks=after["locks"],
+        errors=[f"#{user.index} {error}" for user in users for error in user.errors],
+    )
+
+
+def format_reports(reports: list[LevelReport]) -> str:
+    """按并发数汇总为文本表格"""
+    lines = [
+        f"{'并发':>4} {'重跑':>6} {'失败':>4} {'完成':>4} "
+        f"{'延迟p50':>9} {'p95':>9} {'p99':>9} "
+        f"{'内存(MB)':>9} {'增长':>7} {'接口调用':>8} {'每会话':>7}"
+    ]
+    for report in reports:
+        lines.append(
+            f"{report.sessions:>4} {report.reruns:>6} {report.failed_reruns:>4} "
+            f"{report.completed_flows:>4} "
+            f"{report.latency_ms['p50']:>9} {report.latency_ms['p95']:>9} "
+            f"{report.latency_ms['p99']:>9} "
+            f"{report.rss_end_mb if report.rss_end_mb is not None else '-':>9} "
+            f"{report.rss_growth_mb if report.rss_growth_mb is not None else '-':>7} "
+            f"{report.api_calls_total:>8} {report.api_calls_total / report.sessions:>7.1f}"
+        )
+    lines.append(f"注: {LATENCY_NOTE}")
+    lines.append("")
+    for report in reports:
+        steps = " ".join(f"{step}={ms}" for step, ms in report.step_p95_ms.items())
+        calls = " ".join(f"{endpoint}={count}" for endpoint, count in report.api_calls.items())
+        caches = " ".join(
+            f"{name}={stats['hit_ratio']}" for name, stats in report.caches.items()
+        )
+        flights = " ".join(
+            f"{endpoint}={stats['issued']}/{stats['collapsed']}"
+            for endpoint, stats in report.single_flight.items()
+        )
+        locks = " ".join(
+            f"{name}={stats['contended']}/{stats['acquired']}"
+            f"({stats['wait_ms']}ms,最长{stats['max_wait_ms']}ms)"
+            for name, stats in report.locks.items()
+            if stats["acquired"]
+        )
+        lines.append(f"[{report.sessions}] 各步骤p95(ms): {steps}")
+        lines.append(f"[{report.sessions}] 接口调用: {calls or '无'}")
+        lines.append(
+            f"[{report.sessions}] 缓存命中率: {caches or '无'}；"
+            f"共享数据重复创建 {report.shared_store_duplicates} 次"
+        )
+        lines.append(f"[{report.sessions}] 请求合并(发出/合并): {flights or '无'}")
+        lines.append(f"[{report.sessions}] 锁争用(等待/获取): {locks or '无'}")
+    return "\n".join(lines)
+
+
+def _levels(value: str) -> list[int]:
+    levels = [int(part) for part in value.split(",") if part.strip()]
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError("并发数必须是逗号分隔的正整数")
+    return levels
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="模拟并发会话压测")
+    parser.add_argument(
+        "--sessions", type=_levels, default=[1, 4, 8], help="逐级运行的并发数（默认 1,4,8）"
+    )
+    parser.add_argument("--rows", type=int, default=300, help="模拟剧本的行数（默认 300）")
+    parser.add_argument("--think", type=float, default=0.5, help="操作间的平均思考时间（秒）")
+    parser.add_argument("--ramp", type=float, default=2.0, help="会话陆续开始的时间窗口（秒）")
+    parser.add_argument(
+        "--batch-files", type=int, default=2, help="每个会话批量克隆的文件数，0 表示跳过"
+    )
+    parser.add_argument(
+        "--latency-scale", type=float, default=1.0, help="接口替身延迟的倍数，0 表示无延迟"
+    )
+    parser.add_argument(
+        "--clone-ready-after", type=float, default=5.0, help="克隆提交后多久就绪（秒）"
+    )
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="等待后台任务时的重跑间隔")
+    parser.add_argument("--poll-limit", type=int, default=60, help="等待后台任务的最多重跑次数")
+    parser.add_argument("--timeout", type=float, default=60.0, help="单次重跑的超时（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--workdir", type=Path, help="运行应用副本的目录（默认临时目录）")
+    parser.add_argument("--keep", action="store_true", help="保留工作目录及其中的数据")
+    parser.add_argument("--report", type=Path, help="JSON 报告输出路径")
+    return parser.parse_args(argv)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workdir: Path, args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    """在应用副本中启动 Streamlit 服务，等待其就绪，返回进程和地址；输出写入 server.log"""
+    port = _free_port()
+    address = f"127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        # 工作目录中没有 config.json，凭据只交给替身
+        "MINIMAX_API_KEY": "load-test",
+        "MINIMAX_GROUP_ID": "load-test",
+        SERVER_CONFIG_ENV: json.dumps(
+            {"latency_scale": args.latency_scale, "clone_ready_after": args.clone_ready_after}
+        ),
+    }
+    log_path = workdir / "server.log"
+    with open(log_path, "w", encoding="utf-8") as log:
+        server = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "streamlit",
+                "run",
+                SERVER_SCRIPT_NAME,
+                "--server.address",
+                "127.0.0.1",
+                "--server.port",
+                str(port),
+                "--server.headless",
+                "true",
+                "--server.enableXsrfProtection",
+                "false",
+                "--server.fileWatcherType",
+                "none",
+                "--browser.gatherUsageStats",
+                "false",
+                "--logger.level",
+                "error",
+            ],
+            cwd=workdir,
+            env=env,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"服务进程异常退出（{server.returncode}），见 {log_path}")
+        try:
+            if requests.get(f"http://{address}/_stcore/health", timeout=1).ok:
+                return server, address
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    stop_server(server)
+    raise RuntimeError(f"等待服务启动超时，见 {log_path}")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def run_level_server(args: argparse.Namespace, sessions: int, workdir: Path) -> LevelReport:
+    """在新的应用副本和新的服务进程中运行一个并发级别，缓存和数据不与其他级别共用"""
+    prepare_sandbox(workdir)
+    server, address = start_server(workdir, args)
+    try:
+        ctx = HarnessContext(
+            address=address,
+            script=build_script(args.rows, args.seed),
+            clone_sample=build_clone_sample(),
+            think=args.think,
+            batch_files=args.batch_files,
+            poll_interval=args.poll_interval,
+            poll_limit=args.poll_limit,
+            timeout=args.timeout,
+            seed=args.seed,
+        )
+        return run_level(
+            ctx, sessions, args.ramp, lambda: fetch_server_stats(address, args.timeout)
+        )
+    finally:
+        stop_server(server)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    base_dir = args.workdir or Path(tempfile.mkdtemp(prefix="voicehub_load_"))
+    reports = []
+    try:
+        for sessions in args.sessions:
+            print(f"运行 {sessions} 个并发会话（新的服务进程）...", file=sys.stderr)
+            try:
+                report = run_level_server(args, sessions, base_dir / f"level_{sessions}")
+            except RuntimeError as e:
+                print(f"  {e}", file=sys.stderr)
+                return 1
+            for error in report.errors:
+                print(f"  {error}", file=sys.stderr)
+            reports.append(report)
+    finally:
+        # 指定了工作目录时保留各级别的应用副本、数据和服务日志
+        if args.keep or args.workdir:
+            print(f"工作目录: {base_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    print(format_reports(reports))
+    if args.report:
+        args.report.write_text(
+            json.dumps(
+                {"note": LATENCY_NOTE, "levels": [asdict(report) for report in reports]},
+                ensure_ascii=False,
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+    return 1 if any(report.failed_reruns or report.errors for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
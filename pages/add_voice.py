@@ -2,13 +2,17 @@
 添加音色页面
 """
 
-import os
-import tempfile
 import streamlit as st
 
+from components.audio_preflight import render_audio_preflight
+from components.jobs import clone_job, get_job_registry, job_owner, render_job_status
 from components.voice_manager import VoiceManager
+from utils.validation import validate_voice_id
+from utils.timing import timed_render
 
 
+@st.fragment
+@timed_render("添加音色")
 def render_add_voice(voice_manager: VoiceManager):
     """渲染添加音色页面"""
     st.header("➕ 添加音色")
@@ -30,6 +34,22 @@ def render_add_voice(voice_manager: VoiceManager):
             file_size = uploaded_file.size / 1024 / 1024  # MB
             st.write(f"文件大小: {file_size:.2f} MB")
 
+            # 本地预检：不符合要求的文件不上传
+            reports, preflight_options = render_audio_preflight(
+                [uploaded_file], key="add_voice"
+            )
+            report = reports[0]
+            if report.decoded:
+                st.caption(
+                    f"时长 {report.duration:.1f} 秒 | {report.channels} 声道 | "
+                    f"{report.sample_rate} Hz | 峰值 {report.peak_db:.1f} dBFS | "
+                    f"RMS {report.rms_db:.1f} dBFS"
+                )
+            for error in report.errors:
+                st.error(error)
+            for warning in report.warnings:
+                st.warning(warning)
+
             # 音色配置
             st.subheader("音色配置")
 
@@ -61,56 +81,49 @@ def render_add_voice(voice_manager: VoiceManager):
             if st.button("🚀 开始克隆", type="primary"):
                 if voice_id and uploaded_file:
                     # 验证voice_id格式
-                    if len(voice_id) < 8:
-                        st.error("音色ID必须至少8位")
-                    elif not voice_id[0].isalpha():
-                        st.error("音色ID必须以字母开头")
-                    elif not (
-                        any(c.isalpha() for c in voice_id)
-                        and any(c.isdigit() for c in voice_id)
-                    ):
-                        st.error("音色ID必须包含字母和数字")
+                    voice_id_error = validate_voice_id(voice_id)
+                    if voice_id_error is None and voice_id in {
+                        voice.voice_id
+                        for voice in voice_manager.cloned_voices_cache or []
+                    }:
+                        voice_id_error = "音色ID已存在"
+                    if voice_id_error:
+                        st.error(voice_id_error)
+                    elif not report.ok:
+                        st.error("音频未通过本地预检，请处理后重新选择文件")
                     else:
-                        with st.spinner("正在上传文件..."):
-                            try:
-                                # 保存上传的文件到临时位置
-                                with tempfile.NamedTemporaryFile(
-                                    delete=False,
-                                    suffix=f".{uploaded_file.name.split('.')[-1]}",
-                                ) as tmp_file:
-                                    tmp_file.write(uploaded_file.getvalue())
-                                    tmp_path = tmp_file.name
-
-                                # 上传文件
-                                file_id = voice_manager.client.file_upload(tmp_path)
-                                st.success(f"文件上传成功，ID: {file_id}")
-
-                                # 开始克隆
-                                with st.spinner("正在克隆音色..."):
-                                    success = voice_manager.clone_voice(
-                                        file_id=file_id,
-                                        voice_id=voice_id,
-                                        need_noise_reduction=need_noise_reduction,
-                                        need_volume_normalization=need_volume_normalization,
-                                        accuracy=accuracy,
-                                        model=model,
-                                        text=preview_text if preview_text else None,
-                                    )
-
-                                    if success:
-                                        st.success("音色克隆任务已提交！")
-                                        st.info(
-                                            "克隆过程可能需要几分钟时间，请稍后刷新音色列表查看状态。"
-                                        )
-
-                                # 清理临时文件
-                                os.unlink(tmp_path)
-
-                            except Exception as e:
-                                st.error(f"处理过程中发生错误: {str(e)}")
+                        # 提交后台任务：上传并克隆
+                        job = get_job_registry().submit(
+                            "clone",
+                            f"{uploaded_file.name} -> {voice_id}",
+                            clone_job,
+                            voice_manager,
+                            uploaded_file,
+                            uploaded_file.name,
+                            voice_id,
+                            owner=job_owner(voice_manager),
+                            # 预检处理过的文件在任务中重新处理后上传
+                            preflight=(
+                                preflight_options if report.processed_name else None
+                            ),
+                            need_noise_reduction=need_noise_reduction,
+                            need_volume_normalization=need_volume_normalization,
+                            accuracy=accuracy,
+                            model=model,
+                            text=preview_text if preview_text else None,
+                        )
+                        st.session_state.add_voice_job_id = job.job_id
                 else:
                     st.warning("请填写音色ID并选择文件")
 
+            # 显示克隆任务状态（页面重跑后仍然保留）
+            job_id = st.session_state.get("add_voice_job_id")
+            if job_id:
+                jobs = render_job_status([job_id])
+                if jobs and jobs[0].status == "succeeded":
+                    st.success("音色克隆任务已提交！")
+                    st.info("克隆过程可能需要几分钟时间，音色就绪后会自动通知并更新音色列表。")
+
     with col2:
         st.info(
             """
@@ -3,14 +3,146 @@
 """
 
 import streamlit as st
-import os
-import tempfile
-
-import numpy as np
-import pandas as pd
-import io
 
+from components.audio_preflight import render_audio_preflight
+from components.jobs import clone_job, get_job_registry, job_owner, render_job_status
 from components.voice_manager import VoiceManager
+from utils.batch_journal import JOURNAL_STATUS, get_batch_journal, hash_file_data
+from utils.manifest import check_manifest, read_manifest
+
+# 批量配置表格的列名
+BATCH_COLUMNS = {
+    "file_name": "文件名",
+    "size_mb": "大小(MB)",
+    "voice_id": "音色ID",
+    "preview_text": "预览文本",
+    "status": "状态",
+}
+READY_STATUS = "✅ 就绪"
+
+
+def _sync_batch_config(uploaded_files) -> None:
+    """上传文件变化时重建配置表，保留仍在列表中的文件已填写的配置"""
+    import pandas as pd
+
+    signature = [(file.name, file.size) for file in uploaded_files]
+    if st.session_state.get("batch_config_files") == signature:
+        return
+    previous = st.session_state.get("batch_config")
+    config = pd.DataFrame(
+        {
+            "file_name": [file.name for file in uploaded_files],
+            "size_mb": [round(file.size / 1024 / 1024, 2) for file in uploaded_files],
+            "voice_id": "",
+            "preview_text": "",
+            "status": "",
+        }
+    )
+    if previous is not None:
+        kept = previous.drop_duplicates("file_name").set_index("file_name")
+        for column in ("voice_id", "preview_text"):
+            config[column] = (
+                config["file_name"].map(kept[column]).fillna("").astype(str)
+            )
+    st.session_state.batch_config = config
+    st.session_state.batch_config_files = signature
+    _reset_batch_editor()
+
+
+def _file_hashes(uploaded_files) -> list[str]:
+    """上传文件的内容哈希，按文件缓存在会话中，只计算新增的文件"""
+    cached = st.session_state.get("batch_file_hashes", {})
+    hashes = {
+        file.file_id: cached.get(file.file_id) or hash_file_data(file)
+        for file in uploaded_files
+    }
+    st.session_state.batch_file_hashes = hashes
+    return [hashes[file.file_id] for file in uploaded_files]
+
+
+def _reset_batch_editor() -> None:
+    """配置表被整体改写后换一个编辑器 key，丢弃编辑器中已应用过的修改"""
+    st.session_state.batch_editor_version = (
+        st.session_state.get("batch_editor_version", 0) + 1
+    )
+
+
+def _batch_editor_key() -> str:
+    return f"batch_editor_{st.session_state.get('batch_editor_version', 0)}"
+
+
+def _apply_editor_changes(config) -> None:
+    """把编辑器里的修改写回配置表，使状态列在本次重跑中就能反映修改"""
+    changes = st.session_state.get(_batch_editor_key()) or {}
+    for position, values in changes.get("edited_rows", {}).items():
+        for column, value in values.items():
+            if column in ("voice_id", "preview_text"):
+                config.iat[int(position), config.columns.get_loc(column)] = (
+                    value or ""
+                ).strip()
+
+
+def _apply_manifest(config, manifest) -> None:
+    """把 CSV 中通过校验的配置按文件名填入配置表"""
+    rows = manifest[manifest["error"] == ""].drop_duplicates("file_name")
+    rows = rows.set_index("file_name")
+    matched = config["file_name"].isin(rows.index)
+    for column in ("voice_id", "preview_text"):
+        values = config.loc[matched, "file_name"].map(rows[column])
+        if column == "preview_text":
+            # CSV 中预览文本为空时保留已填写的内容
+            values = values.where(values != "", config.loc[matched, column])
+        config.loc[matched, column] = values
+    _reset_batch_editor()
+
+
+def _render_bulk_edit(config) -> None:
+    """批量编辑：按模板命名、添加前后缀、预览文本向下填充"""
+    import pandas as pd
+
+    with st.expander("批量编辑", expanded=not config["voice_id"].any()):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            pattern = st.text_input(
+                "命名模板",
+                value="voice{n:03d}",
+                help="{n} 为序号，{stem} 为不含扩展名的文件名，例如 hero_{n:02d}",
+            )
+            only_empty = st.checkbox("仅填充空白的音色ID", value=True)
+            if st.button("应用命名模板"):
+                stems = config["file_name"].str.rsplit(".", n=1).str[0]
+                try:
+                    generated = [
+                        pattern.format(n=n, stem=stem)
+                        for n, stem in enumerate(stems, start=1)
+                    ]
+                except (KeyError, IndexError, ValueError) as e:
+                    st.error(f"命名模板无效: {str(e)}")
+                else:
+                    target = config["voice_id"] == "" if only_empty else config.index
+                    config.loc[target, "voice_id"] = pd.Series(
+                        generated, index=config.index
+                    )[target]
+                    _reset_batch_editor()
+        with col2:
+            prefix = st.text_input("前缀")
+            suffix = st.text_input("后缀")
+            if st.button("添加前后缀") and (prefix or suffix):
+                filled = config["voice_id"] != ""
+                config.loc[filled, "voice_id"] = (
+                    prefix + config.loc[filled, "voice_id"] + suffix
+                )
+                _reset_batch_editor()
+        with col3:
+            st.write("预览文本")
+            if st.button("向下填充", help="空白的预览文本沿用上一行的内容"):
+                config["preview_text"] = (
+                    config["preview_text"].mask(config["preview_text"] == "").ffill()
+                ).fillna("")
+                _reset_batch_editor()
+            if st.button("清空预览文本"):
+                config["preview_text"] = ""
+                _reset_batch_editor()
 
 
 def render_batch_upload(voice_manager: VoiceManager):
@@ -26,36 +158,13 @@ def render_batch_upload(voice_manager: VoiceManager):
     )
 
     if uploaded_files:
-        st.success(f"已选择 {len(uploaded_files)} 个文件")
-
-        # 显示文件列表
-        st.subheader("文件列表")
-
-        # 创建文件信息表格
-        file_info = []
-        for i, file in enumerate(uploaded_files):
-            file_info.append(
-                {
-                    "序号": i + 1,
-                    "文件名": file.name,
-                    "大小(MB)": f"{file.size / 1024 / 1024:.2f}",
-                    "格式": file.name.split(".")[-1].upper(),
-                }
-            )
-
-        # 显示文件表格
-        for info in file_info:
-            col1, col2, col3, col4 = st.columns([1, 3, 1, 1])
-            with col1:
-                st.write(info["序号"])
-            with col2:
-                st.write(info["文件名"])
-            with col3:
-                st.write(info["大小(MB)"])
-            with col4:
-                st.write(info["格式"])
+        total_size = sum(file.size for file in uploaded_files) / 1024 / 1024
+        st.success(f"已选择 {len(uploaded_files)} 个文件，共 {total_size:.2f} MB")
 
-        st.divider()
+        # 本地预检：在进程池中检查所有文件，不符合要求的文件不上传
+        preflight, preflight_options = render_audio_preflight(
+            uploaded_files, key="batch"
+        )
 
         # 批量配置
         st.subheader("批量配置")
@@ -63,11 +172,6 @@ def render_batch_upload(voice_manager: VoiceManager):
         col1, col2 = st.columns(2)
 
         with col1:
-            # 基础配置
-            base_voice_id = st.text_input(
-                "基础音色ID", help="将作为音色ID的前缀，会自动添加序号"
-            )
-
             need_noise_reduction = st.checkbox("降噪", value=False)
             need_volume_normalization = st.checkbox("音量标准化", value=False)
             accuracy = st.slider("文本验证精度", 0.0, 1.0, 0.7, 0.1)
@@ -81,12 +185,21 @@ def render_batch_upload(voice_manager: VoiceManager):
                 ],
             )
 
-        with col2:
-            # 自定义音色ID和预览文本
-            st.write("自定义音色ID和预览文本:")
-            custom_voice_ids = {}
-            custom_preview_texts = {}
+        _sync_batch_config(uploaded_files)
+        config = st.session_state.batch_config
+        _apply_editor_changes(config)
 
+        # 已存在的音色ID：只有本批次（相同的文件和音色ID）之前自己克隆的除外，便于中断后重跑
+        journal = get_batch_journal()
+        file_hashes = _file_hashes(uploaded_files)
+        batch_id = journal.make_batch_id(
+            job_owner(voice_manager), list(zip(file_hashes, config["voice_id"]))
+        )
+        existing_voice_ids = {
+            voice.voice_id for voice in voice_manager.cloned_voices_cache or []
+        } - journal.resumed_voice_ids(batch_id)
+
+        with col2:
             # CSV导入功能
             csv_file = st.file_uploader(
                 "从CSV导入配置",
@@ -96,163 +209,195 @@ def render_batch_upload(voice_manager: VoiceManager):
 
             if csv_file:
                 try:
-                    # 读取CSV文件
-                    csv_content = csv_file.read().decode("utf-8")
-                    df = pd.read_csv(
-                        io.StringIO(csv_content),
-                        na_values=["", "nan", "NaN"],
-                        keep_default_na=False,
+                    manifest = check_manifest(
+                        read_manifest(csv_file),
+                        existing_voice_ids,
+                        file_names=config["file_name"],
                     )
-
-                    # 验证CSV格式
-                    if len(df.columns) >= 2:
-                        # 创建文件名到配置的映射
-                        csv_config = {}
-                        for _, row in df.iterrows():
-                            filename = row.iloc[0]  # 第一列：文件名
-                            voice_id = (
-                                row.iloc[1] if len(df.columns) > 1 else None
-                            )  # 第二列：音色ID
-                            preview_text = (
-                                row.iloc[2] if len(df.columns) > 2 else None
-                            )  # 第三列：预览文本
-
-                            # 处理空值，将空字符串转换为None
-                            if voice_id == "" or voice_id is None:
-                                voice_id = None
-                            if preview_text is None or np.isnan(preview_text):
-                                preview_text = ""
-
-                            csv_config[filename] = {
-                                "voice_id": voice_id,
-                                "preview_text": preview_text,
-                            }
-
-                        st.success(f"成功导入 {len(csv_config)} 条配置")
-
-                        # 应用CSV配置到文件
-                        for i, file in enumerate(uploaded_files):
-                            if file.name in csv_config:
-                                config = csv_config[file.name]
-                                if config["voice_id"]:
-                                    custom_voice_ids[i] = config["voice_id"]
-                                if config["preview_text"]:
-                                    custom_preview_texts[i] = config["preview_text"]
-                    else:
-                        st.error("CSV文件格式错误，需要至少包含文件名和音色ID两列")
+                    invalid_rows = manifest[manifest["error"] != ""]
+                    st.success(f"成功导入 {len(manifest) - len(invalid_rows)} 条配置")
+                    if len(invalid_rows):
+                        st.warning(f"{len(invalid_rows)} 条配置未通过校验，已忽略")
+                        st.dataframe(
+                            invalid_rows.rename(
+                                columns={**BATCH_COLUMNS, "error": "错误"}
+                            ),
+                            use_container_width=True,
+                        )
+                    # 同一个 CSV 只应用一次，之后在表格中的修改不会被覆盖
+                    if st.session_state.get("batch_csv_id") != csv_file.file_id:
+                        _apply_manifest(config, manifest)
+                        st.session_state.batch_csv_id = csv_file.file_id
                 except Exception as e:
                     st.error(f"CSV文件解析失败: {str(e)}")
 
-            for i, file in enumerate(uploaded_files):
-                default_id = (
-                    f"{base_voice_id}_{i + 1}" if base_voice_id else f"voice_{i + 1}"
-                )
-
-                # 音色ID输入
-                custom_id_value = custom_voice_ids.get(i, default_id)
-                custom_id = st.text_input(
-                    f"音色ID {i + 1}: {file.name}",
-                    value=custom_id_value,
-                    key=f"custom_id_{i}",
-                )
-                custom_voice_ids[i] = custom_id
-
-                # 预览文本输入
-                preview_text_value = custom_preview_texts.get(i, "")
-                preview_text = st.text_area(
-                    f"预览文本 {i + 1}: {file.name}",
-                    value=preview_text_value,
-                    height=68,
-                    key=f"preview_text_{i}",
+        _render_bulk_edit(config)
+
+        # 状态列：格式、批次内重复、与已有音色重名，整列一次校验
+        errors = check_manifest(config, existing_voice_ids)["error"]
+        config["status"] = errors.where(errors != "", READY_STATUS)
+        config.loc[config["voice_id"] == "", "status"] = "请填写音色ID"
+        preflight_errors = [
+            "；".join(report.errors) if report.errors else None
+            for report in preflight
+        ]
+        config["status"] = config["status"].mask(
+            [error is not None for error in preflight_errors], preflight_errors
+        )
+
+        st.data_editor(
+            config,
+            key=_batch_editor_key(),
+            hide_index=True,
+            use_container_width=True,
+            num_rows="fixed",
+            disabled=["file_name", "size_mb", "status"],
+            column_config={
+                "file_name": st.column_config.TextColumn(BATCH_COLUMNS["file_name"]),
+                "size_mb": st.column_config.NumberColumn(
+                    BATCH_COLUMNS["size_mb"], format="%.2f"
+                ),
+                "voice_id": st.column_config.TextColumn(
+                    BATCH_COLUMNS["voice_id"],
+                    help="必须以字母开头，包含字母和数字，至少8位",
+                ),
+                "preview_text": st.column_config.TextColumn(
+                    BATCH_COLUMNS["preview_text"],
                     help="用于验证音色的文本，可选",
-                )
-                custom_preview_texts[i] = preview_text
+                    width="large",
+                ),
+                "status": st.column_config.TextColumn(BATCH_COLUMNS["status"]),
+            },
+        )
+        invalid_count = int((config["status"] != READY_STATUS).sum())
+        if invalid_count:
+            st.caption(f"{invalid_count} 个文件的配置需要修改")
 
         # 开始批量处理
         if st.button("🚀 开始批量克隆", type="primary"):
-            if not base_voice_id and not any(custom_voice_ids.values()):
-                st.error("请设置基础音色ID或自定义音色ID")
+            if invalid_count:
+                st.error(f"请先修改 {invalid_count} 个状态不是“就绪”的文件配置")
             else:
-                # 验证所有音色ID
-                invalid_ids = []
-                for i, voice_id in custom_voice_ids.items():
-                    if len(voice_id) < 8:
-                        invalid_ids.append(f"文件 {i + 1}: 音色ID太短")
-                    elif not voice_id[0].isalpha():
-                        invalid_ids.append(f"文件 {i + 1}: 音色ID必须以字母开头")
-                    elif not (
-                        any(c.isalpha() for c in voice_id)
-                        and any(c.isdigit() for c in voice_id)
-                    ):
-                        invalid_ids.append(f"文件 {i + 1}: 音色ID必须包含字母和数字")
-
-                if invalid_ids:
-                    for error in invalid_ids:
-                        st.error(error)
-                else:
-                    # 开始批量处理
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-
-                    success_count = 0
-                    error_count = 0
-
-                    for i, file in enumerate(uploaded_files):
-                        status_text.text(
-                            f"处理文件 {i + 1}/{len(uploaded_files)}: {file.name}"
+                voice_ids = config["voice_id"].tolist()
+                preview_texts = config["preview_text"].tolist()
+                files = [(file.name, file) for file in uploaded_files]
+                # 预检处理过的文件在任务中按相同选项重新处理后上传
+                file_preflight = [
+                    preflight_options if report.processed_name else None
+                    for report in preflight
+                ]
+                # 登记批次日志：同一批文件和音色ID重跑时会跳过已完成的步骤
+                journal.start_batch(
+                    job_owner(voice_manager),
+                    [
+                        (file_hash, file_name, voice_id)
+                        for (file_name, _), file_hash, voice_id in zip(
+                            files, file_hashes, voice_ids
                         )
-
-                        try:
-                            # 保存文件到临时位置
-                            with tempfile.NamedTemporaryFile(
-                                delete=False, suffix=f".{file.name.split('.')[-1]}"
-                            ) as tmp_file:
-                                tmp_file.write(file.getvalue())
-                                tmp_path = tmp_file.name
-
-                            # 上传文件
-                            file_id = voice_manager.client.file_upload(tmp_path)
-
-                            # 克隆音色
-                            voice_id = custom_voice_ids[i]
-                            preview_text = custom_preview_texts.get(i, None)
-                            # 确保预览文本不是空字符串
-                            if preview_text and preview_text.strip():
-                                preview_text = preview_text.strip()
-                            else:
-                                preview_text = None
-
-                            success = voice_manager.clone_voice(
-                                file_id=file_id,
-                                voice_id=voice_id,
-                                need_noise_reduction=need_noise_reduction,
-                                need_volume_normalization=need_volume_normalization,
-                                accuracy=accuracy,
-                                model=model,
-                                text=preview_text,
-                            )
-
-                            if success:
-                                success_count += 1
-                                st.success(f"✅ {file.name} -> {voice_id}")
-                            else:
-                                error_count += 1
-                                st.error(f"❌ {file.name} -> {voice_id}")
-
-                            # 清理临时文件
-                            os.unlink(tmp_path)
-
-                        except Exception as e:
-                            error_count += 1
-                            st.error(f"❌ {file.name}: {str(e)}")
-
-                        # 更新进度
-                        progress_bar.progress((i + 1) / len(uploaded_files))
-
-                    status_text.text("批量处理完成！")
-                    st.success(
-                        f"批量处理完成！成功: {success_count}, 失败: {error_count}"
+                    ],
+                    label=f"{len(uploaded_files)} 个文件",
+                    batch_id=batch_id,
+                )
+                st.session_state.batch_id = batch_id
+                previous = journal.summary(batch_id)
+                if previous.get("cloned") or previous.get("uploaded"):
+                    st.info(
+                        f"检测到该批次之前的进度：已完成 {previous.get('cloned', 0)} 个，"
+                        f"已上传 {previous.get('uploaded', 0)} 个，将跳过已完成的步骤"
                     )
 
-                    if success_count > 0:
-                        st.info("克隆任务已提交！请稍后刷新音色列表查看状态。")
+                # 开始批量处理：每个文件提交一个后台任务
+                registry = get_job_registry()
+                job_ids = []
+                for (file_name, file_data), voice_id, preview_text, options in zip(
+                    files, voice_ids, preview_texts, file_preflight
+                ):
+                    job = registry.submit(
+                        "clone",
+                        f"{file_name} -> {voice_id}",
+                        clone_job,
+                        voice_manager,
+                        file_data,
+                        file_name,
+                        voice_id,
+                        journal=journal,
+                        batch_id=batch_id,
+                        preflight=options,
+                        owner=job_owner(voice_manager),
+                        need_noise_reduction=need_noise_reduction,
+                        need_volume_normalization=need_volume_normalization,
+                        accuracy=accuracy,
+                        model=model,
+                        # 确保预览文本不是空字符串
+                        text=preview_text or None,
+                    )
+                    job_ids.append(job.job_id)
+                st.session_state.batch_job_ids = job_ids
+
+        # 显示批量任务进度（页面重跑后仍然保留）
+        batch_job_ids = st.session_state.get("batch_job_ids", [])
+        if batch_job_ids:
+            st.subheader("处理进度")
+            jobs = render_job_status(batch_job_ids)
+            if jobs and all(job.done for job in jobs):
+                success_count = sum(job.status == "succeeded" for job in jobs)
+                error_count = len(jobs) - success_count
+                st.success(
+                    f"批量处理完成！成功: {success_count}, 失败: {error_count}"
+                )
+                if success_count > 0:
+                    st.info("克隆任务已提交！音色就绪后会自动通知并更新音色列表。")
+
+    render_batch_journal(voice_manager)
+
+
+def render_batch_journal(voice_manager: VoiceManager):
+    """批次日志：查询最近批次的上传和克隆进度"""
+    import pandas as pd
+
+    journal = get_batch_journal()
+    batches = journal.recent_batches(job_owner(voice_manager))
+    if not batches:
+        return
+
+    st.divider()
+    st.subheader("📒 批次日志")
+    batch_labels = {
+        batch["batch_id"]: (
+            f"{batch['batch_id']} | {batch['label']} | "
+            f"完成 {batch['cloned'] or 0}/{batch['file_count']}"
+            f"{' | 失败 ' + str(batch['failed']) if batch['failed'] else ''}"
+        )
+        for batch in batches
+    }
+    current_batch_id = st.session_state.get("batch_id")
+    options = list(batch_labels)
+    batch_id = st.selectbox(
+        "选择批次",
+        options=options,
+        index=options.index(current_batch_id) if current_batch_id in options else 0,
+        format_func=batch_labels.get,
+    )
+    summary = journal.summary(batch_id)
+    st.caption(
+        " | ".join(
+            f"{JOURNAL_STATUS[status]}: {count}" for status, count in summary.items()
+        )
+    )
+    entries = pd.DataFrame(journal.entries(batch_id))
+    entries["status"] = entries["status"].map(JOURNAL_STATUS)
+    entries["updated_at"] = pd.to_datetime(entries["updated_at"], unit="s")
+    st.dataframe(
+        entries.rename(
+            columns={
+                "file_name": "文件名",
+                "voice_id": "音色ID",
+                "status": "状态",
+                "file_id": "文件ID",
+                "error": "错误",
+                "updated_at": "更新时间",
+            }
+        ),
+        hide_index=True,
+        use_container_width=True,
+    )
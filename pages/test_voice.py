@@ -3,10 +3,20 @@
 import streamlit as st
 
 from components.audio_parameters import render_audio_parameters
+from components.render_history import render_render_history
 from components.clone_voices_manager import render_clone_voices_manager
 from components.system_voices_manager import render_system_voices_manager
 from components.voice_manager import VoiceManager
 from components.debug_panel import display_debug_panel
+from utils.timing import timed_render
+
+
+@st.fragment
+@timed_render("音频参数")
+def render_audio_panel(voice_manager: VoiceManager) -> None:
+    """渲染音频参数和渲染记录（独立片段，调整参数时只重跑本区域）"""
+    render_audio_parameters(voice_manager)
+    render_render_history(voice_manager)
 
 
 def render_test_voice(voice_manager: VoiceManager) -> None:
@@ -36,13 +46,21 @@ def render_test_voice(voice_manager: VoiceManager) -> None:
     # 显示当前选择的数据状态
     if "file_prefix" in st.session_state and st.session_state.file_prefix:
         st.info(
-            f"📋 当前选择: {st.session_state.file_prefix} | 搜索关键词: {st.session_state.get('test_voice_search', '无')}"
+            f"📋 当前选择: {st.session_state.file_prefix} | 角色: {st.session_state.get('cast_character') or '无'}"
         )
 
         # 添加清除选择按钮
         if st.button("🗑️ 清除选择", help="清除当前选择的数据"):
             # 清除所有相关状态
-            for key in ["test_voice_search", "test_text", "file_prefix"]:
+            for key in [
+                "test_voice_search",
+                "test_text",
+                "file_prefix",
+                "cast_character",
+                "selected_row_key",
+                "selected_row_script",
+                "selected_row_position",
+            ]:
                 if key in st.session_state:
                     del st.session_state[key]
             st.rerun()
@@ -69,7 +87,7 @@ def render_test_voice(voice_manager: VoiceManager) -> None:
             key="test_text",
         )
         st.markdown("### 第三步：调整音频参数")
-        render_audio_parameters(voice_manager)
+        render_audio_panel(voice_manager)
 
     with explain_col:
         if st.session_state.get("debug_mode"):
@@ -99,9 +117,9 @@ def render_test_voice(voice_manager: VoiceManager) -> None:
             - 情感: 选择语音的情感表达
             - 语言增强: 提高特定语言的发音质量
             
-            **支持的音频格式：**
-            - MP3 (默认)
-            - 采样率: 44100
-            - 比特率: 256kbps
+            **渲染档位：**
+            - 快速试听: turbo 模型, 24000Hz, 64kbps
+            - 成片质量: hd 模型, 44100Hz, 256kbps
+            - 在渲染记录中勾选"通过"后可批量定稿
             """
             )
@@ -4,7 +4,10 @@
 
 import streamlit as st
 
+from components.jobs import delete_job, get_job_registry, job_owner, render_job_status
 from components.voice_manager import VoiceManager
+from components.voice_metadata_editor import render_voice_metadata_editor
+from utils.voice_index import VOICE_SORTS
 
 
 def render_voice_list(voice_manager: VoiceManager):
@@ -21,19 +24,18 @@ def render_voice_list(voice_manager: VoiceManager):
         if "show_bulk_confirm" not in st.session_state:
             st.session_state.show_bulk_confirm = False
 
-        # 排序功能
-        col_sort, col_bulk = st.columns([2, 2])
+        # 搜索和排序功能（在本地音色索引中完成）
+        col_search, col_sort, col_bulk = st.columns([2, 2, 2])
+        with col_search:
+            search_term = st.text_input(
+                "🔍 搜索音色",
+                placeholder="音色ID、描述、标签、角色名或拼音",
+                key="voice_list_search",
+            )
         with col_sort:
             sort_by = st.selectbox(
                 "🔄 排序方式",
-                options=[
-                    "创建时间 (最新)",
-                    "创建时间 (最旧)",
-                    "音色ID (A-Z)",
-                    "音色ID (Z-A)",
-                    "描述 (A-Z)",
-                    "描述 (Z-A)",
-                ],
+                options=list(VOICE_SORTS),
                 help="选择音色列表的排序方式",
             )
         with col_bulk:
@@ -60,11 +62,16 @@ def render_voice_list(voice_manager: VoiceManager):
             col_confirm, col_cancel = st.columns(2)
             with col_confirm:
                 if st.button("✅ 确认批量删除", type="primary"):
-                    success_count = 0
-                    for voice_id in list(st.session_state.selected_voices):
-                        if voice_manager.delete_voice(voice_id):
-                            success_count += 1
-                    st.success(f"成功删除 {success_count} 个音色")
+                    voice_ids = sorted(st.session_state.selected_voices)
+                    job = get_job_registry().submit(
+                        "delete",
+                        f"{len(voice_ids)} 个音色",
+                        delete_job,
+                        voice_manager,
+                        voice_ids,
+                        owner=job_owner(voice_manager),
+                    )
+                    st.session_state.bulk_delete_job_id = job.job_id
                     st.session_state.selected_voices.clear()
                     st.session_state.show_bulk_confirm = False
                     st.rerun()
@@ -73,20 +80,16 @@ def render_voice_list(voice_manager: VoiceManager):
                     st.session_state.show_bulk_confirm = False
                     st.rerun()
 
-        # 排序音色列表
-        sorted_voices = voices.copy()
-        if sort_by == "创建时间 (最新)":
-            sorted_voices.sort(key=lambda x: x.created_time, reverse=True)
-        elif sort_by == "创建时间 (最旧)":
-            sorted_voices.sort(key=lambda x: x.created_time, reverse=False)
-        elif sort_by == "音色ID (A-Z)":
-            sorted_voices.sort(key=lambda x: x.voice_id, reverse=False)
-        elif sort_by == "音色ID (Z-A)":
-            sorted_voices.sort(key=lambda x: x.voice_id, reverse=True)
-        elif sort_by == "描述 (A-Z)":
-            sorted_voices.sort(key=lambda x: (x.description or ""), reverse=False)
-        elif sort_by == "描述 (Z-A)":
-            sorted_voices.sort(key=lambda x: (x.description or ""), reverse=True)
+        # 显示批量删除任务状态
+        bulk_delete_job_id = st.session_state.get("bulk_delete_job_id")
+        if bulk_delete_job_id:
+            render_job_status([bulk_delete_job_id])
+
+        sorted_voices = voice_manager.voice_index.search(
+            voice_manager.group_id, "clone", search_term, sort_by
+        )
+        with st.expander("🏷️ 标签与角色名"):
+            render_voice_metadata_editor(voice_manager, sorted_voices)
 
         st.subheader(f"音色列表 ({len(sorted_voices)} 个)")
         for i, voice in enumerate(sorted_voices):
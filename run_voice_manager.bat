@@ -1 +1 @@
-uv run streamlit run app.py --server.port 8502 --server.address 0.0.0.0
+uv run python serve.py --server.port 8502 --server.address 0.0.0.0
@@ -0,0 +1,27 @@
+"""
+启动服务并预热：与 streamlit run app.py 相同，但在服务启动时就在后台加载示例台本、音色列表等共享缓存，
+不必等第一个会话触发
+
+用法:
+    uv run python serve.py [--server.port 8502 --server.address 0.0.0.0] [-- --debug]
+"""
+
+import sys
+from pathlib import Path
+
+from streamlit.web import cli as stcli
+
+from components.warmup import get_warmup
+from utils.config import load_config
+
+
+def main() -> int:
+    load_config()
+    get_warmup().start()
+    # 在同一进程中启动服务，会话与预热共用进程内的缓存
+    sys.argv = ["streamlit", "run", str(Path(__file__).parent / "app.py"), *sys.argv[1:]]
+    return stcli.main()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
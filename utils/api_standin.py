@@ -0,0 +1,140 @@
+"""
+本地接口替身：按 MiniMaxSpeech 客户端的接口返回模拟数据，带可配置的延迟并统计调用量，供压测使用
+"""
+
+import binascii
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+# 各接口的默认模拟延迟（秒）
+DEFAULT_LATENCY = {
+    "get_cloned_voices": 0.3,
+    "get_system_voices": 0.3,
+    "text_to_speech": 0.8,
+    "file_upload": 0.5,
+    "voice_clone": 1.0,
+    "voice_delete": 0.2,
+}
+# 克隆提交后多久出现在克隆音色列表中（秒）
+DEFAULT_CLONE_READY_AFTER = 10.0
+# 模拟音频的码率：每个字约 0.25 秒
+_AUDIO_BYTES_PER_CHAR = 4000
+
+_OK = SimpleNamespace(is_success=True, error_type=None)
+
+
+def _voice(voice_id: str, description: str, created_time: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        voice_id=voice_id, description=[description], created_time=created_time
+    )
+
+
+class StandInAPI:
+    """所有替身客户端共享的服务端状态：音色列表、待就绪的克隆和调用计数"""
+
+    def __init__(
+        self,
+        clone_voices: list[str],
+        system_voices: list[str],
+        latency: dict[str, float] | None = None,
+        jitter: float = 0.2,
+        clone_ready_after: float = DEFAULT_CLONE_READY_AFTER,
+    ) -> None:
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.jitter = jitter
+        self.clone_ready_after = clone_ready_after
+        self._lock = threading.Lock()
+        self._calls: Counter[str] = Counter()
+        self._file_ids = itertools.count(1)
+        now = time.strftime("%Y-%m-%d %H:%M:%S")
+        # voice_id -> (音色, 就绪时间)
+        self._cloned: dict[str, tuple[SimpleNamespace, float]] = {
+            voice_id: (_voice(voice_id, voice_id, now), 0.0) for voice_id in clone_voices
+        }
+        self._system = [
+            SimpleNamespace(voice_id=voice_id, voice_name=voice_id, description=[])
+            for voice_id in system_voices
+        ]
+
+    def client(self, api_key: str = "", group_id: str = "", **_) -> "StandInClient":
+        """与 MiniMaxSpeech 相同的构造参数，可直接替换客户端类"""
+        return StandInClient(self)
+
+    def call(self, endpoint: str) -> None:
+        """计数并按配置的延迟等待（在调用方线程中）"""
+        with self._lock:
+            self._calls[endpoint] += 1
+        delay = self.latency.get(endpoint, 0.0)
+        if delay > 0:
+            time.sleep(delay * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def calls(self) -> dict[str, int]:
+        """各接口的累计调用次数"""
+        with self._lock:
+            return dict(self._calls)
+
+    def cloned_voices(self) -> list[SimpleNamespace]:
+        now = time.time()
+        with self._lock:
+            return [voice for voice, ready_at in self._cloned.values() if ready_at <= now]
+
+    def system_voices(self) -> list[SimpleNamespace]:
+        return list(self._system)
+
+    def add_clone(self, voice_id: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._cloned[voice_id] = (
+                _voice(voice_id, "", time.strftime("%Y-%m-%d %H:%M:%S")),
+                now + self.clone_ready_after,
+            )
+
+    def remove_clone(self, voice_id: str) -> None:
+        with self._lock:
+            self._cloned.pop(voice_id, None)
+
+    def next_file_id(self) -> int:
+        with self._lock:
+            return next(self._file_ids)
+
+
+class StandInClient:
+    """替身客户端，只实现本项目用到的方法"""
+
+    def __init__(self, api: StandInAPI) -> None:
+        self.api = api
+
+    def get_cloned_voices(self) -> list[SimpleNamespace]:
+        self.api.call("get_cloned_voices")
+        return self.api.cloned_voices()
+
+    def get_system_voices(self) -> list[SimpleNamespace]:
+        self.api.call("get_system_voices")
+        return self.api.system_voices()
+
+    def text_to_speech_simple(self, text: str, voice_id: str, **_) -> SimpleNamespace:
+        self.api.call("text_to_speech")
+        # MP3 帧头加静音填充，长度与字数成正比
+        audio = b"\xff\xfb\x90\x00" + bytes(_AUDIO_BYTES_PER_CHAR * max(len(text), 1))
+        return SimpleNamespace(
+            base_resp=_OK,
+            data=SimpleNamespace(audio=binascii.hexlify(audio).decode("ascii")),
+        )
+
+    def file_upload(self, file_path: str) -> int:
+        self.api.call("file_upload")
+        return self.api.next_file_id()
+
+    def voice_clone_simple(self, file_id: int, voice_id: str, **_) -> SimpleNamespace:
+        self.api.call("voice_clone")
+        self.api.add_clone(voice_id)
+        return SimpleNamespace(base_resp=_OK)
+
+    def voice_delete(self, voice_id: str) -> SimpleNamespace:
+        self.api.call("voice_delete")
+        self.api.remove_clone(voice_id)
+        return SimpleNamespace(base_resp=_OK)
@@ -0,0 +1,7 @@
+"""
+音频处理的异常（不依赖 numpy，供启动路径上的模块导入）
+"""
+
+
+class AudioDecodeError(Exception):
+    """无法解码音频"""
@@ -0,0 +1,338 @@
+"""
+上传前的本地音频检查和处理：解码、统计电平，按需转单声道、重采样、去静音和压缩体积
+"""
+
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from utils.audio_errors import AudioDecodeError
+from utils.spool import UploadSource, spooled_path
+
+# 克隆接口的限制
+MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+MIN_DURATION = 10.0
+MAX_DURATION = 300.0
+
+SILENCE_THRESHOLD_DB = -50.0
+SILENCE_FRAME_SECONDS = 0.02
+# 体积超限时依次尝试的采样率
+FIT_SAMPLE_RATES = [32000, 24000, 16000]
+
+
+@dataclass(frozen=True)
+class PreflightOptions:
+    """检查时对音频做的处理"""
+
+    downmix: bool = True
+    sample_rate: int | None = None
+    trim_silence: bool = False
+    fit_size: bool = True
+
+
+@dataclass
+class AudioReport:
+    """单个文件的检查结果"""
+
+    file_name: str
+    size_bytes: int
+    decoded: bool = False
+    duration: float = 0.0
+    channels: int = 0
+    sample_rate: int = 0
+    peak_db: float = float("-inf")
+    rms_db: float = float("-inf")
+    # 处理过的文件会重新编码为 WAV
+    processed_name: str = ""
+    processed_bytes: int = 0
+    actions: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    warnings: list[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def as_row(self) -> dict:
+        """表格展示用的一行"""
+        return {
+            "文件名": self.file_name,
+            "时长(秒)": round(self.duration, 1) if self.decoded else None,
+            "声道": self.channels or None,
+            "采样率": self.sample_rate or None,
+            "峰值(dBFS)": round(self.peak_db, 1) if self.decoded else None,
+            "RMS(dBFS)": round(self.rms_db, 1) if self.decoded else None,
+            "大小(MB)": round(
+                (self.processed_bytes or self.size_bytes) / 1024 / 1024, 2
+            ),
+            "处理": "、".join(self.actions),
+            "问题": "；".join(self.errors + self.warnings),
+        }
+
+
+def _to_db(value: float) -> float:
+    return float(20 * np.log10(value)) if value > 0 else float("-inf")
+
+
+def _read_wav(data: bytes) -> tuple[np.ndarray, int]:
+    """读取 PCM WAV，返回 (帧数, 声道数) 的 float32 数组和采样率"""
+    with wave.open(io.BytesIO(data)) as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (
+            raw[:, 0].astype(np.int32)
+            | (raw[:, 1].astype(np.int32) << 8)
+            | (raw[:, 2].astype(np.int32) << 16)
+        )
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        raise AudioDecodeError(f"不支持的采样位深: {width * 8} bit")
+    return samples.reshape(-1, channels), sample_rate
+
+
+def _decode_with_ffmpeg(data: bytes, file_name: str) -> tuple[np.ndarray, int]:
+    """其他格式通过 ffmpeg 转成 WAV 再读取"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise AudioDecodeError("未安装 ffmpeg，无法解码该格式")
+    suffix = os.path.splitext(file_name)[1]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, f"source{suffix}")
+        target = os.path.join(tmp_dir, "decoded.wav")
+        with open(source, "wb") as f:
+            f.write(data)
+        result = subprocess.run(
+            [ffmpeg, "-v", "error", "-y", "-i", source, "-c:a", "pcm_s16le", target],
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            raise AudioDecodeError(result.stderr.decode("utf-8", "replace").strip())
+        with open(target, "rb") as f:
+            return _read_wav(f.read())
+
+
+def decode_audio(data: bytes, file_name: str) -> tuple[np.ndarray, int]:
+    """解码音频为 float32 数组（帧数, 声道数）和采样率"""
+    if file_name.lower().endswith(".wav"):
+        try:
+            return _read_wav(data)
+        except (wave.Error, EOFError):
+            # 非 PCM 的 WAV（如浮点）交给 ffmpeg
+            pass
+    return _decode_with_ffmpeg(data, file_name)
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """编码为 16 bit PCM WAV"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(samples.shape[1])
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+    """线性插值重采样"""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    length = int(round(len(samples) * target_rate / source_rate))
+    source_times = np.arange(len(samples)) / source_rate
+    target_times = np.arange(length) / target_rate
+    return np.stack(
+        [
+            np.interp(target_times, source_times, samples[:, channel])
+            for channel in range(samples.shape[1])
+        ],
+        axis=1,
+    ).astype(np.float32)
+
+
+def trim_silence(
+    samples: np.ndarray, sample_rate: int, threshold_db: float = SILENCE_THRESHOLD_DB
+) -> np.ndarray:
+    """去除首尾低于阈值的静音段"""
+    frame = max(1, int(sample_rate * SILENCE_FRAME_SECONDS))
+    count = len(samples) // frame
+    if count == 0:
+        return samples
+    frames = samples[: count * frame].reshape(count, frame, -1)
+    rms = np.sqrt(np.mean(frames**2, axis=(1, 2)))
+    loud = np.flatnonzero(rms > 10 ** (threshold_db / 20))
+    if len(loud) == 0:
+        return samples
+    return samples[loud[0] * frame : (loud[-1] + 1) * frame]
+
+
+def preflight_audio(
+    data: bytes, file_name: str, options: PreflightOptions = PreflightOptions()
+) -> tuple[AudioReport, bytes | None]:
+    """检查单个文件，返回检查结果和处理后的音频（未处理时为 None）"""
+    report = AudioReport(file_name=file_name, size_bytes=len(data))
+    try:
+        samples, sample_rate = decode_audio(data, file_name)
+    except Exception as e:
+        report.warnings.append(f"无法解码，未检查音频内容: {str(e)}")
+        if len(data) > MAX_UPLOAD_BYTES:
+            report.errors.append("文件超过20MB")
+        return report, None
+
+    report.decoded = True
+    report.channels = samples.shape[1]
+    report.sample_rate = sample_rate
+    report.duration = len(samples) / sample_rate if sample_rate else 0.0
+    report.peak_db = _to_db(float(np.max(np.abs(samples)))) if samples.size else float("-inf")
+    report.rms_db = _to_db(float(np.sqrt(np.mean(samples**2)))) if samples.size else float("-inf")
+
+    processed = False
+    if options.downmix and samples.shape[1] > 1:
+        samples = samples.mean(axis=1, keepdims=True)
+        report.actions.append("转为单声道")
+        processed = True
+    if options.sample_rate and options.sample_rate != sample_rate:
+        samples = resample(samples, sample_rate, options.sample_rate)
+        sample_rate = options.sample_rate
+        report.actions.append(f"重采样为 {sample_rate} Hz")
+        processed = True
+    if options.trim_silence:
+        trimmed = trim_silence(samples, sample_rate)
+        if len(trimmed) < len(samples):
+            report.actions.append(
+                f"去除静音 {(len(samples) - len(trimmed)) / sample_rate:.1f} 秒"
+            )
+            samples = trimmed
+            processed = True
+
+    output = encode_wav(samples, sample_rate) if processed else None
+    if options.fit_size and len(output or data) > MAX_UPLOAD_BYTES:
+        if samples.shape[1] > 1:
+            samples = samples.mean(axis=1, keepdims=True)
+            report.actions.append("转为单声道")
+        output = encode_wav(samples, sample_rate)
+        for rate in FIT_SAMPLE_RATES:
+            if len(output) <= MAX_UPLOAD_BYTES or rate >= sample_rate:
+                continue
+            samples = resample(samples, sample_rate, rate)
+            sample_rate = rate
+            output = encode_wav(samples, sample_rate)
+        report.actions.append(f"重新编码为 {sample_rate} Hz WAV")
+
+    final_channels = samples.shape[1]
+    final_duration = len(samples) / sample_rate if sample_rate else 0.0
+    if output is not None:
+        report.processed_name = os.path.splitext(file_name)[0] + ".wav"
+        report.processed_bytes = len(output)
+    if len(output or data) > MAX_UPLOAD_BYTES:
+        report.errors.append("文件超过20MB")
+    if final_channels > 1:
+        report.errors.append("仅支持单声道音频")
+    if final_duration < MIN_DURATION:
+        report.errors.append(f"时长不足{MIN_DURATION:.0f}秒")
+    elif final_duration > MAX_DURATION:
+        report.errors.append(f"时长超过{MAX_DURATION / 60:.0f}分钟")
+    if report.peak_db >= -0.1:
+        report.warnings.append("可能存在削波")
+    if report.rms_db < -40:
+        report.warnings.append("音量过低")
+    return report, output
+
+
+@contextmanager
+def _source_data(source: UploadSource) -> Iterator[bytes | memoryview]:
+    """读取上传数据：文件对象直接使用其内部缓冲区，不复制内容"""
+    if isinstance(source, (str, os.PathLike)):
+        yield Path(source).read_bytes()
+    elif hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            yield view
+    else:
+        yield source
+
+
+def _preflight_path(
+    path: str, file_name: str, options: PreflightOptions
+) -> AudioReport:
+    """子进程中读取临时文件并检查，只返回检查结果，处理后的音频不传回调用方"""
+    return preflight_audio(Path(path).read_bytes(), file_name, options)[0]
+
+
+def preflight_many(
+    files: list[tuple[str, UploadSource]],
+    options: PreflightOptions = PreflightOptions(),
+    max_workers: int | None = None,
+) -> list[AudioReport]:
+    """
+    在进程池中并行检查多个文件，返回与输入顺序一致的检查结果；
+    每个文件只在检查期间写出临时文件交给子进程，同时进行的文件数不超过进程数，
+    内存占用不随批次文件数增长；处理后的音频不保留，上传时由 process_upload 重新生成
+    """
+    if len(files) <= 1:
+        reports = []
+        for name, source in files:
+            with _source_data(source) as data:
+                reports.append(preflight_audio(data, name, options)[0])
+        return reports
+
+    workers = max_workers or os.cpu_count() or 1
+    reports: list[AudioReport | None] = [None] * len(files)
+    # 页面服务是多线程的，子进程用 spawn 启动而不是 fork 整个服务进程
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context("spawn")
+    ) as executor, ExitStack() as stack:
+        # future -> (文件序号, 该文件的临时文件)
+        in_flight: dict[Future, tuple[int, ExitStack]] = {}
+
+        def collect(done) -> None:
+            for future in done:
+                index, spool = in_flight.pop(future)
+                spool.close()
+                reports[index] = future.result()
+
+        for index, (name, source) in enumerate(files):
+            if len(in_flight) >= workers:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            spool = stack.enter_context(ExitStack())
+            path = spool.enter_context(spooled_path(source, name))
+            future = executor.submit(_preflight_path, path, name, options)
+            in_flight[future] = (index, spool)
+        collect(wait(in_flight).done)
+    return reports
+
+
+def process_upload(
+    source: UploadSource, file_name: str, options: PreflightOptions
+) -> tuple[bytes | None, str]:
+    """
+    在克隆任务中按预检选项重新处理音频，返回 (处理后的音频, 上传文件名)，
+    无需处理时为 (None, file_name)；处理结果只在上传期间占用内存
+    """
+    with _source_data(source) as data:
+        report, output = preflight_audio(data, file_name, options)
+    if output is None:
+        return None, file_name
+    return output, report.processed_name
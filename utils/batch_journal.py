@@ -0,0 +1,248 @@
+"""
+批量克隆日志：把每个文件的上传和克隆进度持久化到 SQLite，便于中断后续跑
+"""
+
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import streamlit as st
+
+from utils.metrics import TimedLock
+
+DEFAULT_JOURNAL_PATH = Path(__file__).parent.parent / "data" / "batch_journal.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    group_id TEXT NOT NULL,
+    label TEXT NOT NULL DEFAULT '',
+    file_count INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_files (
+    batch_id TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    voice_id TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    file_id INTEGER,
+    uploaded_at REAL,
+    clone_submitted_at REAL,
+    cloned_at REAL,
+    error TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (batch_id, file_hash, voice_id)
+);
+CREATE INDEX IF NOT EXISTS idx_batches_group ON batches (group_id, updated_at);
+"""
+
+# 文件状态：pending -> uploaded -> cloning -> cloned，任一步失败为 failed
+JOURNAL_STATUS = {
+    "pending": "⏳ 待处理",
+    "uploaded": "📤 已上传",
+    "cloning": "🧬 克隆已提交",
+    "cloned": "✅ 已完成",
+    "failed": "❌ 失败",
+}
+
+
+def hash_file_data(data) -> str:
+    """计算文件内容哈希，data 为 bytes 或 BytesIO（如上传的文件，不复制内容）"""
+    if hasattr(data, "getbuffer"):
+        with data.getbuffer() as view:
+            return hashlib.sha256(view).hexdigest()
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str | Path, chunk_size: int = 1024 * 1024) -> str:
+    """分块读取磁盘文件计算内容哈希，结果与 hash_file_data 一致"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class JournalEntry:
+    """批次中一个文件的进度"""
+
+    batch_id: str
+    file_hash: str
+    voice_id: str
+    file_name: str
+    status: str
+    file_id: int | None
+    error: str
+
+
+class BatchJournal:
+    """批量克隆日志"""
+
+    def __init__(self, path: str | Path = DEFAULT_JOURNAL_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = TimedLock("batch_journal")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_batch_id(group_id: str, files: list[tuple[str, str]]) -> str:
+        """由 Group ID 和（文件哈希, 音色ID）列表生成批次ID，同一批次重跑时ID不变"""
+        payload = group_id + "\n" + "\n".join(f"{h}:{v}" for h, v in sorted(files))
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+    def start_batch(
+        self,
+        group_id: str,
+        files: list[tuple[str, str, str]],
+        label: str = "",
+        batch_id: str = "",
+    ) -> str:
+        """
+        登记批次，files 为（文件哈希, 文件名, 音色ID）列表；已登记的文件保留原有进度
+        :param batch_id: 预先由全部配置行算出的批次ID，为空时由 files 生成
+        """
+        batch_id = batch_id or self.make_batch_id(group_id, [(h, v) for h, _, v in files])
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """INSERT INTO batches (batch_id, group_id, label, file_count, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (batch_id) DO UPDATE SET updated_at = excluded.updated_at""",
+                (batch_id, group_id, label, len(files), now, now),
+            )
+            conn.executemany(
+                """INSERT OR IGNORE INTO batch_files
+                (batch_id, file_hash, voice_id, file_name, updated_at)
+                VALUES (?, ?, ?, ?, ?)""",
+                [(batch_id, h, v, name, now) for h, name, v in files],
+            )
+        return batch_id
+
+    def get_entry(
+        self, batch_id: str, file_hash: str, voice_id: str
+    ) -> JournalEntry | None:
+        """读取一个文件的进度"""
+        with self._connect() as conn:
+            row = conn.execute(
+                """SELECT batch_id, file_hash, voice_id, file_name, status, file_id, error
+                FROM batch_files WHERE batch_id = ? AND file_hash = ? AND voice_id = ?""",
+                (batch_id, file_hash, voice_id),
+            ).fetchone()
+        return JournalEntry(**dict(row)) if row else None
+
+    def _update(self, batch_id: str, file_hash: str, voice_id: str, **fields) -> None:
+        now = time.time()
+        fields["updated_at"] = now
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"""UPDATE batch_files SET {assignments}
+                WHERE batch_id = ? AND file_hash = ? AND voice_id = ?""",
+                (*fields.values(), batch_id, file_hash, voice_id),
+            )
+            conn.execute(
+                "UPDATE batches SET updated_at = ? WHERE batch_id = ?", (now, batch_id)
+            )
+
+    def record_upload(
+        self, batch_id: str, file_hash: str, voice_id: str, file_id: int
+    ) -> None:
+        self._update(
+            batch_id,
+            file_hash,
+            voice_id,
+            status="uploaded",
+            file_id=file_id,
+            uploaded_at=time.time(),
+            error="",
+        )
+
+    def record_clone_submitted(self, batch_id: str, file_hash: str, voice_id: str) -> None:
+        self._update(
+            batch_id,
+            file_hash,
+            voice_id,
+            status="cloning",
+            clone_submitted_at=time.time(),
+        )
+
+    def record_cloned(self, batch_id: str, file_hash: str, voice_id: str) -> None:
+        self._update(
+            batch_id, file_hash, voice_id, status="cloned", cloned_at=time.time(), error=""
+        )
+
+    def record_failure(
+        self, batch_id: str, file_hash: str, voice_id: str, error: str
+    ) -> None:
+        self._update(batch_id, file_hash, voice_id, status="failed", error=error)
+
+    def entries(self, batch_id: str) -> list[dict]:
+        """列出批次中所有文件的进度"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT file_name, voice_id, status, file_id, error, updated_at
+                FROM batch_files WHERE batch_id = ? ORDER BY file_name""",
+                (batch_id,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def summary(self, batch_id: str) -> dict[str, int]:
+        """按状态统计批次中的文件数"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT status, COUNT(*) AS count FROM batch_files
+                WHERE batch_id = ? GROUP BY status""",
+                (batch_id,),
+            ).fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    def resumed_voice_ids(self, batch_id: str) -> set[str]:
+        """
+        列出该批次自己提交或完成克隆的音色ID，重跑同一批次时不视为重名；
+        批次ID由（文件哈希, 音色ID）决定，其他批次或换了音频的同名音色仍算重名
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT DISTINCT voice_id FROM batch_files
+                WHERE batch_id = ? AND status IN ('cloning', 'cloned')""",
+                (batch_id,),
+            ).fetchall()
+        return {row["voice_id"] for row in rows}
+
+    def recent_batches(self, group_id: str, limit: int = 10) -> list[dict]:
+        """列出最近的批次及其完成情况"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT b.batch_id, b.label, b.file_count, b.created_at, b.updated_at,
+                    SUM(f.status = 'cloned') AS cloned,
+                    SUM(f.status = 'failed') AS failed
+                FROM batches b LEFT JOIN batch_files f ON f.batch_id = b.batch_id
+                WHERE b.group_id = ?
+                GROUP BY b.batch_id ORDER BY b.updated_at DESC LIMIT ?""",
+                (group_id, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+@st.cache_resource
+def get_batch_journal() -> BatchJournal:
+    """获取进程内共享的批量克隆日志"""
+    return BatchJournal()
@@ -0,0 +1,301 @@
+"""
+剪辑交付：把渲染的 MP3 转成带时间码（bext 时间参考）的 Broadcast WAV，并生成按时间码排布的 OTIO 时间线
+"""
+
+import io
+import json
+import shutil
+import struct
+import subprocess
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from utils.audio_errors import AudioDecodeError
+from utils.excel import TIMECODE_FPS, timecode_to_frames
+from utils.render_ledger import Take
+from utils.take_archive import archive_name
+
+# 广播交付常用的采样率
+BWF_SAMPLE_RATE = 48000
+BWF_ORIGINATOR = "minimax-voicehub"
+
+
+@dataclass
+class ConformResult:
+    """一条渲染的转换结果"""
+
+    row_key: str
+    timecode: str
+    character: str
+    voice_id: str
+    path: str = ""
+    sample_rate: int = BWF_SAMPLE_RATE
+    # 时间参考：从午夜起的采样数
+    time_reference: int = 0
+    samples: int = 0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return not self.error
+
+
+def _fixed(text: str, size: int) -> bytes:
+    """bext 定长字段：UTF-8 编码，截断并以 0 填充"""
+    data = text.encode("utf-8")[:size]
+    return data.ljust(size, b"\0")
+
+
+def bext_chunk(
+    description: str, originator_reference: str, time_reference: int, coding_history: str
+) -> bytes:
+    """生成 EBU Tech 3285 第 1 版的 bext 块"""
+    now = time.localtime()
+    history = coding_history.encode("ascii", "replace") + b"\r\n"
+    body = b"".join(
+        [
+            _fixed(description, 256),
+            _fixed(BWF_ORIGINATOR, 32),
+            _fixed(originator_reference, 32),
+            time.strftime("%Y-%m-%d", now).encode("ascii"),
+            time.strftime("%H:%M:%S", now).encode("ascii"),
+            struct.pack("<II", time_reference & 0xFFFFFFFF, time_reference >> 32),
+            struct.pack("<H", 1),
+            b"\0" * 64,  # UMID
+            b"\0" * 190,  # 保留
+            history,
+        ]
+    )
+    if len(body) % 2:
+        body += b"\0"
+    return b"bext" + struct.pack("<I", len(body)) + body
+
+
+def encode_bwf(pcm_wav: bytes, bext: bytes) -> bytes:
+    """在 PCM WAV 的 fmt 块之前插入 bext 块"""
+    with wave.open(io.BytesIO(pcm_wav)) as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        sample_rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+    fmt = struct.pack(
+        "<HHIIHH",
+        1,
+        channels,
+        sample_rate,
+        sample_rate * channels * width,
+        channels * width,
+        width * 8,
+    )
+    chunks = bext + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+    chunks += b"data" + struct.pack("<I", len(frames)) + frames
+    if len(frames) % 2:
+        chunks += b"\0"
+    return b"RIFF" + struct.pack("<I", 4 + len(chunks)) + b"WAVE" + chunks
+
+
+def _decode_to_pcm(path: str, sample_rate: int) -> bytes:
+    """用 ffmpeg 把音频解码为指定采样率的 16 bit PCM WAV"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise AudioDecodeError("未安装 ffmpeg，无法解码 MP3")
+    result = subprocess.run(
+        [
+            ffmpeg,
+            "-v",
+            "error",
+            "-i",
+            path,
+            "-ar",
+            str(sample_rate),
+            "-c:a",
+            "pcm_s16le",
+            "-f",
+            "wav",
+            "-",
+        ],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise AudioDecodeError(result.stderr.decode("utf-8", "replace").strip())
+    return result.stdout
+
+
+def conform_take(
+    take: Take,
+    out_dir: str,
+    fps: int = TIMECODE_FPS,
+    sample_rate: int = BWF_SAMPLE_RATE,
+) -> ConformResult:
+    """把一条渲染转换为 BWF，时间参考取该行的时间码（在进程池中调用）"""
+    result = ConformResult(take.row_key, take.timecode, take.character, take.voice_id)
+    frames = timecode_to_frames(take.timecode, fps)
+    if frames < 0:
+        result.error = f"时间码无法解析: {take.timecode}"
+        return result
+    result.sample_rate = sample_rate
+    result.time_reference = frames * sample_rate // fps
+    try:
+        pcm = _decode_to_pcm(take.audio_path, sample_rate)
+        with wave.open(io.BytesIO(pcm)) as wav:
+            result.samples = wav.getnframes()
+        bext = bext_chunk(
+            description=f"{take.character} {take.voice_id}".strip(),
+            originator_reference=take.row_key.rpartition("|")[2],
+            time_reference=result.time_reference,
+            coding_history=f"A=PCM,F={sample_rate},W=16,T={BWF_ORIGINATOR}",
+        )
+        path = Path(out_dir) / Path(archive_name(take)).with_suffix(".wav")
+        path.write_bytes(encode_bwf(pcm, bext))
+        result.path = str(path)
+    except (AudioDecodeError, OSError, wave.Error, EOFError) as e:
+        result.error = str(e)
+    return result
+
+
+def conform_takes(
+    takes: list[Take],
+    out_dir: str | Path,
+    fps: int = TIMECODE_FPS,
+    sample_rate: int = BWF_SAMPLE_RATE,
+    max_workers: int | None = None,
+) -> list[ConformResult]:
+    """在进程池中并行转换，结果顺序与输入一致"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if len(takes) <= 1:
+        return [conform_take(take, str(out_dir), fps, sample_rate) for take in takes]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(
+            executor.map(
+                conform_take,
+                takes,
+                [str(out_dir)] * len(takes),
+                [fps] * len(takes),
+                [sample_rate] * len(takes),
+                chunksize=8,
+            )
+        )
+
+
+def _rational_time(value: float, rate: float) -> dict:
+    return {"OTIO_SCHEMA": "RationalTime.1", "rate": rate, "value": value}
+
+
+def _time_range(start: float, duration: float, rate: float) -> dict:
+    return {
+        "OTIO_SCHEMA": "TimeRange.1",
+        "start_time": _rational_time(start, rate),
+        "duration": _rational_time(duration, rate),
+    }
+
+
+def build_otio_timeline(
+    results: list[ConformResult], name: str, fps: int = TIMECODE_FPS
+) -> dict:
+    """
+    按时间码把转换好的音频排布到 OTIO 时间线（以采样为单位）；
+    时间上重叠的台词放到新的音轨上
+    """
+    placed = sorted(
+        (result for result in results if result.ok),
+        key=lambda result: result.time_reference,
+    )
+    # 每条音轨：(子元素列表, 当前末尾采样位置)
+    tracks: list[tuple[list[dict], int]] = []
+    for result in placed:
+        rate = result.sample_rate
+        start = result.time_reference
+        lane = next(
+            (index for index, (_, end) in enumerate(tracks) if end <= start), None
+        )
+        if lane is None:
+            tracks.append(([], 0))
+            lane = len(tracks) - 1
+        children, end = tracks[lane]
+        if start > end:
+            children.append(
+                {
+                    "OTIO_SCHEMA": "Gap.1",
+                    "name": "",
+                    "metadata": {},
+                    "source_range": _time_range(0, start - end, rate),
+                    "effects": [],
+                    "markers": [],
+                }
+            )
+        children.append(
+            {
+                "OTIO_SCHEMA": "Clip.1",
+                "name": Path(result.path).name,
+                "metadata": {
+                    "minimax_voicehub": {
+                        "row_key": result.row_key,
+                        "timecode": result.timecode,
+                        "character": result.character,
+                        "voice_id": result.voice_id,
+                    }
+                },
+                "source_range": _time_range(start, result.samples, rate),
+                "media_reference": {
+                    "OTIO_SCHEMA": "ExternalReference.1",
+                    "name": "",
+                    "metadata": {},
+                    "target_url": Path(result.path).resolve().as_uri(),
+                    "available_range": _time_range(start, result.samples, rate),
+                },
+                "effects": [],
+                "markers": [],
+            }
+        )
+        tracks[lane] = (children, start + result.samples)
+
+    return {
+        "OTIO_SCHEMA": "Timeline.1",
+        "name": name,
+        "metadata": {"minimax_voicehub": {"fps": fps}},
+        "global_start_time": _rational_time(0, fps),
+        "tracks": {
+            "OTIO_SCHEMA": "Stack.1",
+            "name": "tracks",
+            "metadata": {},
+            "source_range": None,
+            "effects": [],
+            "markers": [],
+            "children": [
+                {
+                    "OTIO_SCHEMA": "Track.1",
+                    "name": f"A{index + 1}",
+                    "kind": "Audio",
+                    "metadata": {},
+                    "source_range": None,
+                    "effects": [],
+                    "markers": [],
+                    "children": children,
+                }
+                for index, (children, _) in enumerate(tracks)
+            ],
+        },
+    }
+
+
+def export_conform(
+    takes: list[Take],
+    out_dir: str | Path,
+    name: str = "timeline",
+    fps: int = TIMECODE_FPS,
+    sample_rate: int = BWF_SAMPLE_RATE,
+    max_workers: int | None = None,
+) -> tuple[list[ConformResult], Path]:
+    """转换全部渲染并在同一目录写出 OTIO 时间线，返回转换结果和时间线路径"""
+    out_dir = Path(out_dir)
+    results = conform_takes(takes, out_dir, fps, sample_rate, max_workers)
+    timeline_path = out_dir / f"{name}.otio"
+    timeline_path.write_text(
+        json.dumps(build_otio_timeline(results, name, fps), ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    return results, timeline_path
@@ -0,0 +1,299 @@
+"""
+选角表：剧本角色名到音色的映射及每个角色的默认参数，持久化到 SQLite，查询走内存字典
+"""
+
+import json
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import streamlit as st
+
+from utils.excel import CHARACTER_COLUMN
+from utils.metrics import TimedLock
+from utils.naming import convert_to_pinyin
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from utils.voice_index import IndexedVoice
+
+DEFAULT_CASTING_PATH = Path(__file__).parent.parent / "data" / "casting.sqlite3"
+
+# 剧本角色名列表在共享数据仓库中的命名空间，键与剧本相同
+CHARACTERS_NAMESPACE = "script_characters"
+
+# 音色ID中分隔词的字符
+_VOICE_ID_SEPARATORS = re.compile(r"[\W_\d]+")
+
+# 可以按角色设置的默认参数
+CAST_PARAMS = ("speed", "volume", "pitch", "emotion", "language_boost")
+# 情感和语言增强的可选值，与参数界面的下拉框相同（界面上另有"无"表示不设置）
+EMOTIONS = ("happy", "sad", "angry", "fearful", "disgusted", "surprised", "neutral")
+LANGUAGE_BOOSTS = (
+    "Chinese",
+    "English",
+    "French",
+    "German",
+    "Spanish",
+    "Italian",
+    "Japanese",
+    "Korean",
+    "Russian",
+    "Arabic",
+    "Portuguese",
+    "Turkish",
+    "Dutch",
+    "Ukrainian",
+    "Vietnamese",
+    "Indonesian",
+    "Thai",
+    "Polish",
+    "Romanian",
+    "Greek",
+    "Czech",
+    "Finnish",
+    "Hindi",
+    "auto",
+)
+CAST_PARAM_OPTIONS = {"emotion": EMOTIONS, "language_boost": LANGUAGE_BOOSTS}
+# 数值参数的取值范围，与参数界面的滑块相同（音调为整数）
+CAST_PARAM_RANGES = {"speed": (0.5, 2.0), "volume": (0.0, 10.0), "pitch": (-12, 12)}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS casting (
+    group_id TEXT NOT NULL,
+    character TEXT NOT NULL,
+    voice_id TEXT NOT NULL,
+    params TEXT NOT NULL DEFAULT '{}',
+    source TEXT NOT NULL DEFAULT 'manual',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (group_id, character)
+);
+"""
+
+
+@dataclass
+class CastEntry:
+    """一个角色的选角"""
+
+    character: str
+    voice_id: str
+    # 只包含设置过的参数，未设置的沿用界面上的参数
+    params: dict = field(default_factory=dict)
+    # auto：按拼音或音色的角色名自动匹配；manual：手动指定
+    source: str = "manual"
+
+
+def script_characters(df: "pd.DataFrame") -> list[str]:
+    """剧本中出现的角色名（去重，保持出现顺序）"""
+    if df is None or df.empty or len(df.columns) <= CHARACTER_COLUMN:
+        return []
+    names = df.iloc[:, CHARACTER_COLUMN].dropna().astype(str).str.strip()
+    return [name for name in names.unique() if name and name != "nan"]
+
+
+def validate_cast_params(params: dict) -> dict:
+    """
+    规范化角色默认参数：去掉空值和不能按角色设置的参数；
+    情感、语言增强须是界面下拉框中的选项，数值须在滑块范围内，否则抛出 ValueError
+    """
+    valid = {}
+    for name, value in params.items():
+        if name not in CAST_PARAMS or value is None:
+            continue
+        if name in CAST_PARAM_OPTIONS:
+            if value not in CAST_PARAM_OPTIONS[name]:
+                raise ValueError(f"参数 {name} 的取值 {value!r} 不在可选项中")
+            valid[name] = value
+            continue
+        low, high = CAST_PARAM_RANGES[name]
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"参数 {name} 的取值 {value!r} 不是数字") from None
+        if not low <= number <= high:
+            raise ValueError(f"参数 {name} 的取值 {value!r} 超出范围 {low} ~ {high}")
+        if isinstance(low, int):
+            if not number.is_integer():
+                raise ValueError(f"参数 {name} 的取值 {value!r} 须为整数")
+            number = int(number)
+        valid[name] = number
+    return valid
+
+
+def _usable_params(params: dict) -> dict:
+    """已保存的参数中仍然有效的部分（早期版本可能保存了界面无法使用的值）"""
+    usable = {}
+    for name, value in params.items():
+        try:
+            usable.update(validate_cast_params({name: value}))
+        except ValueError:
+            pass
+    return usable
+
+
+def _split_names(text: str) -> list[str]:
+    return [name.strip() for name in text.replace("，", ",").split(",") if name.strip()]
+
+
+class CastingMap:
+    """选角表"""
+
+    def __init__(self, path: str | Path = DEFAULT_CASTING_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = TimedLock("casting_map")
+        # group_id -> 角色名 -> 选角，按 Group 首次使用时从数据库加载
+        self._entries: dict[str, dict[str, CastEntry]] = {}
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _group(self, group_id: str) -> dict[str, CastEntry]:
+        """读取一个 Group 的选角表（调用方需持有锁）"""
+        entries = self._entries.get(group_id)
+        if entries is None:
+            with self._connect() as conn:
+                entries = {
+                    row["character"]: CastEntry(
+                        row["character"],
+                        row["voice_id"],
+                        _usable_params(json.loads(row["params"])),
+                        row["source"],
+                    )
+                    for row in conn.execute(
+                        """SELECT character, voice_id, params, source
+                        FROM casting WHERE group_id = ?""",
+                        (group_id,),
+                    )
+                }
+            self._entries[group_id] = entries
+        return entries
+
+    def get(self, group_id: str, character: str) -> CastEntry | None:
+        """按角色名查找选角"""
+        with self._lock:
+            return self._group(group_id).get(character.strip())
+
+    def entries(self, group_id: str) -> dict[str, CastEntry]:
+        with self._lock:
+            return dict(self._group(group_id))
+
+    def assign(
+        self,
+        group_id: str,
+        character: str,
+        voice_id: str,
+        params: dict | None = None,
+        source: str = "manual",
+    ) -> None:
+        """
+        指定角色的音色和默认参数；音色为空时移除该角色的选角；
+        参数取值无效时抛出 ValueError（见 validate_cast_params）
+        """
+        character = character.strip()
+        if not voice_id:
+            self.unassign(group_id, character)
+            return
+        params = validate_cast_params(params or {})
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute(
+                    """INSERT INTO casting (group_id, character, voice_id, params, source, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (group_id, character) DO UPDATE SET
+                        voice_id = excluded.voice_id,
+                        params = excluded.params,
+                        source = excluded.source,
+                        updated_at = excluded.updated_at""",
+                    (
+                        group_id,
+                        character,
+                        voice_id,
+                        json.dumps(params, ensure_ascii=False),
+                        source,
+                        time.time(),
+                    ),
+                )
+            self._group(group_id)[character] = CastEntry(
+                character, voice_id, params, source
+            )
+
+    def unassign(self, group_id: str, character: str) -> None:
+        with self._lock:
+            with self._connect() as conn:
+                conn.execute(
+                    "DELETE FROM casting WHERE group_id = ? AND character = ?",
+                    (group_id, character),
+                )
+            self._group(group_id).pop(character, None)
+
+    def seed(
+        self, group_id: str, characters: list[str], voices: list["IndexedVoice"]
+    ) -> int:
+        """
+        为还没有选角的角色自动匹配音色：先找角色名列表中包含该角色的音色，
+        再找音色ID等于角色名拼音、或以下划线和数字分隔出的某个词等于拼音的音色；
+        有多个候选时不匹配，留给按角色名搜索；返回新匹配的角色数
+        """
+        existing = self.entries(group_id)
+        by_character: dict[str, str] = {}
+        for voice in voices:
+            for name in _split_names(voice.characters):
+                by_character.setdefault(name, voice.voice_id)
+        by_voice_id = {voice.voice_id.lower(): voice.voice_id for voice in voices}
+        # 音色ID按下划线、数字等分隔为词，拼音只与整个词匹配
+        by_token: dict[str, list[str]] = {}
+        for lowered, original in by_voice_id.items():
+            for token in set(_VOICE_ID_SEPARATORS.split(lowered)):
+                if token:
+                    by_token.setdefault(token, []).append(original)
+
+        seeded = 0
+        for character in characters:
+            if character in existing:
+                continue
+            voice_id = by_character.get(character)
+            if voice_id is None:
+                pinyin = convert_to_pinyin(character).lower()
+                voice_id = by_voice_id.get(pinyin)
+                candidates = by_token.get(pinyin, []) if pinyin else []
+                if voice_id is None and len(candidates) == 1:
+                    voice_id = candidates[0]
+            if voice_id:
+                self.assign(group_id, character, voice_id, source="auto")
+                seeded += 1
+        return seeded
+
+    def resolve(
+        self, group_id: str, character: str, voice_id: str, params: dict
+    ) -> tuple[str, dict]:
+        """
+        台词实际使用的音色和参数：有选角时使用选角的音色，并用角色默认参数覆盖界面参数；
+        只使用有效的默认参数，与套用到参数控件上的值一致，预取的缓存键才能与实际生成的对应
+        """
+        entry = self.get(group_id, character) if character else None
+        if entry is None:
+            return voice_id, params
+        return entry.voice_id, {**params, **_usable_params(entry.params)}
+
+
+@st.cache_resource
+def get_casting_map() -> CastingMap:
+    """获取进程内共享的选角表"""
+    return CastingMap()
@@ -0,0 +1,15 @@
+import json
+import os
+from pathlib import Path
+
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / "config.json"
+
+
+def load_config(config_path: str | Path = DEFAULT_CONFIG_PATH) -> None:
+    """读取 config.json，将所有配置项加入系统环境变量"""
+    if not os.path.exists(config_path):
+        return
+    with open(config_path, "r", encoding="utf-8") as f:
+        config_data = json.load(f)
+    for key, value in config_data.items():
+        os.environ[str(key)] = str(value)
@@ -1,10 +1,45 @@
+import hashlib
+import io
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 import streamlit as st
 
-import pandas as pd
+from utils.shared_store import get_shared_store
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 剧本在共享数据仓库中的命名空间，键为文件内容哈希
+SCRIPT_NAMESPACE = "script"
+# 项目自带的示例台本
+EXAMPLE_SCRIPT_PATH = Path(__file__).parent.parent / "example_voice_lines.xlsx"
+# 上传的剧本按内容哈希保存一份，共享数据被淘汰后据此重新解析
+SCRIPT_DIR = Path(__file__).parent.parent / "data" / "scripts"
+
+# 剧本各列的位置：时间码、角色名、台词
+TIMECODE_COLUMN = 0
+CHARACTER_COLUMN = 2
+TEXT_COLUMN = 4
+# 剧本时间码的帧率
+TIMECODE_FPS = 24
+
+
+def timecode_to_frames(tc: str, fps: int = TIMECODE_FPS) -> int:
+    """HH:MM:SS:FF 时间码按给定帧率转换为帧数，格式不正确或字段越界（如帧号不小于帧率）时返回 -1"""
+    try:
+        h, m, s, f = map(int, str(tc).strip().split(":"))
+    except ValueError:
+        return -1
+    if min(h, m, s, f) < 0 or m >= 60 or s >= 60 or f >= fps:
+        return -1
+    return ((h * 60 + m) * 60 + s) * fps + f
+
 
+def load_excel_data(file_path: str) -> "pd.DataFrame":
+    """加载Excel文件数据（首次调用时才导入 pandas/openpyxl）"""
+    import pandas as pd
 
-def load_excel_data(file_path: str) -> pd.DataFrame:
-    """加载Excel文件数据"""
     try:
         # 读取Excel文件
         df = pd.read_excel(file_path, engine="openpyxl")
@@ -12,3 +47,92 @@ def load_excel_data(file_path: str) -> pd.DataFrame:
     except Exception as e:
         st.error(f"加载Excel文件失败: {str(e)}")
         return pd.DataFrame()
+
+
+def script_key(data: bytes) -> str:
+    """剧本在共享数据仓库中的键"""
+    return hashlib.sha1(data).hexdigest()
+
+
+def preload_script(path: str | Path, holder: str) -> tuple[str, "pd.DataFrame"]:
+    """
+    在脚本线程之外把剧本加载到共享数据仓库并常驻（服务启动预热用），
+    之后会话加载同一文件时直接共用；返回键和数据
+    """
+    data = Path(path).read_bytes()
+    key = script_key(data)
+    df = get_shared_store().get_or_create(
+        SCRIPT_NAMESPACE,
+        key,
+        lambda: load_excel_data(io.BytesIO(data)),
+        session_id=holder,
+        pin=True,
+    )
+    return key, df
+
+
+def load_script(source, file_name: str) -> "pd.DataFrame":
+    """
+    加载剧本：内容相同的文件所有会话共用一份只读 DataFrame，会话中只保存内容哈希
+    :param source: 文件路径或上传的文件
+    """
+    data = source.getvalue() if hasattr(source, "getvalue") else Path(source).read_bytes()
+    key = script_key(data)
+    if hasattr(source, "getvalue"):
+        source_path = SCRIPT_DIR / f"{key}.xlsx"
+        if not source_path.exists():
+            SCRIPT_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_path = source_path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(source_path)
+    else:
+        source_path = Path(source)
+    store = get_shared_store()
+    previous_key = st.session_state.get("excel_data_key")
+    if previous_key and previous_key != key:
+        store.release(SCRIPT_NAMESPACE, previous_key)
+    df = store.get_or_create(
+        SCRIPT_NAMESPACE, key, lambda: load_excel_data(io.BytesIO(data))
+    )
+    st.session_state.excel_data_key = key
+    st.session_state.excel_file_name = file_name
+    st.session_state.excel_source = str(source_path)
+    return df
+
+
+def _reload_script(key: str) -> "pd.DataFrame | None":
+    """共享数据被淘汰后从保存的源文件重新解析，文件内容已变化或丢失时返回 None"""
+    source = st.session_state.get("excel_source")
+    try:
+        data = Path(source).read_bytes() if source else None
+    except OSError:
+        data = None
+    if data is None or script_key(data) != key:
+        return None
+    return get_shared_store().get_or_create(
+        SCRIPT_NAMESPACE, key, lambda: load_excel_data(io.BytesIO(data))
+    )
+
+
+def get_script_data() -> "pd.DataFrame | None":
+    """当前会话加载的剧本（只读，修改前请先 copy）"""
+    key = st.session_state.get("excel_data_key")
+    if key is None:
+        return None
+    df = get_shared_store().get(SCRIPT_NAMESPACE, key)
+    if df is None:
+        df = _reload_script(key)
+    return df
+
+
+def has_script() -> bool:
+    """当前会话是否加载过剧本（共享数据可能已被淘汰）"""
+    return "excel_data_key" in st.session_state
+
+
+def clear_script() -> None:
+    """当前会话不再使用剧本"""
+    st.session_state.pop("excel_source", None)
+    key = st.session_state.pop("excel_data_key", None)
+    if key:
+        get_shared_store().release(SCRIPT_NAMESPACE, key)
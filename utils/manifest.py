@@ -0,0 +1,59 @@
+"""
+批量克隆配置（CSV）的解析和校验，全部按列处理
+"""
+
+from typing import IO, TYPE_CHECKING, Iterable
+
+from utils.validation import validate_voice_ids
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MANIFEST_COLUMNS = ["file_name", "voice_id", "preview_text"]
+
+
+def read_manifest(source: "str | IO") -> "pd.DataFrame":
+    """读取 CSV 配置：第一行为表头，前三列依次为文件名、音色ID、预览文本，全部按字符串读取"""
+    import pandas as pd
+
+    df = pd.read_csv(
+        source,
+        dtype=str,
+        keep_default_na=False,
+        encoding="utf-8-sig",
+        skipinitialspace=True,
+    )
+    if len(df.columns) < 2:
+        raise ValueError("CSV文件格式错误，需要至少包含文件名和音色ID两列")
+    df = df.iloc[:, :3].copy()
+    if len(df.columns) == 2:
+        df["preview_text"] = ""
+    df.columns = MANIFEST_COLUMNS
+    df = df.apply(lambda column: column.str.strip())
+    return df[df["file_name"] != ""].reset_index(drop=True)
+
+
+def check_manifest(
+    df: "pd.DataFrame",
+    existing_voice_ids: Iterable[str] = (),
+    file_names: Iterable[str] | None = None,
+) -> "pd.DataFrame":
+    """
+    校验配置，返回带 error 列的副本（合法行为空字符串）
+    :param existing_voice_ids: 已存在的音色ID，与之重名的行视为冲突
+    :param file_names: 可用的音频文件名，为 None 时不检查文件是否存在
+    """
+    import pandas as pd
+
+    df = df.copy()
+    voice_ids = df["voice_id"]
+    # 与 validate_voice_id 一样只保留第一条错误：后写入的检查优先级更高
+    error = pd.Series("", index=df.index, dtype=object)
+    if file_names is not None:
+        error = error.mask(~df["file_name"].isin(set(file_names)), "音频文件不存在")
+    error = error.mask(df["file_name"].duplicated(keep=False), "文件名在配置中重复")
+    error = error.mask(voice_ids.isin(set(existing_voice_ids)), "音色ID已存在")
+    error = error.mask(voice_ids.duplicated(keep=False), "音色ID在配置中重复")
+    format_error = validate_voice_ids(voice_ids)
+    df["error"] = format_error.where(format_error != "", error)
+    return df
@@ -0,0 +1,292 @@
+"""
+进程内的接口调用和渲染指标：延迟直方图、错误数、流量、合成字数和缓存命中率
+"""
+
+import os
+import threading
+import time
+import weakref
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import streamlit as st
+
+# 延迟直方图的桶上界（秒）
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 锁等待时间直方图的桶上界（秒）
+LOCK_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# 设置后定期把 Prometheus 文本写入该文件，供 node_exporter 的 textfile collector 采集
+METRICS_FILE_ENV = "MINIMAX_METRICS_FILE"
+METRICS_FILE_INTERVAL = 15.0
+
+
+class Histogram:
+    """累计分桶直方图"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def merge(self, other: "Histogram") -> None:
+        """累加另一个分桶相同的直方图"""
+        self.count += other.count
+        self.sum += other.sum
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    def quantile(self, q: float) -> float:
+        """按桶估算分位数（返回所在桶的上界）"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, count in zip(self.buckets, self.counts):
+            if count >= rank:
+                return bound
+        return float("inf")
+
+
+class TimedLock:
+    """
+    记录争用情况的互斥锁，用法与 threading.Lock 的 with 语句相同：
+    统计获取次数、需要等待的次数及等待时间、持有时间，按名称汇总到 lock_stats()
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        # 以下计数只在持有锁时更新
+        self.acquired = 0
+        self.wait = Histogram(LOCK_WAIT_BUCKETS)
+        self.max_wait = 0.0
+        self.held = 0.0
+        self._acquired_at = 0.0
+        with _timed_locks_lock:
+            _timed_locks.add(self)
+
+    def __enter__(self) -> "TimedLock":
+        if not self._lock.acquire(blocking=False):
+            start = time.perf_counter()
+            self._lock.acquire()
+            waited = time.perf_counter() - start
+            self.wait.observe(waited)
+            self.max_wait = max(self.max_wait, waited)
+        self.acquired += 1
+        self._acquired_at = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.held += time.perf_counter() - self._acquired_at
+        self._lock.release()
+
+
+_timed_locks: "weakref.WeakSet[TimedLock]" = weakref.WeakSet()
+_timed_locks_lock = threading.Lock()
+
+
+def lock_stats() -> dict[str, dict]:
+    """按名称汇总进程内各 TimedLock 的争用情况（同名的多个实例合并）"""
+    with _timed_locks_lock:
+        locks = list(_timed_locks)
+    by_name: defaultdict[str, list[TimedLock]] = defaultdict(list)
+    for lock in locks:
+        by_name[lock.name].append(lock)
+    result = {}
+    for name, group in sorted(by_name.items()):
+        wait = Histogram(LOCK_WAIT_BUCKETS)
+        for lock in group:
+            wait.merge(lock.wait)
+        acquired = sum(lock.acquired for lock in group)
+        result[name] = {
+            "acquired": acquired,
+            "contended": wait.count,
+            "contended_ratio": round(wait.count / acquired, 3) if acquired else 0.0,
+            "wait_ms": round(wait.sum * 1000, 1),
+            "wait_p95_ms": round(wait.quantile(0.95) * 1000, 1),
+            "max_wait_ms": round(max(lock.max_wait for lock in group) * 1000, 1),
+            "held_ms": round(sum(lock.held for lock in group) * 1000, 1),
+        }
+    return result
+
+
+class Metrics:
+    """线程安全的指标集合，所有会话共享"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latency: defaultdict[tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.errors: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.bytes: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.characters = 0
+        self._caches: dict[str, Callable[[], dict]] = {}
+
+    def observe(self, kind: str, name: str, seconds: float) -> None:
+        """记录一次耗时，kind 为 api 或 render"""
+        with self._lock:
+            self.latency[(kind, name)].observe(seconds)
+
+    @contextmanager
+    def timer(self, kind: str, name: str) -> Iterator[None]:
+        """计时上下文；抛出异常时按异常类型计入错误数"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.count_error(name, type(e).__name__)
+            raise
+        finally:
+            self.observe(kind, name, time.perf_counter() - start)
+
+    def call(self, endpoint: str, fn: Callable):
+        """计时调用一个接口"""
+        with self.timer("api", endpoint):
+            return fn()
+
+    def count_error(self, endpoint: str, error_type: str) -> None:
+        with self._lock:
+            self.errors[(endpoint, error_type)] += 1
+
+    def add_bytes(self, direction: str, endpoint: str, size: int) -> None:
+        """记录流量，direction 为 up 或 down"""
+        with self._lock:
+            self.bytes[(direction, endpoint)] += size
+
+    def add_characters(self, count: int) -> None:
+        with self._lock:
+            self.characters += count
+
+    def register_cache(self, name: str, stats: Callable[[], dict]) -> None:
+        """登记缓存，stats 返回包含 hits 和 misses 的字典，导出时读取"""
+        with self._lock:
+            self._caches[name] = stats
+
+    def cache_stats(self) -> dict[str, dict]:
+        with self._lock:
+            caches = dict(self._caches)
+        result = {}
+        for name, stats in caches.items():
+            values = stats()
+            total = values["hits"] + values["misses"]
+            result[name] = {
+                "hits": values["hits"],
+                "misses": values["misses"],
+                "hit_ratio": round(values["hits"] / total, 3) if total else 0.0,
+            }
+        return result
+
+    def snapshot(self) -> dict:
+        """返回便于展示的指标汇总"""
+        with self._lock:
+            latency = {
+                f"{kind}:{name}": {
+                    "count": h.count,
+                    "avg_ms": round(h.sum / h.count * 1000, 1) if h.count else 0.0,
+                    "p50_s": h.quantile(0.5),
+                    "p95_s": h.quantile(0.95),
+                }
+                for (kind, name), h in sorted(self.latency.items())
+            }
+            errors = {f"{e}:{t}": n for (e, t), n in sorted(self.errors.items())}
+            traffic = {f"{d}:{e}": n for (d, e), n in sorted(self.bytes.items())}
+            characters = self.characters
+        return {
+            "latency": latency,
+            "errors": errors,
+            "bytes": traffic,
+            "characters": characters,
+            "caches": self.cache_stats(),
+            "locks": lock_stats(),
+        }
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for kind, metric in (("api", "voicehub_api"), ("render", "voicehub_render")):
+                lines.append(f"# TYPE {metric}_seconds histogram")
+                for (h_kind, name), h in sorted(self.latency.items()):
+                    if h_kind != kind:
+                        continue
+                    label = f'name="{_escape(name)}"'
+                    for bound, count in zip(h.buckets, h.counts):
+                        lines.append(f'{metric}_seconds_bucket{{{label},le="{bound}"}} {count}')
+                    lines.append(f'{metric}_seconds_bucket{{{label},le="+Inf"}} {h.count}')
+                    lines.append(f"{metric}_seconds_sum{{{label}}} {h.sum:.6f}")
+                    lines.append(f"{metric}_seconds_count{{{label}}} {h.count}")
+            lines.append("# TYPE voicehub_api_errors_total counter")
+            for (endpoint, error_type), count in sorted(self.errors.items()):
+                lines.append(
+                    f'voicehub_api_errors_total{{name="{_escape(endpoint)}",'
+                    f'error_type="{_escape(error_type)}"}} {count}'
+                )
+            lines.append("# TYPE voicehub_api_bytes_total counter")
+            for (direction, endpoint), size in sorted(self.bytes.items()):
+                lines.append(
+                    f'voicehub_api_bytes_total{{name="{_escape(endpoint)}",'
+                    f'direction="{direction}"}} {size}'
+                )
+            lines.append("# TYPE voicehub_tts_characters_total counter")
+            lines.append(f"voicehub_tts_characters_total {self.characters}")
+        lines.append("# TYPE voicehub_cache_requests_total counter")
+        for name, stats in self.cache_stats().items():
+            for result in ("hits", "misses"):
+                lines.append(
+                    f'voicehub_cache_requests_total{{cache="{name}",result="{result}"}} '
+                    f"{stats[result]}"
+                )
+        locks = lock_stats()
+        lines.append("# TYPE voicehub_lock_acquisitions_total counter")
+        for name, stats in locks.items():
+            uncontended = stats["acquired"] - stats["contended"]
+            for result, count in (("contended", stats["contended"]), ("uncontended", uncontended)):
+                lines.append(
+                    f'voicehub_lock_acquisitions_total{{lock="{_escape(name)}",'
+                    f'result="{result}"}} {count}'
+                )
+        lines.append("# TYPE voicehub_lock_wait_seconds_total counter")
+        for name, stats in locks.items():
+            lines.append(
+                f'voicehub_lock_wait_seconds_total{{lock="{_escape(name)}"}} '
+                f"{stats['wait_ms'] / 1000:.6f}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """原子地写入 Prometheus 文本文件"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _textfile_loop(metrics: Metrics, path: str) -> None:
+    while True:
+        time.sleep(METRICS_FILE_INTERVAL)
+        try:
+            metrics.write_textfile(path)
+        except OSError:
+            pass
+
+
+@st.cache_resource
+def get_metrics() -> Metrics:
+    """获取进程内共享的指标集合"""
+    metrics = Metrics()
+    path = os.getenv(METRICS_FILE_ENV)
+    if path:
+        threading.Thread(
+            target=_textfile_loop, args=(metrics, path), daemon=True
+        ).start()
+    return metrics
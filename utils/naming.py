@@ -1,33 +1,38 @@
 import streamlit as st
-import time
 import re
-import hashlib
 
-from pypinyin import pinyin, Style
+from utils.tts_cache import make_tts_key
 
+# 文本部分的最大长度，超出时截断
+NAME_TEXT_LIMIT = 15
+# 文件名中内容哈希的长度（十六进制字符）：渲染存储按文件名判断是否为相同的渲染，
+# 64 位哈希使不同渲染重名的概率可以忽略
+NAME_HASH_LENGTH = 16
 
-def generate_safe_filename(st: str) -> str:
-    """根据句子内容生成新的文件名。
+# 不可见的控制字符（包括\r, \n, \t等）和文件名中的非法字符，模块加载时构建一次
+_CONTROL_CHARS = dict.fromkeys([*range(0, 32), 127])
+_ILLEGAL_CHARS = re.compile(r'[<>:"/\\|?*]')
 
-    参数:
-        st (Sentence): 句子对象。
 
-    返回:
-        FileInfo: 文件信息对象。
+def generate_safe_filename(text: str, limit: int = NAME_TEXT_LIMIT) -> str:
+    """去除控制字符和非法字符，并截断到指定长度，相同的文本总是得到相同的结果"""
+    return _ILLEGAL_CHARS.sub("", text.translate(_CONTROL_CHARS))[:limit]
+
+
+def build_audio_filename(
+    voice_id: str, text: str, file_prefix: str = "", **params
+) -> str:
     """
-    # 生成文件名
-    # 使用str.translate去除所有不可见的控制字符（包括\r, \n, \t等）
-    control_chars = "".join(map(chr, range(0, 32))) + chr(127)
-    safe_file_name = st.translate({ord(c): None for c in control_chars})
-    # 去掉文件名中的非法字符
-    safe_file_name = re.sub(r'[<>:"/\\|?*]', "", safe_file_name)
-    if len(safe_file_name) > 15:
-        safe_file_name = safe_file_name[:15]
-        post_fix = hashlib.md5(str(time.time()).encode()).hexdigest()[:4]
-        safe_file_name = f"{safe_file_name}_{post_fix}"
-        return safe_file_name
-    else:
-        return safe_file_name
+    生成音频文件名：文本之后附上音色、文本和参数的内容哈希，
+    相同的渲染总是得到相同的文件名，不同的渲染不会重名
+    """
+    safe_text = generate_safe_filename(text)
+    # 文件名只由渲染内容决定，同一 Group 下不同凭据的相同渲染对应同一个文件
+    digest = make_tts_key(voice_id, text, credential="", **params)[:NAME_HASH_LENGTH]
+    if file_prefix:
+        safe_prefix = generate_safe_filename(file_prefix, limit=64)
+        return f"{safe_prefix}_{voice_id}_{safe_text}_{digest}.mp3"
+    return f"{voice_id}_{safe_text}_{digest}.mp3"
 
 
 def convert_to_pinyin(text: str) -> str:
@@ -36,6 +41,9 @@ def convert_to_pinyin(text: str) -> str:
         return ""
 
     try:
+        # 首次使用时才导入 pypinyin（会加载拼音词典）
+        from pypinyin import pinyin, Style
+
         # 转换为拼音，使用NORMAL风格（不带声调）
         pinyin_list = pinyin(text, style=Style.NORMAL)
         # 将拼音列表连接成字符串
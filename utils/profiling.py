@@ -0,0 +1,118 @@
+"""
+调试模式下的逐次重跑性能分析：每次重跑（整页或单个片段）采集一份 cProfile，保留最近若干份
+"""
+
+import cProfile
+import marshal
+import os
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+import streamlit as st
+
+# 每个会话保留的最近重跑数
+PROFILE_HISTORY = 10
+HOTSPOT_LIMIT = 15
+# 整页重跑的范围名称；片段重跑使用片段的渲染名称
+FULL_RERUN_SCOPE = "整页"
+
+# 当前脚本线程是否已有外层分析（片段在整页重跑中执行时不再单独采集）
+_active = threading.local()
+
+
+@dataclass
+class RerunProfile:
+    """一次重跑的性能分析结果"""
+
+    started_at: float
+    total_ms: float
+    # 整页重跑或片段的渲染名称
+    scope: str = FULL_RERUN_SCOPE
+    # 各 render_* 函数的累计耗时（ms）
+    render_ms: dict[str, float] = field(default_factory=dict)
+    # 按自身耗时排序的热点函数
+    hotspots: list[dict] = field(default_factory=list)
+    # pstats 原始数据，与 pstats.Stats.dump_stats 写出的文件格式相同
+    raw: bytes = field(default=b"", repr=False)
+
+
+def _label(func: tuple[str, int, str]) -> str:
+    file_name, line, name = func
+    return f"{name} ({os.path.basename(file_name)}:{line})"
+
+
+def summarize(
+    profiler: cProfile.Profile,
+    started_at: float,
+    total_ms: float,
+    scope: str = FULL_RERUN_SCOPE,
+) -> RerunProfile:
+    """把一次采集整理为渲染函数耗时和热点列表"""
+    stats = pstats.Stats(profiler)
+    render_ms: dict[str, float] = {}
+    rows = []
+    for func, (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        name = func[2]
+        if name.startswith("render_"):
+            render_ms[name] = round(render_ms.get(name, 0.0) + cumtime * 1000, 1)
+        rows.append(
+            {
+                "函数": _label(func),
+                "调用次数": ncalls,
+                "自身耗时(ms)": round(tottime * 1000, 2),
+                "累计耗时(ms)": round(cumtime * 1000, 2),
+            }
+        )
+    rows.sort(key=lambda row: row["自身耗时(ms)"], reverse=True)
+    return RerunProfile(
+        started_at=started_at,
+        total_ms=round(total_ms, 1),
+        scope=scope,
+        render_ms=dict(sorted(render_ms.items(), key=lambda item: -item[1])),
+        hotspots=rows[:HOTSPOT_LIMIT],
+        raw=marshal.dumps(stats.stats),
+    )
+
+
+def get_profile_history() -> deque:
+    """当前会话最近的重跑分析结果"""
+    if "rerun_profiles" not in st.session_state:
+        st.session_state.rerun_profiles = deque(maxlen=PROFILE_HISTORY)
+    return st.session_state.rerun_profiles
+
+
+@contextmanager
+def profile_rerun(scope: str = FULL_RERUN_SCOPE) -> Iterator[None]:
+    """
+    调试模式下打开了性能分析时采集本次重跑，否则什么都不做；
+    已在外层分析中时（例如整页重跑中的片段）直接并入外层结果
+    """
+    if getattr(_active, "profiling", False) or not (
+        st.session_state.get("debug_mode", False)
+        and st.session_state.get("profile_reruns", False)
+    ):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # 同一时刻只能有一个分析器（例如另一个会话正在采集），本次跳过
+        yield
+        return
+    _active.profiling = True
+    started_at = time.time()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        _active.profiling = False
+        total_ms = (time.perf_counter() - start) * 1000
+        get_profile_history().append(summarize(profiler, started_at, total_ms, scope))
@@ -0,0 +1,443 @@
+"""
+渲染台账：按分组和剧本下的剧本行（时间码 + 台词哈希）记录最近一次渲染的音色、参数、音频路径和时长，
+并把带渲染信息的剧本增量导出为 xlsx/CSV
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import streamlit as st
+
+from utils.excel import TEXT_COLUMN, TIMECODE_COLUMN
+from utils.metrics import TimedLock
+from utils.render_store import RenderStore
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DEFAULT_LEDGER_PATH = DATA_DIR / "render_ledger.sqlite3"
+RENDER_DIR = DATA_DIR / "renders"
+EXPORT_DIR = DATA_DIR / "exports"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS takes (
+    group_id TEXT NOT NULL DEFAULT '',
+    script TEXT NOT NULL DEFAULT '',
+    row_key TEXT NOT NULL,
+    timecode TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    character TEXT NOT NULL DEFAULT '',
+    voice_id TEXT NOT NULL,
+    params TEXT NOT NULL,
+    tier TEXT NOT NULL,
+    audio_path TEXT NOT NULL,
+    duration REAL NOT NULL,
+    rendered_at REAL NOT NULL,
+    seq INTEGER NOT NULL,
+    PRIMARY KEY (group_id, script, row_key)
+);
+CREATE INDEX IF NOT EXISTS idx_takes_seq ON takes (seq);
+CREATE TABLE IF NOT EXISTS exports (
+    group_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    script_key TEXT NOT NULL,
+    last_seq INTEGER NOT NULL,
+    exported_at REAL NOT NULL,
+    PRIMARY KEY (group_id, path)
+);
+"""
+
+# 旧版导出记录只按路径区分，无法判断属于哪个分组，升级时丢弃（下次导出写入全量）
+_DROP_UNSCOPED_EXPORTS = "DROP TABLE exports;"
+
+# 旧版台账只按行键记录，升级时整体并入未归属分组和剧本的范围
+_MIGRATE_UNSCOPED = """
+ALTER TABLE takes RENAME TO takes_unscoped;
+DROP INDEX IF EXISTS idx_takes_seq;
+"""
+_COPY_UNSCOPED = """
+INSERT INTO takes
+    (row_key, timecode, text_hash, character, voice_id, params, tier,
+     audio_path, duration, rendered_at, seq)
+SELECT row_key, timecode, text_hash, character, voice_id, params, tier,
+     audio_path, duration, rendered_at, seq
+FROM takes_unscoped;
+DROP TABLE takes_unscoped;
+"""
+
+# 导出时追加在剧本后面的列
+LEDGER_COLUMNS = ["行键", "渲染音色", "渲染参数", "档位", "音频路径", "时长(秒)", "渲染时间"]
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(str(text).strip().encode("utf-8")).hexdigest()[:16]
+
+
+def make_row_key(timecode, text) -> str:
+    """剧本行的键：时间码加台词哈希，剧本重新排序或插入行后仍能对应"""
+    return f"{str(timecode).strip()}|{text_hash(text)}"
+
+
+def script_row_keys(df: "pd.DataFrame") -> list[str]:
+    """剧本每一行的键"""
+    if df is None or df.empty or len(df.columns) <= TEXT_COLUMN:
+        return []
+    return [
+        make_row_key(timecode, text)
+        for timecode, text in zip(
+            df.iloc[:, TIMECODE_COLUMN].astype(str), df.iloc[:, TEXT_COLUMN].astype(str)
+        )
+    ]
+
+
+def group_export_dir(group_id: str) -> Path:
+    """分组 group_id 的导出目录，各分组的导出文件互不覆盖"""
+    group = str(group_id).strip()
+    if not group or Path(group).name != group or group in (".", ".."):
+        raise ValueError("Group ID 不能作为导出目录名")
+    return EXPORT_DIR / group
+
+
+def export_path(file_name: str, suffix: str, group_id: str) -> Path:
+    """
+    页面导出文件的路径：只接受文件名，统一放在该分组的导出目录下，
+    解析后不在导出目录中的名称抛出 ValueError
+    """
+    name = str(file_name).strip()
+    if not name or Path(name).name != name or name in (".", ".."):
+        raise ValueError("请只填写文件名，不要包含目录")
+    if Path(name).suffix.lower() != f".{suffix}":
+        name = f"{name}.{suffix}"
+    root = group_export_dir(group_id).resolve()
+    path = (root / name).resolve()
+    if path.parent != root:
+        raise ValueError("导出文件必须位于导出目录中")
+    return path
+
+
+def mp3_duration(audio: bytes, bitrate: int) -> float:
+    """按比特率估算 MP3 时长（秒），接口返回的是固定码率"""
+    return round(len(audio) * 8 / bitrate, 3) if bitrate else 0.0
+
+
+@dataclass
+class Take:
+    """一行台词最近一次的渲染"""
+
+    row_key: str
+    timecode: str
+    text_hash: str
+    character: str
+    voice_id: str
+    params: dict
+    tier: str
+    audio_path: str
+    duration: float
+    rendered_at: float
+    seq: int
+    # 所属的分组和剧本（剧本文件名），不同剧本中时间码和台词相同的行互不覆盖
+    group_id: str = ""
+    script: str = ""
+
+    def as_row(self) -> dict:
+        """导出时追加的列"""
+        return {
+            "行键": self.row_key,
+            "渲染音色": self.voice_id,
+            "渲染参数": json.dumps(self.params, ensure_ascii=False, sort_keys=True),
+            "档位": self.tier,
+            "音频路径": self.audio_path,
+            "时长(秒)": self.duration,
+            "渲染时间": time.strftime(
+                "%Y-%m-%d %H:%M:%S", time.localtime(self.rendered_at)
+            ),
+        }
+
+
+def _take(row: sqlite3.Row) -> Take:
+    return Take(**{**dict(row), "params": json.loads(row["params"])})
+
+
+class RenderLedger:
+    """渲染台账"""
+
+    def __init__(
+        self, path: str | Path = DEFAULT_LEDGER_PATH, render_dir: str | Path = RENDER_DIR
+    ) -> None:
+        self.path = Path(path)
+        self.store = RenderStore(render_dir)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = TimedLock("render_ledger")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(takes)")]
+            if columns and "script" not in columns:
+                conn.executescript(_MIGRATE_UNSCOPED + _SCHEMA + _COPY_UNSCOPED)
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(exports)")]
+            if columns and "group_id" not in columns:
+                conn.executescript(_DROP_UNSCOPED_EXPORTS)
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(
+        self,
+        group_id: str,
+        script: str,
+        row_key: str,
+        character: str,
+        voice_id: str,
+        params: dict,
+        tier: str,
+        audio: bytes,
+        file_name: str,
+    ) -> Take:
+        """保存音频并记录为该剧本中该行最近一次的渲染（可在后台线程中调用）"""
+        audio_path = self.store.put(audio, file_name)
+        timecode, _, row_text_hash = row_key.rpartition("|")
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM takes").fetchone()[0]
+            take = Take(
+                row_key=row_key,
+                timecode=timecode,
+                text_hash=row_text_hash,
+                character=character,
+                voice_id=voice_id,
+                params=params,
+                tier=tier,
+                audio_path=str(audio_path),
+                duration=mp3_duration(audio, params.get("bitrate", 0)),
+                rendered_at=now,
+                seq=seq,
+                group_id=group_id,
+                script=script,
+            )
+            conn.execute(
+                """INSERT OR REPLACE INTO takes
+                (group_id, script, row_key, timecode, text_hash, character, voice_id,
+                 params, tier, audio_path, duration, rendered_at, seq)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    take.group_id,
+                    take.script,
+                    take.row_key,
+                    take.timecode,
+                    take.text_hash,
+                    take.character,
+                    take.voice_id,
+                    json.dumps(params, ensure_ascii=False, sort_keys=True, default=str),
+                    take.tier,
+                    take.audio_path,
+                    take.duration,
+                    take.rendered_at,
+                    take.seq,
+                ),
+            )
+        return take
+
+    def takes(self, group_id: str, script: str, since_seq: int = 0) -> dict[str, Take]:
+        """按行键返回剧本在台账中的渲染，since_seq 大于 0 时只返回之后变化的行"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM takes WHERE group_id = ? AND script = ? AND seq > ? ORDER BY seq",
+                (group_id, script, since_seq),
+            ).fetchall()
+        return {row["row_key"]: _take(row) for row in rows}
+
+    def query(
+        self,
+        characters: list[str] | None = None,
+        since: float | None = None,
+        until: float | None = None,
+        group_id: str | None = None,
+        script: str | None = None,
+    ) -> list[Take]:
+        """按分组、剧本、角色和渲染时间筛选台账中的渲染，未指定的条件不筛选"""
+        sql = "SELECT * FROM takes WHERE 1 = 1"
+        params: list = []
+        if group_id is not None:
+            sql += " AND group_id = ?"
+            params.append(group_id)
+        if script is not None:
+            sql += " AND script = ?"
+            params.append(script)
+        if characters:
+            sql += f" AND character IN ({', '.join('?' * len(characters))})"
+            params += characters
+        if since is not None:
+            sql += " AND rendered_at >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND rendered_at < ?"
+            params.append(until)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [_take(row) for row in rows]
+
+    def characters(self, group_id: str | None = None, script: str | None = None) -> list[str]:
+        """台账（或指定分组、剧本）中出现过的角色"""
+        sql = "SELECT DISTINCT character FROM takes WHERE character != ''"
+        params: list = []
+        if group_id is not None:
+            sql += " AND group_id = ?"
+            params.append(group_id)
+        if script is not None:
+            sql += " AND script = ?"
+            params.append(script)
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute(sql + " ORDER BY character", params)]
+
+    def last_seq(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM takes").fetchone()[0]
+
+    def coverage(self, group_id: str, script: str, row_keys: list[str]) -> dict:
+        """剧本的渲染覆盖情况"""
+        with self._connect() as conn:
+            durations = dict(
+                conn.execute(
+                    "SELECT row_key, duration FROM takes WHERE group_id = ? AND script = ?",
+                    (group_id, script),
+                )
+            )
+        rendered = [durations[key] for key in row_keys if key in durations]
+        return {
+            "rows": len(row_keys),
+            "rendered": len(rendered),
+            "duration": round(sum(rendered), 1),
+        }
+
+    def export(
+        self,
+        df: "pd.DataFrame",
+        script_key: str,
+        path: str | Path,
+        group_id: str,
+        script: str,
+    ) -> int:
+        """
+        把带渲染信息的剧本（分组 group_id 下名为 script 的剧本）导出为 xlsx 或 CSV（按后缀），返回写入的行数；
+        同一剧本再次导出到同一文件时只写入上次导出后渲染过的行：
+        CSV 追加到文件末尾（同一行键以最后一条为准），xlsx 原地更新对应的行
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            state = conn.execute(
+                "SELECT script_key, last_seq FROM exports WHERE group_id = ? AND path = ?",
+                (group_id, str(path)),
+            ).fetchone()
+        last_seq = self.last_seq()
+        incremental = (
+            state is not None and state["script_key"] == script_key and path.exists()
+        )
+        keys = script_row_keys(df)
+        if incremental:
+            changed = self.takes(group_id, script, since_seq=state["last_seq"])
+            positions = [i for i, key in enumerate(keys) if key in changed]
+            written = _write_rows(df, keys, positions, changed, path, append=True)
+        else:
+            written = _write_rows(
+                df, keys, range(len(keys)), self.takes(group_id, script), path, append=False
+            )
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO exports
+                (group_id, path, script_key, last_seq, exported_at)
+                VALUES (?, ?, ?, ?, ?)""",
+                (group_id, str(path), script_key, last_seq, time.time()),
+            )
+        return written
+
+
+def _annotated(
+    df: "pd.DataFrame", keys: list[str], positions, takes: dict[str, Take]
+) -> "pd.DataFrame":
+    """剧本中指定的行加上渲染信息列"""
+    import pandas as pd
+
+    rows = df.iloc[list(positions)].reset_index(drop=True)
+    ledger = pd.DataFrame(
+        [
+            takes[keys[i]].as_row() if keys[i] in takes else {"行键": keys[i]}
+            for i in positions
+        ],
+        columns=LEDGER_COLUMNS,
+    )
+    return pd.concat([rows, ledger], axis=1)
+
+
+def _write_rows(
+    df: "pd.DataFrame",
+    keys: list[str],
+    positions,
+    takes: dict[str, Take],
+    path: Path,
+    append: bool,
+) -> int:
+    positions = list(positions)
+    if append and not positions:
+        return 0
+    annotated = _annotated(df, keys, positions, takes)
+    if path.suffix.lower() == ".csv":
+        annotated.to_csv(
+            path,
+            mode="a" if append else "w",
+            header=not append,
+            index=False,
+            encoding="utf-8" if append else "utf-8-sig",
+        )
+    elif append:
+        _update_xlsx(path, annotated)
+    else:
+        annotated.to_excel(path, index=False, engine="openpyxl")
+    return len(annotated)
+
+
+def _update_xlsx(path: Path, annotated: "pd.DataFrame") -> None:
+    """按行键原地更新 xlsx 中的行，找不到的行追加到末尾"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path)
+    sheet = workbook.active
+    header = [cell.value for cell in sheet[1]]
+    key_column = header.index("行键") + 1
+    row_numbers = {
+        value: index
+        for index, (value,) in enumerate(
+            sheet.iter_rows(
+                min_row=2, min_col=key_column, max_col=key_column, values_only=True
+            ),
+            start=2,
+        )
+    }
+    for values in annotated.itertuples(index=False):
+        row_number = row_numbers.get(values[annotated.columns.get_loc("行键")])
+        if row_number is None:
+            sheet.append(list(values))
+            continue
+        for column, value in enumerate(values, start=1):
+            sheet.cell(row=row_number, column=column, value=value)
+    workbook.save(path)
+
+
+@st.cache_resource
+def get_render_ledger() -> RenderLedger:
+    """获取进程内共享的渲染台账"""
+    return RenderLedger()
@@ -0,0 +1,87 @@
+"""
+渲染文件存储：音频按内容哈希只保存一份，按文件名硬链接到输出目录，相同的渲染不重复写盘
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from utils.metrics import TimedLock
+
+# 内容寻址的音频保存在输出目录下的隐藏目录中
+BLOB_DIR_NAME = ".store"
+
+
+class RenderStore:
+    """输出目录中的渲染文件"""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.blob_dir = self.root / BLOB_DIR_NAME
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = TimedLock("render_store")
+        self.written = 0
+        self.linked = 0
+        self.skipped = 0
+        self.bytes_saved = 0
+
+    def path(self, file_name: str) -> Path:
+        return self.root / file_name
+
+    def exists(self, file_name: str) -> bool:
+        """输出目录中是否已有该文件（文件名由内容哈希决定，存在即为相同的渲染）"""
+        return self.path(file_name).is_file()
+
+    def load(self, file_name: str) -> bytes | None:
+        """读取已有的渲染，不存在时返回 None"""
+        try:
+            return self.path(file_name).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def _blob(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}.mp3"
+
+    def put(self, audio: bytes, file_name: str) -> Path:
+        """
+        保存渲染：同名文件已存在时跳过；内容相同的音频已保存过时硬链接到新文件名，
+        不支持硬链接的文件系统上退回为复制
+        """
+        target = self.path(file_name)
+        if target.is_file():
+            with self._lock:
+                self.skipped += 1
+                self.bytes_saved += len(audio)
+            return target
+        digest = hashlib.sha256(audio).hexdigest()
+        blob = self._blob(digest)
+        with self._lock:
+            if blob.is_file():
+                self.linked += 1
+                self.bytes_saved += len(audio)
+            else:
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                # 先写临时文件再改名，其他线程不会读到写了一半的文件
+                fd, tmp = tempfile.mkstemp(dir=blob.parent, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(audio)
+                os.replace(tmp, blob)
+                self.written += 1
+            try:
+                os.link(blob, target)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copyfile(blob, target)
+        return target
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "written": self.written,
+                "linked": self.linked,
+                "skipped": self.skipped,
+                "bytes_saved": self.bytes_saved,
+            }
@@ -0,0 +1,198 @@
+"""
+进程级只读数据仓库：剧本按内容哈希、派生的音色列表按 Group ID 在所有会话间共享
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Hashable
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.metrics import TimedLock
+from utils.state_inspect import estimate_size
+
+# 会话超过该时间没有访问时不再视为持有引用（Streamlit 不通知会话结束）
+SESSION_IDLE_TTL = 30 * 60
+# 没有会话持有的数据超过该时间没有访问时淘汰
+ENTRY_IDLE_TTL = 10 * 60
+
+
+def current_session_id() -> str:
+    """当前脚本线程所属的会话ID，不在脚本线程中时返回空字符串"""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else ""
+
+
+def resident_memory() -> int | None:
+    """当前进程的常驻内存（字节），无法获取时返回 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+
+        # 其他平台只能取到峰值；macOS 单位为字节，Linux 为 KB
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except (ImportError, AttributeError):
+        return None
+
+
+@dataclass
+class StoreEntry:
+    """一份共享数据"""
+
+    value: Any
+    size: int
+    created_at: float
+    last_access: float
+    # 持有引用的会话及其最近访问时间
+    holders: dict[str, float] = field(default_factory=dict)
+    # 常驻的数据不会被淘汰（如服务启动时预热的示例剧本）
+    pinned: bool = False
+
+    def live_holders(self, now: float) -> list[str]:
+        return [
+            session_id
+            for session_id, seen in self.holders.items()
+            if now - seen <= SESSION_IDLE_TTL
+        ]
+
+
+class SharedStore:
+    """按（命名空间, 键）保存只读数据；会话持有引用，无人持有且空闲的数据被淘汰"""
+
+    def __init__(self) -> None:
+        self._entries: dict[tuple[str, Hashable], StoreEntry] = {}
+        self._lock = TimedLock("shared_store")
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+        # 多个会话同时未命中、各自创建了一份的次数（只保留先写入的一份）
+        self.duplicates = 0
+
+    def get_or_create(
+        self,
+        namespace: str,
+        key: Hashable,
+        factory: Callable[[], Any],
+        session_id: str | None = None,
+        pin: bool = False,
+    ) -> Any:
+        """读取共享数据，不存在时调用 factory 创建；调用的会话同时登记为持有者"""
+        value = self.get(namespace, key, session_id)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            if pin:
+                self.pin(namespace, key)
+            return value
+        # 在锁外创建，避免慢的解析阻塞其他会话
+        value = factory()
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                entry = self._entries[(namespace, key)] = StoreEntry(
+                    value, estimate_size(value), now, now
+                )
+            else:
+                self.duplicates += 1
+            entry.holders[session_id or current_session_id()] = now
+            entry.pinned = entry.pinned or pin
+            value = entry.value
+        self.evict_idle()
+        return value
+
+    def pin(self, namespace: str, key: Hashable) -> None:
+        """使数据常驻，不再被淘汰"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None:
+                entry.pinned = True
+
+    def get(
+        self, namespace: str, key: Hashable, session_id: str | None = None
+    ) -> Any | None:
+        """读取共享数据并刷新访问时间，调用的会话登记为持有者"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                return None
+            entry.last_access = now
+            entry.holders[session_id or current_session_id()] = now
+            return entry.value
+
+    def release(
+        self, namespace: str, key: Hashable, session_id: str | None = None
+    ) -> None:
+        """会话不再使用该数据"""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None:
+                entry.holders.pop(session_id or current_session_id(), None)
+
+    def evict_idle(self) -> int:
+        """淘汰没有活跃持有者且空闲超时的数据，返回淘汰数量"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                store_key
+                for store_key, entry in self._entries.items()
+                if not entry.pinned
+                and not entry.live_holders(now)
+                and now - entry.last_access > ENTRY_IDLE_TTL
+            ]
+            for store_key in expired:
+                del self._entries[store_key]
+            self.evictions += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict:
+        """get_or_create 的命中统计"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "duplicates": self.duplicates}
+
+    def report(self) -> dict:
+        """内存报告：每份数据的大小和持有者、每个会话引用的数据量、进程总内存"""
+        now = time.time()
+        entries = []
+        sessions: dict[str, int] = {}
+        with self._lock:
+            for (namespace, key), entry in self._entries.items():
+                holders = entry.live_holders(now)
+                entries.append(
+                    {
+                        "namespace": namespace,
+                        "key": str(key)[:40],
+                        "size": entry.size,
+                        "holders": len(holders),
+                        "pinned": entry.pinned,
+                        "idle_seconds": round(now - entry.last_access),
+                    }
+                )
+                for session_id in holders:
+                    sessions[session_id] = sessions.get(session_id, 0) + entry.size
+        shared_bytes = sum(entry["size"] for entry in entries)
+        return {
+            "entries": entries,
+            "sessions": sessions,
+            "shared_bytes": shared_bytes,
+            # 如果每个会话各自保存一份，需要的内存
+            "unshared_bytes": sum(sessions.values()),
+            "evictions": self.evictions,
+            **self.stats(),
+            "resident_bytes": resident_memory(),
+        }
+
+
+@st.cache_resource
+def get_shared_store() -> SharedStore:
+    """获取进程内共享的数据仓库"""
+    return SharedStore()
@@ -0,0 +1,97 @@
+"""
+相同请求合并（single-flight）
+"""
+
+import hashlib
+import json
+import threading
+from collections import defaultdict
+from typing import Any, Callable
+
+import streamlit as st
+
+from utils.metrics import TimedLock
+
+
+class _Call:
+    """一次进行中的请求"""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """相同端点和参数的请求进行中时，后来的调用者等待它的结果而不再重复请求"""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call] = {}
+        self._lock = TimedLock("single_flight")
+        # 每个端点实际发出的请求数和被合并的请求数
+        self.issued: defaultdict[str, int] = defaultdict(int)
+        self.collapsed: defaultdict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def make_key(endpoint: str, params: dict) -> str:
+        """端点加规范化参数（排序、统一序列化）作为请求键"""
+        payload = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return f"{endpoint}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+    def do(self, endpoint: str, params: dict, fn: Callable[[], Any]) -> Any:
+        """执行请求；已有相同请求进行中时等待并共享其结果（或异常）"""
+        key = self.make_key(endpoint, params)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.issued[endpoint] += 1
+            else:
+                self.collapsed[endpoint] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def totals(self) -> dict:
+        """合计所有端点：被合并的请求视为命中，实际发出的请求视为未命中"""
+        with self._lock:
+            return {
+                "hits": sum(self.collapsed.values()),
+                "misses": sum(self.issued.values()),
+            }
+
+    def stats(self) -> dict:
+        """返回每个端点的请求数和合并数"""
+        with self._lock:
+            endpoints = set(self.issued) | set(self.collapsed)
+            return {
+                endpoint: {
+                    "issued": self.issued[endpoint],
+                    "collapsed": self.collapsed[endpoint],
+                    "in_flight": sum(
+                        1 for key in self._calls if key.startswith(f"{endpoint}:")
+                    ),
+                }
+                for endpoint in sorted(endpoints)
+            }
+
+
+@st.cache_resource
+def get_single_flight() -> SingleFlight:
+    """获取进程内共享的请求合并器"""
+    return SingleFlight()
@@ -0,0 +1,64 @@
+"""
+把内存中的上传数据以文件路径的形式交给只接受路径的 SDK
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+# 不超过该大小的数据写入内存文件系统（Linux 的 /dev/shm），更大的数据写入系统临时目录
+SPOOL_MAX_MEMORY = 32 * 1024 * 1024
+MEMORY_SPOOL_DIR = "/dev/shm"
+
+UploadSource = str | os.PathLike | bytes | bytearray | memoryview | BinaryIO
+
+
+def _memory_spool_dir() -> str | None:
+    if os.path.isdir(MEMORY_SPOOL_DIR) and os.access(MEMORY_SPOOL_DIR, os.W_OK):
+        return MEMORY_SPOOL_DIR
+    return None
+
+
+def source_size(source: UploadSource) -> int:
+    """上传数据的字节数"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    if hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            return view.nbytes
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+@contextmanager
+def spooled_path(source: UploadSource, file_name: str) -> Iterator[str]:
+    """
+    以路径形式提供上传数据，退出时一定删除临时文件
+    :param source: 文件路径、bytes 或文件对象（如 Streamlit 上传的文件，不会复制其内容）
+    :param file_name: 临时文件使用的文件名，保留原扩展名供服务端识别格式
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+
+    directory = _memory_spool_dir() if source_size(source) <= SPOOL_MAX_MEMORY else None
+    with tempfile.TemporaryDirectory(dir=directory, prefix="voicehub_") as tmp_dir:
+        path = Path(tmp_dir) / Path(file_name).name
+        with open(path, "wb") as f:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                f.write(source)
+            elif hasattr(source, "getbuffer"):
+                # 直接写出内部缓冲区，不依赖也不改变读取位置，可与页面线程同时使用
+                with source.getbuffer() as view:
+                    f.write(view)
+            else:
+                source.seek(0)
+                shutil.copyfileobj(source, f)
+        yield str(path)
@@ -0,0 +1,103 @@
+"""
+启动耗时统计：记录首次导入每个模块的耗时树（仅在 --debug 模式下启用）
+"""
+
+import builtins
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+
+# 低于该耗时的导入不显示在报告中
+REPORT_THRESHOLD_MS = 1.0
+
+
+@dataclass
+class ImportRecord:
+    """一次首次导入的记录"""
+
+    name: str
+    started_at: float
+    elapsed_ms: float = 0.0
+    during_startup: bool = True
+    children: list["ImportRecord"] = field(default_factory=list)
+
+
+class ImportTimer:
+    """通过包装 builtins.__import__ 记录导入耗时树"""
+
+    def __init__(self) -> None:
+        self.roots: list[ImportRecord] = []
+        self.started_at: float | None = None
+        self.startup_ms: float | None = None
+        self._original_import = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._original_import is not None
+
+    def start(self) -> None:
+        """安装导入钩子（重复调用无效）"""
+        if self.active or self.startup_ms is not None:
+            return
+        self.started_at = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def mark_ready(self) -> None:
+        """标记启动完成，此后的导入记为按需加载"""
+        if self.started_at is not None and self.startup_ms is None:
+            self.startup_ms = (time.perf_counter() - self.started_at) * 1000
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if level != 0 or name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        record = ImportRecord(
+            name=name,
+            started_at=time.perf_counter(),
+            during_startup=self.startup_ms is None,
+        )
+        if stack:
+            stack[-1].children.append(record)
+        else:
+            with self._lock:
+                self.roots.append(record)
+        stack.append(record)
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            stack.pop()
+            record.elapsed_ms = (time.perf_counter() - record.started_at) * 1000
+
+    def format_report(self, max_depth: int = 3, limit: int = 20) -> str:
+        """生成按耗时排序的导入树文本"""
+        lines = []
+        if self.startup_ms is not None:
+            lines.append(f"启动总耗时: {self.startup_ms:.1f} ms")
+
+        def walk(records: list[ImportRecord], depth: int) -> None:
+            for record in sorted(records, key=lambda r: r.elapsed_ms, reverse=True):
+                if record.elapsed_ms < REPORT_THRESHOLD_MS:
+                    continue
+                phase = "" if record.during_startup else " (按需加载)"
+                lines.append(
+                    f"{record.elapsed_ms:9.1f} ms  {'  ' * depth}{record.name}{phase}"
+                )
+                if depth + 1 < max_depth:
+                    walk(record.children, depth + 1)
+
+        with self._lock:
+            roots = sorted(self.roots, key=lambda r: r.elapsed_ms, reverse=True)
+        walk(roots[:limit], 0)
+        return "\n".join(lines)
+
+
+# 进程内唯一的导入计时器
+import_timer = ImportTimer()
@@ -0,0 +1,127 @@
+"""
+调试面板用的会话状态摘要：有界的大小估算和截断序列化
+"""
+
+import sys
+from collections.abc import Mapping
+from itertools import islice
+
+MAX_DEPTH = 3
+MAX_ITEMS = 20
+MAX_STR = 200
+# 估算大小时每个容器最多采样的元素数，其余按平均值外推
+SIZE_SAMPLE = 100
+
+
+def _is_dataframe(value) -> bool:
+    return type(value).__name__ == "DataFrame" and hasattr(value, "memory_usage")
+
+
+def _is_pydantic(value) -> bool:
+    return hasattr(value, "model_dump") and hasattr(type(value), "model_fields")
+
+
+def _attributes(value) -> dict:
+    """对象的公开属性"""
+    return {k: v for k, v in vars(value).items() if not k.startswith("_")}
+
+
+def estimate_size(value, depth: int = MAX_DEPTH) -> int:
+    """估算对象占用的字节数，容器只采样前若干个元素"""
+    if _is_dataframe(value):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    size = sys.getsizeof(value, 0)
+    if depth <= 0 or isinstance(value, (str, bytes, bytearray, memoryview, int, float)):
+        return size
+    if isinstance(value, Mapping):
+        sample = list(islice(value.items(), SIZE_SAMPLE))
+        sampled = sum(
+            estimate_size(k, depth - 1) + estimate_size(v, depth - 1) for k, v in sample
+        )
+    elif isinstance(value, (list, tuple, set, frozenset)) or type(value).__name__ == "deque":
+        sample = list(islice(value, SIZE_SAMPLE))
+        sampled = sum(estimate_size(item, depth - 1) for item in sample)
+    elif hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), depth - 1)
+    else:
+        return size
+    if sample:
+        sampled = sampled * len(value) // len(sample)
+    return size + sampled
+
+
+def describe(value) -> str:
+    """一行的类型和规模描述"""
+    name = type(value).__name__
+    if _is_dataframe(value):
+        return f"{name} {value.shape[0]}×{value.shape[1]}"
+    if isinstance(value, (str, bytes, bytearray)):
+        return f"{name} len={len(value)}"
+    if hasattr(value, "__len__") and not _is_pydantic(value):
+        try:
+            return f"{name} len={len(value)}"
+        except TypeError:
+            pass
+    return name
+
+
+def change_token(value) -> tuple:
+    """用于判断摘要是否需要重新计算的廉价标记：对象身份、类型和长度"""
+    try:
+        length = len(value)
+    except TypeError:
+        length = None
+    if _is_dataframe(value):
+        length = value.shape
+    return id(value), type(value).__name__, length
+
+
+def preview(
+    value, depth: int = MAX_DEPTH, max_items: int = MAX_ITEMS, max_str: int = MAX_STR
+):
+    """转换为可 JSON 序列化的预览，限制深度、元素数和字符串长度"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= max_str else value[:max_str] + f"…（共 {len(value)} 字）"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f"<{len(value)} bytes>"
+    if depth <= 0:
+        return f"<{describe(value)}>"
+    if _is_dataframe(value):
+        return {
+            "shape": list(value.shape),
+            "columns": [str(c) for c in value.columns[:max_items]],
+            "head": preview(
+                value.head(5).astype(str).to_dict("records"), depth - 1, max_items, max_str
+            ),
+        }
+    if _is_pydantic(value):
+        try:
+            return preview(value.model_dump(), depth, max_items, max_str)
+        except Exception:
+            return f"<{type(value).__name__}>"
+    if isinstance(value, Mapping):
+        result = {
+            str(k): preview(v, depth - 1, max_items, max_str)
+            for k, v in islice(value.items(), max_items)
+        }
+        if len(value) > max_items:
+            result["…"] = f"还有 {len(value) - max_items} 项"
+        return result
+    if isinstance(value, (list, tuple, set, frozenset)) or type(value).__name__ == "deque":
+        result = [
+            preview(item, depth - 1, max_items, max_str)
+            for item in islice(value, max_items)
+        ]
+        if len(value) > max_items:
+            result.append(f"…还有 {len(value) - max_items} 项")
+        return result
+    if hasattr(value, "__dict__"):
+        attributes = _attributes(value)
+        if attributes:
+            return {
+                "__type__": type(value).__name__,
+                **preview(attributes, depth, max_items, max_str),
+            }
+    return f"<{type(value).__name__}>"
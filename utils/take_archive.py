@@ -0,0 +1,141 @@
+"""
+渲染结果批量导出：按角色、时间码和渲染日期筛选台账中的音频，流式打包为 zip 并附带清单
+"""
+
+import csv
+import io
+import json
+import time
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from utils.excel import timecode_to_frames
+from utils.render_ledger import Take
+
+# 复制音频到压缩包时每次读取的字节数
+CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = "manifest.csv"
+MANIFEST_COLUMNS = [
+    "script",
+    "row",
+    "timecode",
+    "character",
+    "voice_id",
+    "tier",
+    "duration",
+    "rendered_at",
+    "file",
+    "params",
+]
+
+
+class _ChunkSink(io.RawIOBase):
+    """只追加的写入目标，压缩包写出的数据在每次 drain 时取走"""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def filter_takes(
+    takes: Iterable[Take], timecode_from: str = "", timecode_to: str = ""
+) -> list[Take]:
+    """按时间码范围（含两端）筛选并按时间码排序，时间码无法解析的渲染排在最后"""
+    start = timecode_to_frames(timecode_from) if timecode_from else -1
+    end = timecode_to_frames(timecode_to) if timecode_to else -1
+    selected = []
+    for take in takes:
+        frames = timecode_to_frames(take.timecode)
+        if start >= 0 and frames < start:
+            continue
+        if end >= 0 and (frames < 0 or frames > end):
+            continue
+        selected.append((frames if frames >= 0 else float("inf"), take))
+    selected.sort(key=lambda item: item[0])
+    return [take for _, take in selected]
+
+
+def split_available(takes: list[Take]) -> tuple[list[Take], list[Take]]:
+    """拆分为音频文件存在和已丢失的渲染"""
+    available, missing = [], []
+    for take in takes:
+        (available if Path(take.audio_path).is_file() else missing).append(take)
+    return available, missing
+
+
+def archive_name(take: Take) -> str:
+    """压缩包中的文件名：渲染文件名，不以时间码开头时加上时间码前缀"""
+    name = Path(take.audio_path).name
+    prefix = take.timecode.replace(":", "")
+    return name if prefix and name.startswith(prefix) else f"{prefix or 'notc'}_{name}"
+
+
+def iter_archive(
+    takes: list[Take], row_numbers: dict[str, int] | None = None
+) -> Iterator[bytes]:
+    """
+    逐块生成 zip 数据：音频按块从磁盘复制，任何时候内存中最多只有一个块；
+    音频已经是压缩格式，不再压缩；不同剧本中相同的渲染只写入一份，清单中各占一行
+    """
+    row_numbers = row_numbers or {}
+    written: set[str] = set()
+    sink = _ChunkSink()
+    manifest = io.StringIO()
+    writer = csv.writer(manifest)
+    writer.writerow(MANIFEST_COLUMNS)
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for take in takes:
+            name = archive_name(take)
+            if name not in written:
+                written.add(name)
+                info = zipfile.ZipInfo(name, time.localtime(take.rendered_at)[:6])
+                info.compress_type = zipfile.ZIP_STORED
+                with open(take.audio_path, "rb") as src, archive.open(
+                    info, "w", force_zip64=True
+                ) as dst:
+                    while chunk := src.read(CHUNK_SIZE):
+                        dst.write(chunk)
+                        yield sink.drain()
+            writer.writerow(
+                [
+                    take.script,
+                    row_numbers.get(take.row_key, ""),
+                    take.timecode,
+                    take.character,
+                    take.voice_id,
+                    take.tier,
+                    take.duration,
+                    time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(take.rendered_at)),
+                    name,
+                    json.dumps(take.params, ensure_ascii=False, sort_keys=True),
+                ]
+            )
+            yield sink.drain()
+        archive.writestr(MANIFEST_NAME, manifest.getvalue().encode("utf-8-sig"))
+    yield sink.drain()
+
+
+def write_archive(
+    takes: list[Take], path: str | Path, row_numbers: dict[str, int] | None = None
+) -> int:
+    """把压缩包流式写入磁盘，返回字节数"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    size = 0
+    with open(path, "wb") as f:
+        for chunk in iter_archive(takes, row_numbers):
+            f.write(chunk)
+            size += len(chunk)
+    return size
@@ -0,0 +1,35 @@
+import functools
+import time
+
+import streamlit as st
+
+from utils.metrics import get_metrics
+from utils.profiling import profile_rerun
+
+
+def timed_render(name: str):
+    """
+    装饰器：记录渲染函数的耗时，调试模式下在页面中显示；
+    片段单独重跑时没有外层的整页分析，由这里为本次片段重跑单独采集
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                with profile_rerun(name):
+                    return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                elapsed_ms = elapsed * 1000
+                get_metrics().observe("render", name, elapsed)
+                if "render_timings" not in st.session_state:
+                    st.session_state.render_timings = {}
+                st.session_state.render_timings[name] = round(elapsed_ms, 1)
+                if st.session_state.get("debug_mode", False):
+                    st.caption(f"⏱️ {name} 渲染耗时: {elapsed_ms:.1f} ms")
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,101 @@
+"""
+TTS 音频缓存
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+
+import streamlit as st
+
+from utils.metrics import TimedLock
+
+# 默认缓存容量：256MB
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def credential_digest(api_key: str, group_id: str) -> str:
+    """API Key 和 Group ID 的摘要，用于区分缓存条目所属的凭据（不暴露 API Key）"""
+    payload = json.dumps([api_key, group_id], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def make_tts_key(voice_id: str, text: str, *, credential: str, **params) -> str:
+    """
+    根据凭据、音色、文本和参数生成缓存键
+    :param credential: 凭据摘要（见 credential_digest），错误或已吊销的 API Key 不会命中其他凭据合成的音频
+    """
+    payload = json.dumps(
+        {"credential": credential, "voice_id": voice_id, "text": text, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """线程安全的 TTS 结果缓存（LRU，按字节数限制容量）"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._size = 0
+        self._lock = TimedLock("tts_cache")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> bytes | None:
+        """读取缓存，命中时刷新其位置"""
+        with self._lock:
+            audio = self._entries.get(key)
+            if audio is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return audio
+
+    def contains(self, key: str) -> bool:
+        """判断是否已缓存（不计入命中统计）"""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: str, audio: bytes) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        if len(audio) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = audio
+            self._size += len(audio)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hit_ratio, 3),
+            }
+
+
+@st.cache_resource
+def get_tts_cache() -> TTSCache:
+    """获取进程内共享的 TTS 缓存"""
+    return TTSCache()
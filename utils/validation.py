@@ -0,0 +1,36 @@
+"""
+音色ID等输入的校验规则，页面和命令行共用
+"""
+
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 按顺序检查，返回第一条不满足的规则对应的错误信息
+VOICE_ID_RULES = [
+    (re.compile(r"^.{8,}$", re.S), "音色ID必须至少8位"),
+    (re.compile(r"^[A-Za-z]"), "音色ID必须以字母开头"),
+    (re.compile(r"^(?=.*[A-Za-z])(?=.*[0-9])", re.S), "音色ID必须包含字母和数字"),
+]
+
+
+def validate_voice_id(voice_id: str) -> str | None:
+    """校验音色ID格式，合法时返回 None，否则返回错误信息"""
+    for pattern, message in VOICE_ID_RULES:
+        if not pattern.search(voice_id):
+            return message
+    return None
+
+
+def validate_voice_ids(voice_ids: "pd.Series") -> "pd.Series":
+    """按列校验音色ID，返回与输入对齐的错误信息列（合法为空字符串）"""
+    import pandas as pd
+
+    voice_ids = voice_ids.fillna("").astype(str)
+    errors = pd.Series("", index=voice_ids.index, dtype=object)
+    # 倒序写入，使排在前面的规则覆盖后面的规则，与 validate_voice_id 保持一致
+    for pattern, message in reversed(VOICE_ID_RULES):
+        errors = errors.mask(~voice_ids.str.contains(pattern), message)
+    return errors
@@ -0,0 +1,239 @@
+"""
+本地音色索引：把接口返回的音色和自定义的标签、角色名持久化到 SQLite，按需增量同步
+"""
+
+import sqlite3
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+import streamlit as st
+
+from utils.metrics import TimedLock
+from utils.naming import convert_to_pinyin
+
+DEFAULT_INDEX_PATH = Path(__file__).parent.parent / "data" / "voice_index.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS voices (
+    group_id TEXT NOT NULL,
+    voice_id TEXT NOT NULL,
+    voice_type TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    created_time TEXT NOT NULL DEFAULT '',
+    tags TEXT NOT NULL DEFAULT '',
+    characters TEXT NOT NULL DEFAULT '',
+    pinyin TEXT NOT NULL DEFAULT '',
+    synced_at REAL NOT NULL,
+    PRIMARY KEY (group_id, voice_id)
+);
+CREATE INDEX IF NOT EXISTS idx_voices_type_created
+    ON voices (group_id, voice_type, created_time);
+CREATE INDEX IF NOT EXISTS idx_voices_type_description
+    ON voices (group_id, voice_type, description);
+"""
+
+# 排序方式对应的 ORDER BY 子句
+VOICE_SORTS = {
+    "创建时间 (最新)": "created_time DESC",
+    "创建时间 (最旧)": "created_time ASC",
+    "音色ID (A-Z)": "voice_id ASC",
+    "音色ID (Z-A)": "voice_id DESC",
+    "描述 (A-Z)": "description ASC",
+    "描述 (Z-A)": "description DESC",
+}
+
+
+@dataclass
+class IndexedVoice:
+    """索引中的一个音色"""
+
+    voice_id: str
+    voice_type: str
+    description: str
+    created_time: str
+    tags: str
+    characters: str
+    pinyin: str
+
+
+def _description(voice) -> str:
+    """接口返回的描述可能是字符串或字符串列表"""
+    description = getattr(voice, "description", None) or ""
+    if isinstance(description, (list, tuple)):
+        return "；".join(str(item) for item in description if item)
+    return str(description)
+
+
+def _pinyin(*texts: str) -> str:
+    """描述、标签和角色名的拼音，用于拼音搜索"""
+    return " ".join(filter(None, (convert_to_pinyin(text) for text in texts if text)))
+
+
+def _split_names(text: str) -> list[str]:
+    return [name.strip() for name in text.replace("，", ",").split(",") if name.strip()]
+
+
+class VoiceIndex:
+    """本地音色索引"""
+
+    def __init__(self, path: str | Path = DEFAULT_INDEX_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = TimedLock("voice_index")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def sync(self, group_id: str, voice_type: str, voices: list) -> dict[str, int]:
+        """
+        用接口返回的音色列表增量更新索引：只写入新增或描述变化的音色，删除已不存在的音色，
+        保留自定义的标签和角色名；返回新增、更新、删除的数量
+        """
+        incoming = {
+            voice.voice_id: (
+                _description(voice),
+                str(getattr(voice, "created_time", "") or ""),
+            )
+            for voice in voices
+        }
+        with self._lock, self._connect() as conn:
+            existing = {
+                row["voice_id"]: row
+                for row in conn.execute(
+                    """SELECT voice_id, description, created_time, tags, characters
+                    FROM voices WHERE group_id = ? AND voice_type = ?""",
+                    (group_id, voice_type),
+                )
+            }
+            now = time.time()
+            added = [voice_id for voice_id in incoming if voice_id not in existing]
+            changed = [
+                voice_id
+                for voice_id, (description, created_time) in incoming.items()
+                if voice_id in existing
+                and (
+                    existing[voice_id]["description"] != description
+                    or existing[voice_id]["created_time"] != created_time
+                )
+            ]
+            removed = [voice_id for voice_id in existing if voice_id not in incoming]
+            conn.executemany(
+                """INSERT INTO voices
+                (group_id, voice_id, voice_type, description, created_time, pinyin, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (group_id, voice_id) DO UPDATE SET
+                    voice_type = excluded.voice_type,
+                    description = excluded.description,
+                    created_time = excluded.created_time,
+                    pinyin = excluded.pinyin,
+                    synced_at = excluded.synced_at""",
+                [
+                    (
+                        group_id,
+                        voice_id,
+                        voice_type,
+                        incoming[voice_id][0],
+                        incoming[voice_id][1],
+                        _pinyin(
+                            incoming[voice_id][0],
+                            existing[voice_id]["tags"] if voice_id in existing else "",
+                            existing[voice_id]["characters"] if voice_id in existing else "",
+                        ),
+                        now,
+                    )
+                    for voice_id in added + changed
+                ],
+            )
+            conn.executemany(
+                "DELETE FROM voices WHERE group_id = ? AND voice_id = ?",
+                [(group_id, voice_id) for voice_id in removed],
+            )
+        return {"added": len(added), "changed": len(changed), "removed": len(removed)}
+
+    def remove(self, group_id: str, voice_ids: list[str]) -> None:
+        """删除音色后同步移出索引"""
+        with self._lock, self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM voices WHERE group_id = ? AND voice_id = ?",
+                [(group_id, voice_id) for voice_id in voice_ids],
+            )
+
+    def update_metadata(
+        self, group_id: str, voice_id: str, tags: str, characters: str
+    ) -> None:
+        """更新自定义标签和角色名（逗号分隔），同时更新拼音"""
+        tags = ", ".join(_split_names(tags))
+        characters = ", ".join(_split_names(characters))
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT description FROM voices WHERE group_id = ? AND voice_id = ?",
+                (group_id, voice_id),
+            ).fetchone()
+            if row is None:
+                return
+            conn.execute(
+                """UPDATE voices SET tags = ?, characters = ?, pinyin = ?
+                WHERE group_id = ? AND voice_id = ?""",
+                (
+                    tags,
+                    characters,
+                    _pinyin(row["description"], tags, characters),
+                    group_id,
+                    voice_id,
+                ),
+            )
+
+    def search(
+        self,
+        group_id: str,
+        voice_type: str,
+        query: str = "",
+        sort: str = "创建时间 (最新)",
+        limit: int | None = None,
+    ) -> list[IndexedVoice]:
+        """按音色ID、描述、标签、角色名或拼音搜索，在本地排序"""
+        sql = """SELECT voice_id, voice_type, description, created_time, tags, characters, pinyin
+            FROM voices WHERE group_id = ? AND voice_type = ?"""
+        params: list = [group_id, voice_type]
+        if query:
+            # 转义输入中的通配符，% 和 _ 按字面匹配
+            escaped = (
+                query.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            pattern = f"%{escaped}%"
+            sql += """ AND (lower(voice_id) LIKE ? ESCAPE '\\' OR lower(description) LIKE ? ESCAPE '\\'
+                OR lower(tags) LIKE ? ESCAPE '\\' OR lower(characters) LIKE ? ESCAPE '\\'
+                OR pinyin LIKE ? ESCAPE '\\')"""
+            params += [pattern] * 5
+        sql += f" ORDER BY {VOICE_SORTS.get(sort, VOICE_SORTS['创建时间 (最新)'])}"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [IndexedVoice(**dict(row)) for row in rows]
+
+    def count(self, group_id: str, voice_type: str) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM voices WHERE group_id = ? AND voice_type = ?",
+                (group_id, voice_type),
+            ).fetchone()[0]
+
+
+@st.cache_resource
+def get_voice_index() -> VoiceIndex:
+    """获取进程内共享的本地音色索引"""
+    return VoiceIndex()